@@ -2,687 +2,109 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
-import sys
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, flash, redirect, url_for
-from flask_moment import Moment
-from flask_migrate import Migrate
-from sqlalchemy.dialects.postgresql import ARRAY
 import logging
 from logging import Formatter, FileHandler
-from forms import *
-from models import Artist, Venue, Show, db
-
-# ----------------------------------------------------------------------------#
-# App Config.
-# ----------------------------------------------------------------------------#
-
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object("config")
-db.init_app(app)
-migrate = Migrate(app, db)
-
-# DONE: connect to a local postgresql database
-
-
-# ----------------------------------------------------------------------------#
-# Filters.
-# ----------------------------------------------------------------------------#
-
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
-
-
-app.jinja_env.filters["datetime"] = format_datetime
+import click
+from flask import Flask
+from flask_moment import Moment
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from models import db
+import assets
+import bulk
+import compression
+import dedup
+import feed
+import geo
+import hot
+import jobs
+import matching
+import outbox
+import snapshots
+import templating
+from views import register_blueprints
+
+moment = Moment()
 
 # ----------------------------------------------------------------------------#
-# Controllers.
+# App Factory.
 # ----------------------------------------------------------------------------#
 
 
-@app.route("/")
-def index():
-    return render_template("pages/home.html")
-
-
-#  Venues
-#  ----------------------------------------------------------------
-
-
-@app.route("/venues")
-def venues():
-    # DONE: replace with real venues data.
-    #       num_shows should be aggregated based on number of upcoming shows per venue.
-    data = []
-    try:
-        if venues := Venue.query.all():
-            locations = sorted(set((v.city, v.state) for v in venues))
-            for city, state in locations:
-                group_data = {"city": city, "state": state, "venues": []}
-                for venue in venues:
-                    if venue.city == city and venue.state == state:
-                        group_data["venues"].append(
-                            {"id": venue.id, "name": venue.name}
-                        )
-                data.append(group_data)
-    except:
-        db.session.rollback()
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-    return render_template("pages/venues.html", areas=data)
-
-
-@app.route("/venues/search", methods=["POST"])
-def search_venues():
-    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
-    # seach for Hop should return "The Musical Hop".
-    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-    search = request.form.get("search_term", "")
-    response = {}
-    try:
-        if venues := Venue.query.filter(Venue.name.ilike(f"%{search}%")).all():
-            response["count"] = len(venues)
-            response["data"] = []
-            for v in venues:
-                response["data"].append({"id": v.id, "name": v.name})
-        else:
-            response["count"] = 0
-    except:
-        db.session.rollback()
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    return render_template(
-        "pages/search_venues.html",
-        results=response,
-        search_term=search,
-    )
-
-
-@app.route("/venues/<int:venue_id>")
-def show_venue(venue_id):
-    # shows the venue page with the given venue_id
-    # DONE: replace with real venue data from the venues table, using venue_id
-    data = {}
-    error = False
-    try:
-        venue = Venue.query.filter_by(id=venue_id).first_or_404()
-        if venue:
-            upcoming_shows = venue.get_upcoming_shows()
-            past_shows = venue.get_past_shows()
-            data = {
-                "id": venue.id,
-                "name": venue.name,
-                "genres": venue.genres,
-                "address": venue.address,
-                "city": venue.city,
-                "state": venue.state,
-                "phone": venue.phone,
-                "website": venue.website,
-                "facebook_link": venue.facebook_link,
-                "seeking_talent": venue.seeking_talent,
-                "seeking_description": venue.seeking_description,
-                "image_link": venue.image_link,
-                "upcoming_shows": upcoming_shows,
-                "upcoming_shows_count": len(upcoming_shows),
-                "past_shows": past_shows,
-                "past_shows_count": len(past_shows),
-            }
-    except:
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error or not data:
-        flash(f"An error occurred. Venue could not be listed.")
-        return render_template("pages/home.html")
-
-    return render_template("pages/show_venue.html", venue=data)
-
-
-@app.route("/venues/create", methods=["GET"])
-def create_venue_form():
-    form = VenueForm()
-    return render_template("forms/new_venue.html", form=form)
-
-
-@app.route("/venues/create", methods=["POST"])
-def create_venue_submission():
-    # DONE: insert form data as a new Venue record in the db, instead
-    # DONE: modify data to be the data object returned from db insertion
-    error = False
-    data = request.form.to_dict()
-    genres = request.form.to_dict(flat=False)["genres"]
-    seeking = True if data.get("seeking_talent") else False
-    try:
-        venue = Venue(
-            name=data["name"],
-            address=data["address"],
-            city=data["city"],
-            state=data["state"],
-            phone=data["phone"],
-            website=data["website_link"],
-            facebook_link=data["facebook_link"],
-            image_link=data["image_link"],
-            genres=genres,
-            seeking_talent=seeking,
-            seeking_description=data["seeking_description"],
-        )
-        db.session.add(venue)
-        db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error:
-        flash(f"An error occurred. Venue '{data['name']}' could not be listed.")
-    else:
-        flash(f"Venue '{data['name']}' was successfully listed!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return render_template("pages/home.html")
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
-def edit_venue(venue_id):
-    form = None
-    data = None
-    try:
-        if venue := Venue.query.get(venue_id):
-            form = VenueForm(obj=venue)
-            data = {
-                "id": venue.id,
-                "name": venue.name,
-                "genres": venue.genres,
-                "address": venue.address,
-                "city": venue.city,
-                "state": venue.state,
-                "phone": venue.phone,
-                "website": venue.website,
-                "facebook_link": venue.facebook_link,
-                "seeking_talent": venue.seeking_talent,
-                "seeking_description": venue.seeking_description,
-                "image_link": venue.image_link,
-            }
-    except:
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # DONE: populate form with values from venue with ID <venue_id>
-    if data:
-        return render_template("forms/edit_venue.html", form=form, venue=data)
-    else:
-        return redirect(url_for("index"))
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
-def edit_venue_submission(venue_id):
-    # DONE: take values from the form submitted, and update existing
-    # venue record with ID <venue_id> using the new attributes
-    error = False
-    data = request.form.to_dict()
-    data["genres"] = request.form.to_dict(flat=False)["genres"]
-    seeking = True if data.get("seeking_talent") else False
-    try:
-        if venue := Venue.query.get(venue_id):
-            venue.name = data["name"]
-            venue.genres = data["genres"]
-            venue.address = data["address"]
-            venue.city = data["city"]
-            venue.state = data["state"]
-            venue.phone = data["phone"]
-            venue.website = data["website_link"]
-            venue.facebook_link = data["facebook_link"]
-            venue.image_link = data["image_link"]
-            venue.seeking_talent = seeking
-            venue.seeking_description = data["seeking_description"]
-            db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db update, flash success
-    if error:
-        flash(f"An error occurred. Venue '{data['name']}' could not be updated.")
-    else:
-        flash(f"Venue '{data['name']}' was successfully updated!")
-
-    return redirect(url_for("show_venue", venue_id=venue_id))
-
-
-@app.route("/venues/<venue_id>", methods=["DELETE"])
-def delete_venue(venue_id):
-    # DONE: Complete this endpoint for taking a venue_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # DONE: BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    error = False
-    venue_name = ""
-    shows = None
-    try:
-        venue = Venue.query.get(venue_id)
-        if venue:
-            shows = venue.get_shows()
-            venue_name = venue.name
-        for s in shows:
-            db.session.delete(s)
-        db.session.delete(venue)
-        db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error:
-        flash(f"An error occurred. Venue could not be listed.")
-    else:
-        flash(f"Venue '{venue_name}' was successfully removed!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return redirect(url_for("index"))
-
-
-#  Artists
-#  ----------------------------------------------------------------
-@app.route("/artists")
-def artists():
-    # DONE: replace with real data returned from querying the database
-    data = []
-    try:
-        artists = Artist.query.all()
-        if artists:
-            for a in artists:
-                data.append({"id": a.id, "name": a.name})
-    except:
-        db.session.rollback()
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    return render_template("pages/artists.html", artists=data)
-
-
-@app.route("/artists/search", methods=["POST"])
-def search_artists():
-    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
-    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-    # search for "band" should return "The Wild Sax Band".
-    search = request.form.get("search_term", "")
-    response = {}
-    try:
-        if artists := Artist.query.filter(Artist.name.ilike(f"%{search}%")).all():
-            response["count"] = len(artists)
-            response["data"] = []
-            for a in artists:
-                response["data"].append({"id": a.id, "name": a.name})
-        else:
-            response["count"] = 0
-    except:
-        db.session.rollback()
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    return render_template(
-        "pages/search_artists.html",
-        results=response,
-        search_term=search,
-    )
-
-
-@app.route("/artists/<int:artist_id>")
-def show_artist(artist_id):
-    # shows the venue page with the given venue_id
-    # DONE: replace with real venue data from the venues table, using venue_id
-    data = {}
-    error = False
-    try:
-        artist = Artist.query.filter_by(id=artist_id).first_or_404()
-        if artist:
-            upcoming_shows = artist.get_upcoming_shows()
-            past_shows = artist.get_past_shows()
-            data = {
-                "id": artist.id,
-                "name": artist.name,
-                "genres": artist.genres,
-                "city": artist.city,
-                "state": artist.state,
-                "phone": artist.phone,
-                "website": artist.website,
-                "facebook_link": artist.facebook_link,
-                "seeking_venue": artist.seeking_venue,
-                "seeking_description": artist.seeking_description,
-                "image_link": artist.image_link,
-                "upcoming_shows": upcoming_shows,
-                "upcoming_shows_count": len(upcoming_shows),
-                "past_shows": past_shows,
-                "past_shows_count": len(past_shows),
-            }
-    except:
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error or not data:
-        flash(f"An error occurred. Artist could not be listed.")
-        return render_template("pages/home.html")
-
-    return render_template("pages/show_artist.html", artist=data)
-
-
-@app.route("/artists/create", methods=["GET"])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template("forms/new_artist.html", form=form)
-
-
-@app.route("/artists/create", methods=["POST"])
-def create_artist_submission():
-    # called upon submitting the new artist listing form
-    # DONE: insert form data as a new Artist record in the db, instead
-    # DONE: modify data to be the data object returned from db insertion
-    error = False
-    data = request.form.to_dict()
-    genres = request.form.to_dict(flat=False)["genres"]
-    seeking = True if data.get("seeking_venue") else False
-    try:
-        artist = Artist(
-            name=data["name"],
-            genres=genres,
-            city=data["city"],
-            state=data["state"],
-            phone=data["phone"],
-            website=data["website_link"],
-            facebook_link=data["facebook_link"],
-            image_link=data["image_link"],
-            seeking_venue=seeking,
-            seeking_description=data["seeking_description"],
+def create_app(config="config", **overrides):
+    """Build the Fyyur app from ``config`` (an import name or object), with
+    ``overrides`` applied on top, e.g. ``create_app(DEBUG=False)``."""
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config.update(overrides)
+
+    if proxies := app.config.get("PROXY_FIX_X_FOR"):
+        # trust the X-Forwarded-* headers set by gunicorn's reverse proxy
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
+    # DONE: connect to a local postgresql database
+    db.init_app(app)
+    moment.init_app(app)
+    cli = click.get_current_context(silent=True) is not None
+    if cli:
+        # alembic is heavy and only needed by the `flask db` commands
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+
+    templating.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    jobs.init_app(app)
+    geo.init_app(app)
+    matching.init_app(app)
+    bulk.init_app(app)
+    dedup.init_app(app)
+    feed.init_app(app)
+    outbox.init_app(app)
+
+    # features that are off or only add commands are not even imported
+    # unless needed, e.g. not by gunicorn workers with the defaults
+    config = app.config
+    if cli or app.testing:
+        # (tests invoke commands through app.test_cli_runner())
+        import partitions
+        import plans
+
+        partitions.init_app(app)
+        plans.init_app(app)
+    if cli or app.testing or config["PRERENDER_ON_WRITE"]:
+        import prerender
+
+        prerender.init_app(app)
+    if config["PROFILE_TOKEN"] or config["PROFILE_SAMPLE_RATE"]:
+        import profiling
+
+        profiling.init_app(app)
+    if config["RATELIMITS"] or config["ADMISSION_ROUTES"]:
+        import ratelimit
+
+        ratelimit.init_app(app)
+
+    snapshots.init_app(app)
+    hot.init_app(app)
+    register_blueprints(app)
+
+    if not app.debug and app.config.get("ERROR_LOG"):
+        file_handler = FileHandler(app.config["ERROR_LOG"])
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+            )
         )
-        db.session.add(artist)
-        db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error:
-        flash(f"An error occurred. Artist '{data['name']}' could not be listed.")
-    else:
-        flash(f"Artist '{data['name']}' was successfully listed!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return render_template("pages/home.html")
-
-
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
-def edit_artist(artist_id):
-    form = None
-    data = None
-    try:
-        if artist := Artist.query.get(artist_id):
-            form = ArtistForm(obj=artist)
-            data = {
-                "id": artist.id,
-                "name": artist.name,
-                "genres": artist.genres,
-                "city": artist.city,
-                "state": artist.state,
-                "phone": artist.phone,
-                "website": artist.website,
-                "facebook_link": artist.facebook_link,
-                "seeking_venue": artist.seeking_venue,
-                "seeking_description": artist.seeking_description,
-                "image_link": artist.image_link,
-            }
-    except:
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # DONE: populate form with fields from artist with ID <artist_id>
-    if data:
-        return render_template("forms/edit_artist.html", form=form, artist=data)
-    else:
-        return redirect(url_for("index"))
-
-
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
-def edit_artist_submission(artist_id):
-    # DONE: take values from the form submitted, and update existing
-    # artist record with ID <artist_id> using the new attributes
-    error = False
-    data = request.form.to_dict()
-    data["genres"] = request.form.to_dict(flat=False)["genres"]
-    seeking = True if data.get("seeking_venue") else False
-    try:
-        if artist := Artist.query.get(artist_id):
-            artist.name = data["name"]
-            artist.genres = data["genres"]
-            artist.city = data["city"]
-            artist.state = data["state"]
-            artist.phone = data["phone"]
-            artist.website = data["website_link"]
-            artist.facebook_link = data["facebook_link"]
-            artist.image_link = data["image_link"]
-            artist.seeking_venue = seeking
-            artist.seeking_description = data["seeking_description"]
-            db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db update, flash success
-    if error:
-        flash(f"An error occurred. Artist '{data['name']}' could not be updated.")
-    else:
-        flash(f"Artist '{data['name']}' was successfully updated!")
-
-    return redirect(url_for("show_artist", artist_id=artist_id))
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-
-
-@app.route("/artists/<artist_id>", methods=["DELETE"])
-def delete_artist(artist_id):
-    # DONE: Complete this endpoint for taking a artist_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # DONE: BONUS CHALLENGE: Implement a button to delete a Artist on an Artist Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    error = False
-    artist_name = ""
-    shows = None
-    try:
-        artist = Artist.query.get(artist_id)
-        if artist:
-            shows = artist.get_shows()
-            artist_name = artist.name
-        for s in shows:
-            db.session.delete(s)
-        db.session.delete(artist)
-        db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error:
-        flash(f"An error occurred. Artist could not be listed.")
-    else:
-        flash(f"Artist '{artist_name}' was successfully removed!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return redirect(url_for("index"))
-
-
-#  Shows
-#  ----------------------------------------------------------------
-@app.route("/shows")
-def shows():
-    # displays list of shows at /shows
-    # DONE: replace with real venues data.
-    #       num_shows should be aggregated based on number of upcoming shows per venue.
-    data = []
-    try:
-        shows = Show.query.all()
-        if shows:
-            for s in shows:
-                venue = Venue.query.get(s.venue_id)
-                artist = Artist.query.get(s.artist_id)
-                data.append(
-                    {
-                        "id": s.id,
-                        "start_time": str(s.start_time),
-                        "venue_id": venue.id,
-                        "venue_name": venue.name,
-                        "artist_id": artist.id,
-                        "artist_name": artist.name,
-                        "artist_image_link": artist.image_link,
-                    }
-                )
-    except:
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    return render_template("pages/shows.html", shows=data)
-
-
-@app.route("/shows/create")
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template("forms/new_show.html", form=form)
-
-
-@app.route("/shows/create", methods=["POST"])
-def create_show_submission():
-    # called to create new shows in the db, upon submitting new show listing form
-    # DONE: insert form data as a new Show record in the db, instead
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g., flash('An error occurred. Show could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    error = False
-    data = request.form.to_dict()
-    try:
-        show = Show(
-            start_time=data["start_time"],
-            artist_id=data["artist_id"],
-            venue_id=data["venue_id"],
-        )
-        db.session.add(show)
-        db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    if error:
-        flash(f"An error occurred. Show could not be listed.")
-    else:
-        # on successful db insert, flash success
-        flash(f"Show was successfully listed!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return render_template("pages/home.html")
-
-
-@app.route("/shows/<show_id>", methods=["DELETE"])
-def delete_show(show_id):
-    # DONE: Complete this endpoint for taking a show_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # DONE: BONUS CHALLENGE: Implement a button to delete a Show on a Show Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-
-    error = False
-    try:
-        show = Show.query.get(show_id)
-        if show:
-            db.session.delete(show)
-            db.session.commit()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # on successful db insert, flash success
-    if error:
-        flash(f"An error occurred. Show could not be canceled.")
-    else:
-        flash(f"Show was successfully canceled!")
-    # DONE: on unsuccessful db insert, flash an error instead.
-    # e.g.,
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    return redirect(url_for("index"))
-
-
-#  Utils
-#  ----------------------------------------------------------------
-@app.errorhandler(404)
-def not_found_error(error):
-    return render_template("errors/404.html"), 404
-
-
-@app.errorhandler(500)
-def server_error(error):
-    return render_template("errors/500.html"), 500
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
 
+    return app
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
 
 # ----------------------------------------------------------------------------#
 # Launch.
@@ -690,11 +112,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 """
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 """
@@ -0,0 +1,189 @@
+# ----------------------------------------------------------------------------#
+# Static asset pipeline.
+# ----------------------------------------------------------------------------#
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+import click
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, only gzip variants are built
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+# Bundles served by layouts/main.html, paths are relative to static/
+BUNDLES = {
+    "main.css": [
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    "head.js": [
+        "js/libs/modernizr-2.8.2.min.js",
+        "js/libs/moment.min.js",
+    ],
+    "body.js": [
+        "js/libs/jquery-1.11.1.min.js",
+        "js/libs/bootstrap-3.1.1.min.js",
+        "js/plugins.js",
+        "js/script.js",
+    ],
+}
+
+# Listed in requirements.txt, yet not required: when one is missing the build
+# falls back as described and assets-build warns about it.
+OPTIONAL = (
+    ("rjsmin", rjsmin, "scripts are not minified"),
+    ("rcssmin", rcssmin, "stylesheets only get the basic minifier"),
+    ("brotli", brotli, "no .br files are built"),
+)
+
+# Built files live one level below static/, like css/ and js/, so relative
+# url(../fonts/...) references in the bundled stylesheets keep resolving.
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def minify_css(source: str) -> str:
+    if rcssmin:
+        return rcssmin.cssmin(source)
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    source = re.sub(r":\s+", ":", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    # without rjsmin scripts are only concatenated, the vendored libs are
+    # already minified and a naive regex minifier is not safe for JS
+    if rjsmin:
+        return rjsmin.jsmin(source)
+    return source.strip()
+
+
+def build(static_folder: str) -> dict:
+    """Bundle, minify, fingerprint and precompress every entry of BUNDLES.
+
+    Writes the results plus a manifest (logical name -> built file) into
+    static/dist and returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        minify = minify_css if name.endswith(".css") else minify_js
+        parts = []
+        for path in sources:
+            with open(os.path.join(static_folder, path), encoding="utf-8") as f:
+                parts.append(minify(f.read()))
+        joiner = "\n" if name.endswith(".css") else ";\n"
+        content = joiner.join(parts).encode("utf-8")
+
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{digest}{ext}"
+
+        _write(os.path.join(dist, filename), content)
+        _write(
+            os.path.join(dist, filename + ".gz"),
+            gzip.compress(content, compresslevel=9, mtime=0),
+        )
+        if brotli:
+            _write(os.path.join(dist, filename + ".br"), brotli.compress(content))
+        manifest[name] = filename
+
+    _write(
+        os.path.join(dist, MANIFEST),
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+    return manifest
+
+
+def _write(path, content: bytes):
+    # write then rename so a running server never serves a partial file
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def load_manifest(static_folder: str) -> dict:
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    """Register the ``asset_urls`` template helper, the fingerprinted asset
+    route and the ``flask assets-build`` command on ``app``."""
+    manifest = load_manifest(app.static_folder)
+
+    def asset_urls(name) -> list:
+        # falls back to the unbundled sources until the build step has run
+        if name in manifest:
+            return [url_for("dist_asset", filename=manifest[name])]
+        return [url_for("static", filename=path) for path in BUNDLES[name]]
+
+    def dist_asset(filename):
+        dist = os.path.join(app.static_folder, DIST_DIR)
+        if filename == MANIFEST or filename.endswith((".gz", ".br", ".tmp")):
+            abort(404)
+
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.isfile(
+                os.path.join(dist, filename + suffix)
+            ):
+                response = send_from_directory(dist, filename + suffix)
+                response.headers["Content-Encoding"] = encoding
+                response.mimetype = mimetypes.guess_type(filename)[0]
+                break
+        else:
+            response = send_from_directory(dist, filename)
+
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.add_url_rule(
+        f"{app.static_url_path}/{DIST_DIR}/<path:filename>",
+        "dist_asset",
+        dist_asset,
+    )
+    app.jinja_env.globals["asset_urls"] = asset_urls
+
+    @app.cli.command("assets-build")
+    def assets_build():
+        """Build the fingerprinted static bundles."""
+        for name, module, effect in OPTIONAL:
+            if module is None:
+                click.echo(f"warning: {name} is not installed, {effect}", err=True)
+        for name, filename in build(app.static_folder).items():
+            click.echo(f"{name} -> {DIST_DIR}/{filename}")
+        manifest.clear()
+        manifest.update(load_manifest(app.static_folder))
+
@@ -0,0 +1,65 @@
+"""CPU cost vs. bytes saved for response compression.
+
+Renders the venues listing for a large synthetic city and compresses it at
+several gzip levels / brotli qualities.
+
+    python benchmarks/bench_compression.py [num_venues]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import render_template  # noqa: E402
+
+from app import create_app  # noqa: E402
+from compression import brotli, compress  # noqa: E402
+
+app = create_app()
+
+ROUNDS = 20
+
+
+def listing_page(num_venues: int) -> bytes:
+    areas = [
+        {
+            "city": "San Francisco",
+            "state": "CA",
+            "venues": [
+                {"id": i, "name": f"The Musical Hop #{i}"} for i in range(num_venues)
+            ],
+        }
+    ]
+    with app.test_request_context("/venues"):
+        return render_template("pages/venues.html", areas=areas).encode("utf-8")
+
+
+def bench(data: bytes, encoding: str, level: int):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        out = compress(data, encoding, level)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    return len(out), elapsed
+
+
+def main():
+    num_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    data = listing_page(num_venues)
+    print(f"venues listing: {num_venues} venues, {len(data) / 1024:.1f} KiB")
+    print(f"{'encoding':<10}{'level':>6}{'KiB':>10}{'saved':>9}{'ms':>9}{'MiB/s':>9}")
+
+    runs = [("gzip", level) for level in (1, 3, 6, 9)]
+    if brotli:
+        runs += [("br", quality) for quality in (1, 4, 6, 9, 11)]
+    for encoding, level in runs:
+        size, elapsed = bench(data, encoding, level)
+        print(
+            f"{encoding:<10}{level:>6}{size / 1024:>10.1f}"
+            f"{1 - size / len(data):>9.1%}{elapsed * 1000:>9.2f}"
+            f"{len(data) / elapsed / 2**20:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Duplicate check latency on create, and the full-table scan.
+
+Seeds venues with realistic-looking names (a share of them near-duplicates)
+inside a transaction that is rolled back at the end, indexes their blocking
+keys and times dedup.find for new submissions and dedup.scan for the table.
+
+    python benchmarks/bench_dedup.py [num_venues]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import Venue, db  # noqa: E402
+import dedup  # noqa: E402
+
+app = create_app()
+
+SAMPLES = 1000
+WORDS = ["Blue", "Note", "Musical", "Hop", "Park", "Square", "Live", "Music"]
+WORDS += ["Coffee", "Dueling", "Pianos", "Bar", "Hall", "Lounge", "Room", "Jazz"]
+WORDS += ["Red", "Rock", "Velvet", "Underground", "Garden", "Club", "Stage"]
+KINDS = ["Bar", "Club", "Hall", "Lounge", "Theatre", "Cafe", "Tavern", "House"]
+AREAS = [(f"City {i}", state) for i in range(50) for state in ("CA", "NY", "TX")]
+
+
+def name(rng):
+    return " ".join(rng.sample(WORDS, rng.randint(1, 3)) + [rng.choice(KINDS)])
+
+
+def typo(rng, text):
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1 :] if rng.random() < 0.5 else text + " SF"
+
+
+def rows(rng, num):
+    for _ in range(num):
+        city, state = rng.choice(AREAS)
+        yield {"name": name(rng), "city": city, "state": state, "genres": []}
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        try:
+            venues = list(rows(rng, num))
+            db.session.execute(Venue.__table__.insert(), venues)
+            start = time.perf_counter()
+            keys = dedup.index("venue")
+            print(f"index: {time.perf_counter() - start:.2f} s, {keys} keys")
+
+            elapsed, found = [], 0
+            for venue in rng.sample(venues, min(SAMPLES, num)):
+                submitted = typo(rng, venue["name"])
+                start = time.perf_counter()
+                found += bool(
+                    dedup.find("venue", submitted, venue["city"], venue["state"])
+                )
+                elapsed.append(time.perf_counter() - start)
+            elapsed.sort()
+            p50, p99 = elapsed[len(elapsed) // 2], elapsed[len(elapsed) * 99 // 100]
+            print(
+                f"find: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, "
+                f"max {elapsed[-1] * 1000:.2f} ms; "
+                f"{found}/{len(elapsed)} near-duplicates found"
+            )
+
+            config = app.config
+            start = time.perf_counter()
+            clusters, skipped = dedup.scan(
+                "venue", config["DEDUP_THRESHOLD"], config["DEDUP_MAX_BLOCK"]
+            )
+            print(
+                f"scan: {time.perf_counter() - start:.2f} s, {len(clusters)} "
+                f"clusters, {skipped} oversized blocks skipped"
+            )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Match suggestion latency against MATCH_BUDGET_MS.
+
+Seeds venues and artists inside a transaction that is rolled back at the end,
+builds the match index once and times suggestions for a sample of entities.
+
+    python benchmarks/bench_matching.py [num_each]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import Artist, Venue, db  # noqa: E402
+
+app = create_app()
+
+SAMPLES = 1000
+GENRES = ["Alternative", "Blues", "Classical", "Country", "Electronic", "Folk"]
+GENRES += ["Funk", "Hip-Hop", "Heavy Metal", "Instrumental", "Jazz", "Musical"]
+GENRES += ["Pop", "Punk", "R&B", "Reggae", "Rock n Roll", "Soul", "Other"]
+AREAS = [(f"City {i}", state) for i in range(200) for state in ("CA", "NY", "TX")]
+
+
+def rows(rng, num, seeking):
+    for i in range(num):
+        city, state = rng.choice(AREAS)
+        yield {
+            "name": f"#{i}",
+            "city": city,
+            "state": state,
+            "genres": rng.sample(GENRES, rng.randint(1, 4)),
+            seeking: rng.random() < 0.5,
+        }
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        try:
+            db.session.execute(
+                Venue.__table__.insert(), list(rows(rng, num, "seeking_talent"))
+            )
+            db.session.execute(
+                Artist.__table__.insert(), list(rows(rng, num, "seeking_venue"))
+            )
+            index = app.extensions["matches"]
+
+            start = time.perf_counter()
+            index.build()
+            print(f"build: {time.perf_counter() - start:.2f} s for {2 * num} entities")
+
+            ids = {
+                "venue": [id for (id,) in db.session.query(Venue.id)],
+                "artist": [id for (id,) in db.session.query(Artist.id)],
+            }
+            print(f"{'kind':<8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+            for kind in ("venue", "artist"):
+                elapsed = []
+                for id in rng.sample(ids[kind], min(SAMPLES, num)):
+                    start = time.perf_counter()
+                    index.suggest(kind, id)
+                    elapsed.append(time.perf_counter() - start)
+                elapsed.sort()
+                p50, p99 = elapsed[len(elapsed) // 2], elapsed[len(elapsed) * 99 // 100]
+                print(
+                    f"{kind:<8}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}"
+                    f"{elapsed[-1] * 1000:>10.2f}"
+                )
+            print(f"budget: {app.config['MATCH_BUDGET_MS']} ms")
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
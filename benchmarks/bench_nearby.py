@@ -0,0 +1,107 @@
+"""Nearby venue search latency: geohash grid and earthdistance vs. a full scan.
+
+Seeds venues with random coordinates across the continental US inside a
+transaction that is rolled back at the end, so it can run against the
+configured development database. earthdistance is only measured on Postgres.
+
+    python benchmarks/bench_nearby.py [num_venues] [radius_miles]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import Venue, db  # noqa: E402
+import geo  # noqa: E402
+
+app = create_app()
+
+QUERIES = 50
+BATCH = 10_000
+# continental US bounding box
+LATITUDES = (24.5, 49.0)
+LONGITUDES = (-124.8, -66.9)
+
+
+def seed(num_venues: int):
+    rng = random.Random(42)
+    for start in range(0, num_venues, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, num_venues)):
+            lat, lon = rng.uniform(*LATITUDES), rng.uniform(*LONGITUDES)
+            rows.append(
+                {
+                    "name": f"Venue #{i}",
+                    "city": "Somewhere",
+                    "state": "CA",
+                    "address": f"{i} Main Street",
+                    "latitude": lat,
+                    "longitude": lon,
+                    "geohash": geo.geohash_encode(lat, lon),
+                }
+            )
+        # Core insert, the mapper geocoding hooks are not involved
+        db.session.execute(Venue.__table__.insert(), rows)
+
+
+def full_scan(latitude, longitude, radius_km, limit):
+    rows = db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.latitude, Venue.longitude
+    )
+    results = [
+        geo.NearbyVenue(*row, distance)
+        for row in rows
+        if (distance := geo.haversine_km(latitude, longitude, row[4], row[5]))
+        <= radius_km
+    ]
+    results.sort(key=lambda venue: venue.distance)
+    return results[:limit]
+
+
+def measure(fn, points, radius_km):
+    elapsed, found = [], 0
+    for lat, lon in points:
+        start = time.perf_counter()
+        found += len(fn(lat, lon, radius_km, 100))
+        elapsed.append(time.perf_counter() - start)
+    elapsed.sort()
+    return found / len(points), elapsed[len(elapsed) // 2], elapsed[-1]
+
+
+def main():
+    num_venues = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    radius_km = (float(sys.argv[2]) if len(sys.argv) > 2 else 10) * geo.KM_PER_MILE
+    rng = random.Random(7)
+    points = [
+        (rng.uniform(*LATITUDES), rng.uniform(*LONGITUDES)) for _ in range(QUERIES)
+    ]
+
+    with app.app_context():
+        db.create_all()
+        try:
+            seed(num_venues)
+            backends = [("geohash", geo._near_geohash)]
+            if db.engine.dialect.name == "postgresql":
+                db.session.execute(db.text("ANALYZE venue"))
+                backends.append(("earthdistance", geo._near_earthdistance))
+            # the full scan is far too slow to repeat 50 times at 1M rows
+            backends.append(("full scan", full_scan))
+
+            print(f"{'backend':<16}{'avg hits':>10}{'p50 ms':>10}{'max ms':>10}")
+            for name, fn in backends:
+                hits, p50, worst = measure(
+                    fn, points if fn is not full_scan else points[:3], radius_km
+                )
+                print(
+                    f"{name:<16}{hits:>10.1f}{p50 * 1000:>10.2f}{worst * 1000:>10.2f}"
+                )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Upcoming show query latency at 10M historical shows, before and after
+partitioning show by month.
+
+Compares three copies of the show table: the unindexed table the app had
+before migration 7a4c2e9d0b13, the same table with that migration's indexes,
+and the monthly partitioned layout. PostgreSQL only; the copies live in a
+scratch schema created inside a transaction that is rolled back at the end.
+
+    python benchmarks/bench_partitions.py [num_historical_shows]
+"""
+
+from datetime import date, datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from partitions import add_months  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+app = create_app()
+
+SCHEMA = "bench_partitions"
+YEARS = 10
+UPCOMING = 50_000
+VENUES = 10_000
+ROUNDS = 200
+COLUMNS = "id integer, start_time timestamp, artist_id integer, venue_id integer"
+QUERIES = {
+    "venue upcoming": "SELECT id, start_time, artist_id FROM {table} "
+    "WHERE venue_id = :venue AND start_time > :now",
+    "next 10 shows": "SELECT id, start_time, venue_id, artist_id FROM {table} "
+    "WHERE start_time > :now ORDER BY start_time LIMIT 10",
+}
+INDEXES = ["venue_id, start_time", "artist_id, start_time", "start_time"]
+
+
+def execute(sql, **params):
+    return db.session.execute(text(sql), params)
+
+
+def seed(num_shows: int):
+    execute(f"CREATE SCHEMA {SCHEMA}")
+    execute(f"CREATE TABLE {SCHEMA}.unindexed ({COLUMNS}, PRIMARY KEY (id))")
+    execute(
+        f"INSERT INTO {SCHEMA}.unindexed "
+        "SELECT g, now() - random() * make_interval(days => :days), "
+        "1 + (random() * :venues)::int, 1 + (random() * :venues)::int "
+        "FROM generate_series(1, :num) g",
+        days=365 * YEARS,
+        venues=VENUES - 1,
+        num=num_shows,
+    )
+    execute(
+        f"INSERT INTO {SCHEMA}.unindexed "
+        "SELECT g, now() + random() * interval '365 days', "
+        "1 + (random() * :venues)::int, 1 + (random() * :venues)::int "
+        "FROM generate_series(:first, :last) g",
+        venues=VENUES - 1,
+        first=num_shows + 1,
+        last=num_shows + UPCOMING,
+    )
+
+    execute(f"CREATE TABLE {SCHEMA}.indexed ({COLUMNS}, PRIMARY KEY (id))")
+    execute(f"INSERT INTO {SCHEMA}.indexed SELECT * FROM {SCHEMA}.unindexed")
+
+    execute(
+        f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}, PRIMARY KEY (id, start_time))"
+        " PARTITION BY RANGE (start_time)"
+    )
+    month = add_months(date.today().replace(day=1), -12 * YEARS - 1)
+    while month < add_months(date.today().replace(day=1), 13):
+        following = add_months(month, 1)
+        execute(
+            f"CREATE TABLE {SCHEMA}.p{month:%Y_%m} "
+            f"PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        )
+        month = following
+    execute(f"INSERT INTO {SCHEMA}.partitioned SELECT * FROM {SCHEMA}.unindexed")
+
+    for table in ("indexed", "partitioned"):
+        for columns in INDEXES:
+            execute(f"CREATE INDEX ON {SCHEMA}.{table} ({columns})")
+    for table in ("unindexed", "indexed", "partitioned"):
+        execute(f"ANALYZE {SCHEMA}.{table}")
+
+
+def scanned(sql, **params) -> int:
+    """Relations (tables or partitions) the plan visits."""
+    plan = execute(f"EXPLAIN (FORMAT JSON) {sql}", **params).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    relations, nodes = set(), [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return len(relations)
+
+
+def measure(sql, rng):
+    elapsed = []
+    for _ in range(ROUNDS):
+        params = {"now": datetime.now(), "venue": rng.randint(1, VENUES)}
+        start = time.perf_counter()
+        execute(sql, **params).all()
+        elapsed.append(time.perf_counter() - start)
+    elapsed.sort()
+    return elapsed[len(elapsed) // 2], elapsed[len(elapsed) * 95 // 100]
+
+
+def main():
+    num_shows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    rng = random.Random(42)
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit("partitioning needs PostgreSQL")
+        try:
+            start = time.perf_counter()
+            seed(num_shows)
+            print(
+                f"seeded {num_shows + UPCOMING} shows in {time.perf_counter() - start:.0f} s"
+            )
+            print(
+                f"{'query':<16}{'table':<13}{'scanned':>8}{'p50 ms':>10}{'p95 ms':>10}"
+            )
+            for name, query in QUERIES.items():
+                for table in ("unindexed", "indexed", "partitioned"):
+                    sql = query.format(table=f"{SCHEMA}.{table}")
+                    relations = scanned(sql, now=datetime.now(), venue=1)
+                    p50, p95 = measure(sql, rng)
+                    print(
+                        f"{name:<16}{table:<13}{relations:>8}"
+                        f"{p50 * 1000:>10.2f}{p95 * 1000:>10.2f}"
+                    )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
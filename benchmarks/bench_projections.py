@@ -0,0 +1,110 @@
+"""Memory and CPU per 10k rows: ORM hydration vs. projected read models.
+
+Seeds venues inside a transaction that is rolled back at the end, so it can
+run against the configured development database.
+
+    python benchmarks/bench_projections.py [num_rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import Venue, db  # noqa: E402
+import projections  # noqa: E402
+
+app = create_app()
+
+ROUNDS = 5
+
+
+def seed(num_rows: int):
+    db.session.execute(
+        Venue.__table__.insert(),
+        [
+            {
+                "name": f"The Musical Hop #{i}",
+                "genres": ["Jazz", "Reggae", "Swing"],
+                "address": "1015 Folsom Street",
+                "city": "San Francisco",
+                "state": "CA",
+                "phone": "123-123-1234",
+                "website": "https://www.themusicalhop.com",
+                "facebook_link": "https://www.facebook.com/TheMusicalHop",
+                "seeking_talent": True,
+                "seeking_description": "We are on the lookout for a local artist.",
+                "image_link": "https://images.unsplash.com/photo-1543900694",
+            }
+            for i in range(num_rows)
+        ],
+    )
+
+
+def hydrated():
+    # the shape views used to build by hand from full entities
+    return [
+        {
+            "id": v.id,
+            "name": v.name,
+            "genres": v.genres,
+            "address": v.address,
+            "city": v.city,
+            "state": v.state,
+            "phone": v.phone,
+            "website": v.website,
+            "facebook_link": v.facebook_link,
+            "seeking_talent": v.seeking_talent,
+            "seeking_description": v.seeking_description,
+            "image_link": v.image_link,
+        }
+        for v in Venue.query.all()
+    ]
+
+
+def projected():
+    query = db.session.query(
+        *projections._columns(Venue, projections.VenueDetail)
+    )
+    return projections._project(projections.VenueDetail, query)
+
+
+def measure(fn):
+    elapsed = []
+    for _ in range(ROUNDS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        rows = fn()
+        elapsed.append(time.perf_counter() - start)
+        del rows
+
+    db.session.expunge_all()
+    tracemalloc.start()
+    rows = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), min(elapsed), peak
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    per = 10_000 / num_rows
+    with app.app_context():
+        db.create_all()
+        try:
+            seed(num_rows)
+            print(f"{'path':<12}{'rows':>8}{'ms/10k':>10}{'peak MiB/10k':>14}")
+            for name, fn in (("hydrated", hydrated), ("projected", projected)):
+                rows, elapsed, peak = measure(fn)
+                print(
+                    f"{name:<12}{rows:>8}{elapsed * 1000 * per:>10.1f}"
+                    f"{peak / 2**20 * per:>14.2f}"
+                )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cold-start time to first request, with the slowest imports.
+
+Each run is a fresh interpreter started with ``python -X importtime`` that
+imports the app, builds it with create_app() and serves ``/`` once.
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 15] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get("/")
+served = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "create_app": created - imported,
+    "first_request": served - created,
+}))
+"""
+
+
+def parse_importtime(stderr: str, depth: int = 1) -> dict:
+    """Cumulative microseconds of every import nested at most ``depth``
+    levels deep (``app`` itself is level 0, what it imports is level 1)."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= depth:
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def run_once() -> dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = time.perf_counter() - start
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"total": total, **phases, "imports": parse_importtime(result.stderr)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the medians to this file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    phases = ("total", "import", "create_app", "first_request")
+    medians = {p: statistics.median(r[p] for r in runs) for p in phases}
+
+    print(f"{args.runs} cold starts, median seconds")
+    for phase in phases:
+        print(f"  {phase:<14}{medians[phase]:>8.3f}")
+
+    names = set().union(*(r["imports"] for r in runs))
+    imports = {
+        name: statistics.median(r["imports"].get(name, 0) for r in runs) / 1e6
+        for name in names
+    }
+    print("\nslowest imports (cumulative, median seconds)")
+    for name, seconds in sorted(imports.items(), key=lambda i: -i[1])[: args.top]:
+        print(f"  {name:<32}{seconds:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"phases": medians, "imports": imports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
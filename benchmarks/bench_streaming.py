@@ -0,0 +1,123 @@
+"""The full show listing rendered at once vs. streamed (`/shows?stream=1`).
+
+For each size, the show table is filled up to that many shows and the page
+is requested through the test client, reading the body chunk by chunk:
+time to the first chunk, time to the last, and the peak of Python memory
+allocated meanwhile (tracemalloc, measured in a separate pass since tracing
+slows everything down). The buffered page is skipped above --buffered-max
+shows, where it holds every row and the whole page in memory at once.
+
+The listing views close their session, so the seeded rows are committed:
+run it against a scratch database, e.g. the in-memory one,
+
+    DATABASE_URL=sqlite:// python benchmarks/bench_streaming.py \\
+        [--buffered-max N] [sizes ...]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from models import Artist, Show, Venue, db  # noqa: E402
+
+app = create_app()
+CHUNK = 50_000
+
+
+def seed_owners(count: int):
+    for model in (Venue, Artist):
+        db.session.execute(
+            model.__table__.insert(),
+            [
+                {"name": f"{model.__name__} #{i}", "city": "Somewhere", "state": "CA"}
+                for i in range(count)
+            ],
+        )
+    db.session.commit()
+    return (
+        db.session.scalars(db.select(Venue.id)).all(),
+        db.session.scalars(db.select(Artist.id)).all(),
+    )
+
+
+def fill(start: int, stop: int, venue_ids, artist_ids):
+    first = datetime(2030, 1, 1, 20)
+    for offset in range(start, stop, CHUNK):
+        db.session.execute(
+            Show.__table__.insert(),
+            [
+                {
+                    "venue_id": venue_ids[i % len(venue_ids)],
+                    "artist_id": artist_ids[i * 7 % len(artist_ids)],
+                    "start_time": first + timedelta(hours=i),
+                    "updated_at": first,
+                    "version": 1,
+                }
+                for i in range(offset, min(offset + CHUNK, stop))
+            ],
+        )
+        db.session.commit()
+
+
+def fetch(client, url):
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    return first_byte, time.perf_counter() - start, size
+
+
+def peak(client, url):
+    tracemalloc.start()
+    try:
+        fetch(client, url)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--buffered-max", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        if db.session.scalar(db.select(db.func.count(Show.id))):
+            sys.exit("the show table is not empty, use a scratch database")
+        venue_ids, artist_ids = seed_owners(1000)
+        client = app.test_client()
+        print(
+            f"{'shows':>9}{'mode':>10}{'ttfb ms':>10}{'total s':>10}{'MB':>10}{'peak MB':>10}"
+        )
+        filled = 0
+        for size in sorted(args.sizes):
+            fill(filled, size, venue_ids, artist_ids)
+            filled = size
+            modes = [("streamed", "/shows?stream=1")]
+            if size <= args.buffered_max:
+                modes.insert(0, ("buffered", "/shows"))
+            for mode, url in modes:
+                first_byte, total, length = fetch(client, url)
+                print(
+                    f"{size:>9}{mode:>10}{first_byte * 1000:>10.1f}{total:>10.2f}"
+                    f"{length / 2**20:>10.1f}{peak(client, url) / 2**20:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
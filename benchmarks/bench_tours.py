@@ -0,0 +1,110 @@
+"""Booking a tour: one show per request vs. the batch tour scheduler.
+
+Seeds venues and an artist inside a transaction that is rolled back at the
+end, so it can run against the configured development database. The
+per-show path does what a show form POST did for every slot (look up the
+venue and artist, insert, record the change); its commits are left out on
+both sides, so the difference is statements alone.
+
+    python benchmarks/bench_tours.py [num_slots]
+"""
+
+from datetime import datetime, timedelta
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import Artist, Show, Venue, db  # noqa: E402
+import outbox  # noqa: E402
+import tours  # noqa: E402
+
+app = create_app()
+
+
+def seed(num_venues: int):
+    db.session.execute(
+        Venue.__table__.insert(),
+        [
+            {"name": f"Venue #{i}", "city": "Somewhere", "state": "CA"}
+            for i in range(num_venues)
+        ],
+    )
+    artist = Artist(name="Guns N Petals", city="San Francisco", state="CA")
+    db.session.add(artist)
+    db.session.flush()
+    venue_ids = db.session.scalars(db.select(Venue.id)).all()
+    return artist.id, venue_ids
+
+
+def slots(venue_ids, num_slots):
+    start = datetime(2035, 1, 1, 20)
+    return [
+        {
+            "venue_id": venue_ids[i % len(venue_ids)],
+            "start_time": (start + timedelta(days=i)).isoformat(),
+        }
+        for i in range(num_slots)
+    ]
+
+
+def per_show(artist_id, tour):
+    for slot in tour:
+        venue = db.session.get(Venue, slot["venue_id"])
+        artist = db.session.get(Artist, artist_id)
+        show = Show(
+            venue_id=venue.id,
+            artist_id=artist.id,
+            start_time=datetime.fromisoformat(slot["start_time"]),
+        )
+        db.session.add(show)
+        db.session.flush()
+        outbox.record("create", "show", show.id)
+
+
+def batch(artist_id, tour):
+    tours.book(tours.validate(artist_id, tour))
+
+
+def measure(fn, *args):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expunge_all()
+    event.listen(db.engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    with db.session.begin_nested() as savepoint:
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        savepoint.rollback()
+    event.remove(db.engine, "before_cursor_execute", count)
+    return elapsed, len(statements)
+
+
+def main():
+    num_slots = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with app.app_context():
+        db.create_all()
+        try:
+            artist_id, venue_ids = seed(num_slots)
+            tour = slots(venue_ids, num_slots)
+            print(f"{num_slots} slots")
+            print(f"{'path':<10}{'ms':>10}{'ms/slot':>10}{'statements':>12}")
+            for name, fn in (("per show", per_show), ("batch", batch)):
+                elapsed, statements = measure(fn, artist_id, tour)
+                print(
+                    f"{name:<10}{elapsed * 1000:>10.1f}"
+                    f"{elapsed * 1000 / num_slots:>10.3f}{statements:>12}"
+                )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# ----------------------------------------------------------------------------#
+# Bulk updates.
+# ----------------------------------------------------------------------------#
+# Applies one partial update to many venues, artists or shows with a single
+# set-based UPDATE ... WHERE id = ANY(:ids) instead of a load/modify/commit
+# round trip per row. Changes are validated with the same form rules as the
+# edit pages.
+from datetime import datetime
+import sys
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import Integer, any_, bindparam, select, update
+from sqlalchemy.dialects import postgresql
+from werkzeug.datastructures import MultiDict
+
+from fragments import invalidate_page
+import jobs
+import matching
+import outbox
+from models import Artist, Show, Venue, db
+
+# form field -> column, per kind
+FIELDS = {
+    "venue": {
+        "name": "name",
+        "genres": "genres",
+        "address": "address",
+        "city": "city",
+        "state": "state",
+        "phone": "phone",
+        "website_link": "website",
+        "facebook_link": "facebook_link",
+        "image_link": "image_link",
+        "seeking_talent": "seeking_talent",
+        "seeking_description": "seeking_description",
+    },
+    "artist": {
+        "name": "name",
+        "genres": "genres",
+        "city": "city",
+        "state": "state",
+        "phone": "phone",
+        "website_link": "website",
+        "facebook_link": "facebook_link",
+        "image_link": "image_link",
+        "seeking_venue": "seeking_venue",
+        "seeking_description": "seeking_description",
+    },
+    "show": {
+        "start_time": "start_time",
+        "artist_id": "artist_id",
+        "venue_id": "venue_id",
+    },
+}
+MODELS = {"venue": Venue, "artist": Artist, "show": Show}
+LOCATION_FIELDS = {"address", "city", "state"}
+
+
+class BulkError(ValueError):
+    """Invalid bulk update; ``errors`` maps field names to messages."""
+
+    def __init__(self, errors: dict):
+        super().__init__("invalid bulk update")
+        self.errors = errors
+
+
+def _form(kind, formdata):
+    from forms import ArtistForm, ShowForm, VenueForm
+
+    form_class = {"venue": VenueForm, "artist": ArtistForm, "show": ShowForm}[kind]
+    return form_class(formdata=formdata, meta={"csrf": False})
+
+
+def _formdata(changes: dict) -> MultiDict:
+    formdata = MultiDict()
+    for field, value in changes.items():
+        if isinstance(value, bool):
+            # BooleanField treats "false" and "" as unchecked
+            value = "y" if value else "false"
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            formdata.add(field, "" if item is None else str(item))
+    return formdata
+
+
+def validate(kind: str, changes: dict) -> dict:
+    """Check ``changes`` (form field -> value) against the form's validators
+    and return them as column values. Only the given fields are validated.
+    """
+    if not changes:
+        raise BulkError({"changes": ["No changes given."]})
+    fields = FIELDS[kind]
+    errors = {field: ["Unknown field."] for field in changes if field not in fields}
+    form = _form(kind, _formdata(changes))
+    values = {}
+    for field in changes:
+        if field in errors:
+            continue
+        if not form[field].validate(form):
+            errors[field] = list(form[field].errors)
+        else:
+            values[fields[field]] = form[field].data
+
+    # ShowForm leaves the ids as free text
+    for column, model in (("artist_id", Artist), ("venue_id", Venue)):
+        if column not in values:
+            continue
+        try:
+            values[column] = int(values[column])
+        except (TypeError, ValueError):
+            errors[column] = ["Not a valid id."]
+            continue
+        if db.session.get(model, values[column]) is None:
+            errors[column] = [f"No {model.__tablename__} with this id."]
+
+    if errors:
+        raise BulkError(errors)
+    return values
+
+
+def _ids_match(column, ids):
+    if db.engine.dialect.name == "postgresql":
+        # a single array parameter, the statement is the same for any count
+        return column == any_(bindparam("ids", ids, type_=postgresql.ARRAY(Integer)))
+    return column.in_(ids)
+
+
+def update_many(kind: str, ids, changes: dict, dry_run=False) -> dict:
+    """Apply ``changes`` to every ``kind`` whose id is in ``ids``.
+
+    Returns the matched row count and ids that do not exist; with
+    ``dry_run`` nothing is written. Commits on success.
+    """
+    limit = current_app.config["BULK_MAX_IDS"]
+    try:
+        ids = sorted({int(id) for id in ids})
+    except (TypeError, ValueError):
+        raise BulkError({"ids": ["Ids must be integers."]})
+    if not ids:
+        raise BulkError({"ids": ["No ids given."]})
+    if len(ids) > limit:
+        raise BulkError({"ids": [f"At most {limit} ids per update."]})
+
+    values = validate(kind, changes)
+    model = MODELS[kind]
+    where = _ids_match(model.id, ids)
+    found = set(db.session.scalars(select(model.id).where(where)))
+    result = {
+        "kind": kind,
+        "matched": len(found),
+        "missing": [id for id in ids if id not in found],
+        "dry_run": dry_run,
+    }
+    if dry_run or not found:
+        db.session.rollback()
+        return result
+
+    # cached show tiles and detail pages are keyed on these
+    shows = select(Show.id, Show.venue_id, Show.artist_id)
+    if kind == "show":
+        values["updated_at"] = datetime.now()
+        touched = db.session.execute(shows.where(_ids_match(Show.id, ids))).all()
+    else:
+        touched = db.session.execute(
+            shows.where(_ids_match(getattr(Show, f"{kind}_id"), ids))
+        ).all()
+    moved = kind == "venue" and bool(LOCATION_FIELDS & changes.keys())
+    if moved:
+        values.update(latitude=None, longitude=None, geohash=None)
+
+    # before the update, so that subscribers see the shows' previous owners
+    outbox.record("update", kind, *found)
+    # Core updates bypass version_id_col, so bump the version here to make
+    # edit forms opened before this update conflict instead of reverting it
+    values["version"] = model.version + 1
+    result["updated"] = db.session.execute(
+        update(model).where(where).values(**values),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if moved:
+        # the mapper geocoding hooks do not see Core updates
+        jobs.enqueue("geocode_venues", venue_ids=sorted(found))
+    if kind != "show" and touched:
+        db.session.execute(
+            update(Show)
+            .where(_ids_match(Show.id, [show.id for show in touched]))
+            .values(updated_at=datetime.now()),
+            execution_options={"synchronize_session": False},
+        )
+    db.session.commit()
+
+    pages = {(kind, id) for id in found if kind != "show"}
+    for show in touched:
+        pages |= {("venue", show.venue_id), ("artist", show.artist_id)}
+    if kind == "show":
+        pages |= {
+            (column[: -len("_id")], values[column])
+            for column in ("venue_id", "artist_id")
+            if column in values
+        }
+    for page in pages:
+        invalidate_page(*page)
+    if kind != "show":
+        matching.refresh(kind, *found)
+    return result
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+bulk_cli = AppGroup("bulk", help="Bulk edits.")
+
+
+def _parse_assignments(assignments) -> dict:
+    changes = {}
+    for assignment in assignments:
+        field, sep, value = assignment.partition("=")
+        if not sep:
+            raise click.BadParameter(f"expected FIELD=VALUE, got '{assignment}'")
+        if field == "genres":
+            changes[field] = [genre.strip() for genre in value.split(",") if genre]
+        else:
+            changes[field] = value
+    return changes
+
+
+@bulk_cli.command("update")
+@click.argument("kind", type=click.Choice(sorted(MODELS)))
+@click.option(
+    "--ids", "ids", required=True, help="Comma separated ids, or @file / @- (stdin)."
+)
+@click.option(
+    "--set",
+    "assignments",
+    multiple=True,
+    required=True,
+    help="FIELD=VALUE using the form's field names; genres are comma separated.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report the affected rows.")
+def update_command(kind, ids, assignments, dry_run):
+    """Apply one partial update to many venues, artists or shows."""
+    if ids.startswith("@"):
+        with click.open_file(ids[1:]) as f:
+            ids = f.read()
+    ids = [id for id in ids.replace("\n", ",").split(",") if id.strip()]
+    try:
+        result = update_many(
+            kind, ids, _parse_assignments(assignments), dry_run=dry_run
+        )
+    except BulkError as e:
+        for field, messages in e.errors.items():
+            click.echo(f"{field}: {' '.join(messages)}", err=True)
+        sys.exit(1)
+
+    verb = "would update" if dry_run else "updated"
+    count = result["matched"] if dry_run else result.get("updated", 0)
+    click.echo(f"{verb} {count} {kind}(s)")
+    if result["missing"]:
+        click.echo(f"missing ids: {', '.join(map(str, result['missing']))}")
+
+
+def init_app(app):
+    app.cli.add_command(bulk_cli)
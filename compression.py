@@ -0,0 +1,99 @@
+# ----------------------------------------------------------------------------#
+# Response compression.
+# ----------------------------------------------------------------------------#
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def _gzip_compressor(level):
+    # wbits=31 writes a gzip header/trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def _brotli_compressor(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zlib.compress(data, level, wbits=31)
+
+
+def compress_stream(chunks, encoding: str, level: int, flush_size=8192):
+    """Compress an iterable of response chunks incrementally.
+
+    Output is flushed every ``flush_size`` input bytes so a streamed response
+    keeps reaching the client while it is produced, without paying a flush
+    per (possibly tiny) chunk.
+    """
+    if encoding == "br":
+        process, flush, finish = _brotli_compressor(level)
+    else:
+        process, flush, finish = _gzip_compressor(level)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        out = process(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            out += flush()
+            pending = 0
+        if out:
+            yield out
+    yield finish()
+
+
+def init_app(app):
+    """Compress HTML/JSON responses negotiated through Accept-Encoding."""
+    config = app.config
+    encodings = ["br", "gzip"] if brotli else ["gzip"]
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in config["COMPRESS_MIMETYPES"]:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        # files sent with send_file (static assets) are passed through as-is
+        if (
+            response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if not encoding:
+            return response
+        level = config[
+            "COMPRESS_BR_QUALITY" if encoding == "br" else "COMPRESS_GZIP_LEVEL"
+        ]
+
+        if response.is_streamed:
+            response.response = compress_stream(
+                response.response, encoding, level, config["COMPRESS_STREAM_FLUSH"]
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < config["COMPRESS_MIN_SIZE"]:
+                return response
+            response.set_data(compress(data, encoding, level))
+
+        response.headers["Content-Encoding"] = encoding
+        return response
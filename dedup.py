@@ -0,0 +1,347 @@
+# ----------------------------------------------------------------------------#
+# Duplicate detection.
+# ----------------------------------------------------------------------------#
+# Venues and artists are compared by the trigrams of their normalized names
+# ("The Musical Hop!" -> "musical hop"), but only within blocks: a record's
+# blocking keys are its name trigrams qualified by its city and state, and
+# two records are only scored when they share enough keys to possibly reach
+# DEDUP_THRESHOLD. The score is the Dice coefficient of the name trigrams,
+# raised when the phone number or website matches.
+#
+# The keys of every row live in the dedup_key table, refreshed with each
+# recorded change, so checking a new submission takes two indexed queries.
+# `flask dedup scan` finds duplicate clusters in a whole table in memory and
+# `flask dedup merge` folds duplicates (and their shows) into one record.
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime
+from itertools import combinations
+import math
+import re
+import unicodedata
+from urllib.parse import urlsplit
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, select, update
+
+from fragments import invalidate_page
+from models import Artist, DedupKey, Show, Venue, db
+import matching
+import outbox
+
+MODELS = {"venue": Venue, "artist": Artist}
+STOPWORDS = {"the", "and", "a", "an", "of"}
+# added to the name score when the phone or website matches
+CONTACT_BOOST = 0.25
+
+Record = namedtuple("Record", "id name city state grams contact")
+Duplicate = namedtuple("Duplicate", "id name city state score")
+
+
+def normalize(text) -> str:
+    """Lower case ASCII words without punctuation and stopwords."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore")
+    words = re.findall(r"[a-z0-9]+", text.decode().casefold().replace("&", " and "))
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+
+def trigrams(text: str) -> frozenset:
+    """pg_trgm style trigrams: each word padded with two spaces in front and
+    one behind."""
+    return frozenset(
+        padded[i : i + 3]
+        for word in text.split()
+        for padded in [f"  {word} "]
+        for i in range(len(padded) - 2)
+    )
+
+
+def _contact(phone, website) -> frozenset:
+    contact = set()
+    if len(digits := re.sub(r"\D", "", phone or "")) >= 7:
+        contact.add(("phone", digits[-10:]))
+    if website and (host := urlsplit(website.strip()).hostname):
+        contact.add(("web", host.removeprefix("www.")))
+    return frozenset(contact)
+
+
+def record(id, name, city, state, phone=None, website=None) -> Record:
+    return Record(
+        id,
+        name,
+        normalize(city)[:120],
+        (state or "").strip().upper(),
+        trigrams(normalize(name)),
+        _contact(phone, website),
+    )
+
+
+def block_keys(rec: Record) -> set:
+    return {f"{rec.state}|{rec.city}|{gram}" for gram in rec.grams}
+
+
+def similarity(a: Record, b: Record) -> float:
+    if not a.grams or not b.grams:
+        return 0.0
+    score = 2 * len(a.grams & b.grams) / (len(a.grams) + len(b.grams))
+    if a.contact & b.contact:
+        score = min(score + CONTACT_BOOST, 1.0)
+    return score
+
+
+def shared_needed(grams: int, threshold: float) -> int:
+    """Fewest shared keys with which a record of ``grams`` trigrams can still
+    score ``threshold`` against any other: a Dice coefficient of t needs at
+    least t / 2 of either set's trigrams in common."""
+    return max(1, math.ceil((threshold - CONTACT_BOOST) * grams / 2))
+
+
+def _rows(kind):
+    model = MODELS[kind]
+    return select(
+        model.id, model.name, model.city, model.state, model.phone, model.website
+    )
+
+
+#  Inline check
+#  ----------------------------------------------------------------
+
+
+def find(kind, name, city, state, phone=None, website=None, exclude=None) -> list:
+    """Existing ``kind`` records that look like the given one, best first."""
+    config = current_app.config
+    threshold = config["DEDUP_THRESHOLD"]
+    rec = record(None, name, city, state, phone, website)
+    if not rec.grams:
+        return []
+
+    keys = select(DedupKey.entity_id).where(
+        DedupKey.kind == kind, DedupKey.key.in_(block_keys(rec))
+    )
+    # counted here rather than with GROUP BY, which planners tend to serve
+    # from the entity index by scanning every key of the kind
+    shared = Counter(db.session.scalars(keys))
+    shared.pop(exclude, None)
+    needed = shared_needed(len(rec.grams), threshold)
+    candidates = [
+        id
+        for id, count in shared.most_common(config["DEDUP_CANDIDATES"])
+        if count >= needed
+    ]
+    if not candidates:
+        return []
+
+    model = MODELS[kind]
+    duplicates = []
+    for row in db.session.execute(_rows(kind).where(model.id.in_(candidates))):
+        other = record(*row)
+        if (score := similarity(rec, other)) >= threshold:
+            duplicates.append(Duplicate(row.id, row.name, row.city, row.state, score))
+    return sorted(duplicates, key=lambda d: -d.score)
+
+
+#  Key maintenance
+#  ----------------------------------------------------------------
+
+
+def index(kind, ids=None, replace=True) -> int:
+    """Replace the blocking keys of ``ids`` (all rows when None) in the
+    current transaction; new rows have none to replace."""
+    model = MODELS[kind]
+    clear = delete(DedupKey).where(DedupKey.kind == kind)
+    rows = _rows(kind)
+    if ids is not None:
+        clear = clear.where(DedupKey.entity_id.in_(ids))
+        rows = rows.where(model.id.in_(ids))
+    if replace:
+        db.session.execute(clear, execution_options={"synchronize_session": False})
+    keys = [
+        {"kind": kind, "entity_id": row.id, "key": key}
+        for row in db.session.execute(rows)
+        for key in block_keys(record(*row))
+    ]
+    if keys:
+        db.session.execute(insert(DedupKey), keys)
+    return len(keys)
+
+
+@outbox.subscriber
+def reindex(op, kind, ids):
+    if kind not in MODELS:
+        return
+    if op == "create":
+        index(kind, ids, replace=False)
+    elif op == "delete":
+        db.session.execute(
+            delete(DedupKey).where(DedupKey.kind == kind, DedupKey.entity_id.in_(ids)),
+            execution_options={"synchronize_session": False},
+        )
+    else:
+        index(kind, ids)
+
+
+#  Batch scan
+#  ----------------------------------------------------------------
+
+
+def scan(kind, threshold, max_block) -> tuple:
+    """Clusters of likely duplicates in the whole ``kind`` table, as lists of
+    Duplicate scored against each cluster's first (lowest id) record, plus
+    the number of blocks skipped for exceeding ``max_block`` records."""
+    records, blocks = {}, defaultdict(list)
+    for row in db.session.execute(_rows(kind).execution_options(yield_per=1000)):
+        rec = records[row.id] = record(*row)
+        for key in block_keys(rec):
+            blocks[key].append(rec.id)
+
+    # shared keys per pair, only counted within blocks
+    shared, skipped = Counter(), 0
+    for ids in blocks.values():
+        if len(ids) > max_block:
+            # a trigram this common in one city tells little anyway
+            skipped += 1
+            continue
+        shared.update(combinations(sorted(ids), 2))
+
+    parent = {}
+
+    def root(id):
+        while id in parent:
+            id = parent[id]
+        return id
+
+    for (a, b), count in shared.items():
+        larger = max(len(records[a].grams), len(records[b].grams))
+        if count < shared_needed(larger, threshold):
+            continue
+        if similarity(records[a], records[b]) >= threshold:
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+    members = defaultdict(list)
+    for id in parent:
+        members[root(id)].append(id)
+    clusters = []
+    for first, ids in sorted(members.items()):
+        head = records[first]
+        clusters.append(
+            [
+                Duplicate(id, r.name, r.city, r.state, similarity(head, r))
+                for id in sorted({first, *ids})
+                for r in [records[id]]
+            ]
+        )
+    return clusters, skipped
+
+
+#  Merging
+#  ----------------------------------------------------------------
+
+
+def merge(kind, keep_id, duplicate_ids) -> dict:
+    """Move the shows of ``duplicate_ids`` to ``keep_id`` and delete them, in
+    one transaction."""
+    model = MODELS[kind]
+    duplicate_ids = sorted({int(id) for id in duplicate_ids} - {int(keep_id)})
+    found = set(
+        db.session.scalars(
+            select(model.id).where(model.id.in_([keep_id, *duplicate_ids]))
+        )
+    )
+    if missing := {int(keep_id), *duplicate_ids} - found:
+        raise LookupError(f"no {kind} with id {', '.join(map(str, sorted(missing)))}")
+    if not duplicate_ids:
+        raise ValueError("nothing to merge")
+
+    column = getattr(Show, f"{kind}_id")
+    other = "artist" if kind == "venue" else "venue"
+    shows = db.session.execute(
+        select(Show.id, getattr(Show, f"{other}_id")).where(column.in_(duplicate_ids))
+    ).all()
+    outbox.record("update", "show", *(id for id, _ in shows))
+    db.session.execute(
+        update(Show)
+        .where(column.in_(duplicate_ids))
+        .values(
+            {
+                column: keep_id,
+                Show.updated_at: datetime.now(),
+                Show.version: Show.version + 1,
+            }
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    outbox.record("update", kind, keep_id)
+    outbox.record("delete", kind, *duplicate_ids)
+    db.session.execute(
+        delete(model).where(model.id.in_(duplicate_ids)),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+
+    for id in [keep_id, *duplicate_ids]:
+        invalidate_page(kind, id)
+    for other_id in {other_id for _, other_id in shows}:
+        invalidate_page(other, other_id)
+    for id in duplicate_ids:
+        matching.remove(kind, id)
+    return {"kind": kind, "kept": keep_id, "merged": duplicate_ids, "shows": len(shows)}
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+dedup_cli = AppGroup("dedup", help="Duplicate venue and artist detection.")
+KIND = click.Choice(sorted(MODELS))
+
+
+@dedup_cli.command("index")
+@click.argument("kind", type=KIND, required=False)
+def index_command(kind):
+    """Rebuild the blocking keys (needed once after upgrading)."""
+    for kind in [kind] if kind else sorted(MODELS):
+        count = index(kind)
+        db.session.commit()
+        click.echo(f"{kind}: {count} key(s)")
+
+
+@dedup_cli.command("scan")
+@click.argument("kind", type=KIND)
+@click.option("--threshold", type=float, help="Defaults to DEDUP_THRESHOLD.")
+def scan_command(kind, threshold):
+    """List clusters of likely duplicates."""
+    config = current_app.config
+    clusters, skipped = scan(
+        kind, threshold or config["DEDUP_THRESHOLD"], config["DEDUP_MAX_BLOCK"]
+    )
+    for cluster in clusters:
+        click.echo(" ".join(str(d.id) for d in cluster))
+        for d in cluster:
+            click.echo(f"  {d.id:>8}  {d.score:.2f}  {d.name} ({d.city}, {d.state})")
+    click.echo(
+        f"{len(clusters)} cluster(s), {skipped} block(s) over "
+        f"DEDUP_MAX_BLOCK skipped"
+    )
+
+
+@dedup_cli.command("merge")
+@click.argument("kind", type=KIND)
+@click.argument("keep", type=int)
+@click.argument("duplicates", type=int, nargs=-1, required=True)
+def merge_command(kind, keep, duplicates):
+    """Merge DUPLICATES (and their shows) into KEEP."""
+    try:
+        result = merge(kind, keep, duplicates)
+    except (LookupError, ValueError) as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    click.echo(
+        f"merged {kind}(s) {' '.join(map(str, result['merged']))} into {keep}, "
+        f"moving {result['shows']} show(s)"
+    )
+
+
+def init_app(app):
+    app.cli.add_command(dedup_cli)
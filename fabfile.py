@@ -28,6 +28,23 @@ def prepare():
     push()
 
 
+# production server (gunicorn.conf.py)
+
+
+def serve():
+    local("gunicorn wsgi:app")
+
+
+def reload():
+    # zero-downtime code reload: USR2 starts a new master running the new
+    # code next to the old one, which is then drained and stopped
+    old = local("cat gunicorn.pid", capture=True)
+    local("kill -USR2 {}".format(old))
+    local("sleep 5")
+    local("kill -WINCH {}".format(old))
+    local("kill -QUIT {}".format(old))
+
+
 # deploy to heroku
 
 
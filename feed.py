@@ -0,0 +1,298 @@
+# ----------------------------------------------------------------------------#
+# Home page feed.
+# ----------------------------------------------------------------------------#
+# The home page lists the next upcoming shows and the most recently listed
+# venues and artists. They come from small per-process buffers: ring buffers
+# (deques) of the newest venues and artists, and a window of the soonest
+# FEED_SHOW_BUFFER upcoming shows kept in start time order, so shows that
+# start can drop off the front without going back to the database.
+#
+# The buffers are seeded with one UNION ALL query served by the primary key
+# and the start_time index, at worker start or by the first home page
+# request, and follow the changes recorded through the outbox once they are
+# committed. They are reseeded (again one query, by a single request while
+# the others keep serving the current buffers) every FEED_TTL seconds to
+# pick up other workers' writes, and sooner when a change cannot be applied
+# in place, e.g. a renamed venue whose name is on a show tile.
+from bisect import insort
+from collections import deque, namedtuple
+from datetime import datetime
+from threading import Lock
+import time
+
+from flask import current_app
+from sqlalchemy import event, literal, null, select, union_all
+
+from models import Artist, Show, Venue, db
+import outbox
+from projections import ShowTile, show_tiles
+
+MODELS = {"venue": Venue, "artist": Artist}
+
+FeedItem = namedtuple("FeedItem", "id name city state image_link")
+
+
+def _order(show):
+    return (show.start_time, show.id)
+
+
+class HomeFeed:
+    """Thread-safe buffers of the newest ``size`` venues and artists and the
+    soonest ``show_buffer`` upcoming shows."""
+
+    def __init__(self, size=6, show_buffer=30):
+        self.size = size
+        self.show_buffer = max(show_buffer, size)
+        self.seeded = None
+        self.stale = False
+        self._lock = Lock()
+        self._seeding = Lock()
+        self._generation = 0
+        self._recent = {kind: deque(maxlen=size) for kind in MODELS}
+        self._shows = []
+        # whether _shows holds every upcoming show, not just the soonest ones
+        self._complete = True
+
+    def load(self, rows, generation):
+        """Replace the buffers with the rows of the seed query, unless a
+        change was applied since ``generation`` was read, in which case the
+        rows are used but marked stale."""
+        recent = {kind: deque(maxlen=self.size) for kind in MODELS}
+        shows = []
+        for row in rows:
+            if row.kind == "show":
+                shows.append(ShowTile(*row[1:10]))
+            else:
+                item = FeedItem(row.id, row.name, row.city, row.state, row.image_link)
+                recent[row.kind].append(item)
+        shows.sort(key=_order)
+        with self._lock:
+            self._recent, self._shows = recent, shows
+            self._complete = len(shows) < self.show_buffer
+            self.stale = self._generation != generation
+            self.seeded = time.monotonic()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def add(self, kind, item):
+        with self._lock:
+            self._generation += 1
+            if kind != "show":
+                self._discard(self._recent[kind], item.id)
+                self._recent[kind].appendleft(item)
+                return
+            self._shows = [show for show in self._shows if show.id != item.id]
+            if item.start_time <= datetime.now():
+                return
+            if not self._complete and (
+                not self._shows or _order(item) > _order(self._shows[-1])
+            ):
+                # an unbuffered show may start before this one
+                return
+            insort(self._shows, item, key=_order)
+            if len(self._shows) > self.show_buffer:
+                self._shows.pop()
+                self._complete = False
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._generation += 1
+            if kind == "show":
+                self._shows = [show for show in self._shows if show.id != id]
+            elif self._discard(self._recent[kind], id):
+                # refill the ring buffer with the next newest
+                self.stale = True
+
+    def changed(self, kind, id):
+        """``(kind, id)`` was edited in a way the buffers cannot follow."""
+        with self._lock:
+            self._generation += 1
+            if kind == "show" or any(item.id == id for item in self._recent[kind]):
+                self.stale = True
+            elif any(getattr(show, f"{kind}_id") == id for show in self._shows):
+                self.stale = True
+
+    def _discard(self, buffer, id) -> bool:
+        for item in buffer:
+            if item.id == id:
+                buffer.remove(item)
+                return True
+        return False
+
+    def snapshot(self) -> dict:
+        """The feed as of now: shows that have started are dropped, and the
+        feed is marked stale when too few buffered shows are left."""
+        now = datetime.now()
+        with self._lock:
+            started = 0
+            while started < len(self._shows) and self._shows[started].start_time <= now:
+                started += 1
+            if started:
+                del self._shows[:started]
+            if len(self._shows) < self.size and not self._complete:
+                self.stale = True
+            return {
+                "shows": self._shows[: self.size],
+                "venues": list(self._recent["venue"]),
+                "artists": list(self._recent["artist"]),
+            }
+
+
+def _feed():
+    return current_app.extensions["feed"]
+
+
+def seed_query(size, show_buffer, now):
+    """The soonest upcoming show tiles and the newest venues and artists as
+    rows of one UNION ALL (kind, *ShowTile fields, name, city, state,
+    image_link)."""
+    shows = (
+        select(
+            Show.id,
+            Show.updated_at,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .where(Show.start_time > now)
+        .order_by(Show.start_time, Show.id)
+        .limit(show_buffer)
+        .subquery()
+    )
+    parts = [
+        select(
+            literal("show").label("kind"),
+            *shows.c,
+            null().label("name"),
+            null().label("city"),
+            null().label("state"),
+            null().label("image_link"),
+        )
+    ]
+    for kind, model in MODELS.items():
+        newest = (
+            select(model.id, model.name, model.city, model.state, model.image_link)
+            .order_by(model.id.desc())
+            .limit(size)
+            .subquery()
+        )
+        parts.append(
+            select(
+                literal(kind),
+                newest.c.id,
+                *[null()] * 8,
+                newest.c.name,
+                newest.c.city,
+                newest.c.state,
+                newest.c.image_link,
+            )
+        )
+    return union_all(*parts)
+
+
+def seed(feed):
+    generation = feed.generation
+    rows = db.session.execute(
+        seed_query(feed.size, feed.show_buffer, datetime.now())
+    ).all()
+    feed.load(rows, generation)
+
+
+def warm(app):
+    """Seed this process' feed up front, e.g. at worker start."""
+    with app.app_context():
+        try:
+            seed(app.extensions["feed"])
+        except Exception:
+            app.logger.exception("seeding the home feed failed")
+        finally:
+            db.session.remove()
+
+
+EMPTY = {"shows": [], "venues": [], "artists": []}
+
+
+def home() -> dict:
+    """The home page feed, costing at most one query. home.html is also the
+    page errors are flashed on, so a failing database must not fail it: the
+    feed is then empty, or as last seeded."""
+    feed = _feed()
+    try:
+        if feed.seeded is None:
+            with feed._seeding:
+                if feed.seeded is None:
+                    seed(feed)
+        elif (
+            feed.stale
+            or time.monotonic() - feed.seeded > current_app.config["FEED_TTL"]
+        ):
+            # one request reseeds, concurrent ones serve the current buffers
+            if feed._seeding.acquire(blocking=False):
+                try:
+                    seed(feed)
+                finally:
+                    feed._seeding.release()
+    except Exception:
+        current_app.logger.exception("seeding the home feed failed")
+        db.session.rollback()
+        if feed.seeded is None:
+            return EMPTY
+    return feed.snapshot()
+
+
+#  Following writes
+#  ----------------------------------------------------------------
+
+
+@outbox.subscriber
+def collect(op, kind, ids):
+    feed = _feed()
+    pending = db.session.info.setdefault("feed", [])
+    if op == "delete" or feed.seeded is None:
+        pending += [(op, kind, id, None) for id in ids]
+    elif kind == "show":
+        with db.session.no_autoflush:
+            tiles = {tile.id: tile for tile in show_tiles(Show.id.in_(ids))}
+        pending += [("create", kind, id, tiles.get(id)) for id in ids]
+    elif op == "create":
+        model = MODELS[kind]
+        columns = model.id, model.name, model.city, model.state, model.image_link
+        with db.session.no_autoflush:
+            rows = db.session.execute(select(*columns).where(model.id.in_(ids)))
+        pending += [(op, kind, row.id, FeedItem(*row)) for row in rows]
+    else:
+        pending += [(op, kind, id, None) for id in ids]
+
+
+@event.listens_for(db.session, "after_commit")
+def apply_committed(session):
+    if not (pending := session.info.pop("feed", None)):
+        return
+    feed = _feed()
+    for op, kind, id, item in pending:
+        if op == "delete":
+            feed.remove(kind, id)
+        elif item is not None:
+            feed.add(kind, item)
+        else:
+            feed.changed(kind, id)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def discard_rolled_back(session, previous_transaction):
+    session.info.pop("feed", None)
+
+
+def init_app(app):
+    app.extensions["feed"] = HomeFeed(
+        size=app.config["FEED_SIZE"], show_buffer=app.config["FEED_SHOW_BUFFER"]
+    )
+    app.jinja_env.globals["home_feed"] = home
@@ -2,6 +2,7 @@ from datetime import datetime
 from flask_wtf import FlaskForm
 from sqlalchemy.sql.sqltypes import Boolean
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
+from wtforms import HiddenField, TextAreaField
 from wtforms.fields.core import BooleanField
 from wtforms.validators import DataRequired, ValidationError, URL
 from enums import Genres, States
@@ -16,6 +17,12 @@ class ShowForm(FlaskForm):
     )
 
 
+class TourForm(FlaskForm):
+    artist_id = StringField("artist_id", validators=[DataRequired()])
+    # one "venue_id, start time" per line
+    slots = TextAreaField("slots", validators=[DataRequired()])
+
+
 class VenueForm(FlaskForm):
     name = StringField("name", validators=[DataRequired()])
     city = StringField("city", validators=[DataRequired()])
@@ -39,6 +46,8 @@ class VenueForm(FlaskForm):
     image_link = StringField("image_link")
     facebook_link = StringField("facebook_link", validators=[URL()])
     website_link = StringField("website_link", validators=[URL()])
+    # the row version the form was rendered with, see models.expect_version
+    version = HiddenField("version")
 
 
 class ArtistForm(FlaskForm):
@@ -63,3 +72,4 @@ class ArtistForm(FlaskForm):
     seeking_description = StringField(
         "seeking_description", validators=[DataRequired()]
     )
+    version = HiddenField("version")
@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------#
+# Fragment cache.
+# ----------------------------------------------------------------------------#
+from collections import OrderedDict
+from threading import Event, Lock
+import time
+
+from flask import current_app
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one computation.
+
+    The first caller for a key runs ``fn``; callers arriving while it runs
+    wait and share its result (or exception) instead of recomputing it.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": Event()}
+
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+class FragmentCache:
+    """Bounded LRU cache for rendered template fragments (or any other value
+    derived from the database).
+
+    Keys must change whenever the fragment's inputs change (e.g. include the
+    row's ``updated_at``), so stale entries are never served; they simply age
+    out of the LRU. Values whose inputs cannot be part of the key use ``ttl``
+    (seconds) and/or explicit ``invalidate`` instead. Concurrent misses for
+    the same key are rendered once.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self._flight = SingleFlight()
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._data:
+                fragment, expires = self._data[key]
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return fragment
+                del self._data[key]
+            self.misses += 1
+
+        # render outside the lock, concurrent misses for one key share a render
+        return self._flight.do(key, lambda: self._render(key, render))
+
+    def _render(self, key, render):
+        fragment = render()
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (fragment, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return fragment
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+def invalidate_page(kind, id):
+    """Drop this process' cached detail page data for ``(kind, id)``. Other
+    workers catch up within DETAIL_CACHE_TTL."""
+    current_app.extensions["detail_cache"].invalidate((kind, int(id)))
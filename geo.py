@@ -0,0 +1,267 @@
+# ----------------------------------------------------------------------------#
+# Geo search.
+# ----------------------------------------------------------------------------#
+# Venues carry latitude/longitude (geocoded from a local lookup table) and a
+# geohash. "Venues near a point" runs against a cube/earthdistance GiST index
+# on Postgres, or against a geohash grid (btree prefix ranges, 3x3 cells,
+# exact distance filtered in Python) on any other database.
+from collections import namedtuple
+import csv
+import math
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, or_, select
+
+from models import GeoPlace, Venue, db
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+NearbyVenue = namedtuple(
+    "NearbyVenue", "id name city state latitude longitude distance"
+)
+
+
+#  Geohash
+#  ----------------------------------------------------------------
+
+
+def geohash_encode(latitude: float, longitude: float, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = ch << 1 | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int):
+    """(height, width) in degrees of a geohash cell."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def precision_for(radius_km: float, latitude: float) -> int:
+    """Finest precision whose cells are at least ``radius_km`` across, so the
+    3x3 block around the origin cell covers the whole search circle."""
+    shrink = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+        if min(height, width * shrink) * km_per_degree >= radius_km:
+            return precision
+    return 1
+
+
+def covering_cells(latitude: float, longitude: float, precision: int) -> set:
+    height, width = cell_size(precision)
+    cells = set()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            lat = min(max(latitude + dy * height, -90.0), 90.0)
+            lon = (longitude + dx * width + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(lat, lon, precision))
+    return cells
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+#  Geocoding
+#  ----------------------------------------------------------------
+
+
+def lookup_geocoder(connection, address, city, state):
+    """Resolve a venue to its city centroid from the local geo_place table."""
+    if not city or not state:
+        return None
+    row = connection.execute(
+        select(GeoPlace.latitude, GeoPlace.longitude).where(
+            func.lower(GeoPlace.city) == city.strip().lower(),
+            GeoPlace.state == state,
+        )
+    ).first()
+    return tuple(row) if row else None
+
+
+geocoder = lookup_geocoder
+
+
+@event.listens_for(Venue, "before_insert")
+@event.listens_for(Venue, "before_update")
+def geocode_venue(mapper, connection, venue):
+    state = db.inspect(venue)
+    moved = any(
+        state.attrs[name].history.has_changes() for name in ("address", "city", "state")
+    )
+    located = any(
+        state.attrs[name].history.has_changes() for name in ("latitude", "longitude")
+    )
+    if (moved and not located) or venue.latitude is None:
+        if point := geocoder(connection, venue.address, venue.city, venue.state):
+            venue.latitude, venue.longitude = point
+    venue.geohash = (
+        geohash_encode(venue.latitude, venue.longitude)
+        if venue.latitude is not None and venue.longitude is not None
+        else None
+    )
+
+
+#  Search
+#  ----------------------------------------------------------------
+
+
+def venues_near(latitude: float, longitude: float, radius_km: float, limit: int):
+    """Venues within ``radius_km`` of the point, nearest first."""
+    backend = current_app.config["GEO_BACKEND"]
+    if backend == "earthdistance" and db.engine.dialect.name == "postgresql":
+        return _near_earthdistance(latitude, longitude, radius_km, limit)
+    return _near_geohash(latitude, longitude, radius_km, limit)
+
+
+def _near_earthdistance(latitude, longitude, radius_km, limit):
+    radius_m = radius_km * 1000
+    origin = func.ll_to_earth(latitude, longitude)
+    point = func.ll_to_earth(Venue.latitude, Venue.longitude)
+    distance = func.earth_distance(origin, point)
+    query = (
+        db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.latitude,
+            Venue.longitude,
+            (distance / 1000).label("distance"),
+        )
+        # the earth_box containment is what the GiST index answers
+        .filter(func.earth_box(origin, radius_m).op("@>")(point))
+        .filter(distance <= radius_m)
+        .order_by(distance)
+        .limit(limit)
+    )
+    return [NearbyVenue._make(row) for row in query]
+
+
+def _near_geohash(latitude, longitude, radius_km, limit):
+    precision = precision_for(radius_km, latitude)
+    cells = covering_cells(latitude, longitude, precision)
+    # a prefix match is a btree range scan: cell <= geohash < cell + "~"
+    ranges = [(Venue.geohash >= cell) & (Venue.geohash < cell + "~") for cell in cells]
+    query = db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.latitude, Venue.longitude
+    ).filter(or_(*ranges))
+
+    results = []
+    for row in query:
+        distance = haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            results.append(NearbyVenue(*row, distance))
+    results.sort(key=lambda venue: venue.distance)
+    return results[:limit]
+
+
+def nearby_args(args) -> dict:
+    """Validate ``lat``/``lon``/``radius``/``unit``/``limit`` query arguments.
+
+    Raises ValueError on missing or out of range values; the radius and limit
+    are capped by GEO_MAX_RADIUS_MILES and GEO_MAX_RESULTS.
+    """
+    config = current_app.config
+    latitude, longitude = float(args["lat"]), float(args["lon"])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("coordinates out of range")
+    unit = args.get("unit", "mi")
+    if unit not in ("mi", "km"):
+        raise ValueError("unit must be 'mi' or 'km'")
+    per_unit = KM_PER_MILE if unit == "mi" else 1.0
+    radius = float(args.get("radius", 10))
+    if radius <= 0:
+        raise ValueError("radius must be positive")
+    radius_km = min(radius * per_unit, config["GEO_MAX_RADIUS_MILES"] * KM_PER_MILE)
+    limit = min(
+        int(args.get("limit", config["GEO_MAX_RESULTS"])), config["GEO_MAX_RESULTS"]
+    )
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius_km": radius_km,
+        "limit": max(limit, 1),
+        "unit": unit,
+        "per_unit": per_unit,
+    }
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+geo_cli = AppGroup("geo", help="Venue geocoding.")
+
+
+@geo_cli.command("load-places")
+@click.argument("path", type=click.File())
+def load_places_command(path):
+    """Load the geocoding lookup table from a city,state,latitude,longitude CSV."""
+    rows = [
+        {
+            "city": row["city"].strip(),
+            "state": row["state"].strip(),
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+        }
+        for row in csv.DictReader(path)
+    ]
+    db.session.execute(GeoPlace.__table__.delete())
+    db.session.execute(GeoPlace.__table__.insert(), rows)
+    db.session.commit()
+    click.echo(f"loaded {len(rows)} places")
+
+
+@geo_cli.command("backfill")
+@click.option("--batch-size", default=1000, show_default=True)
+def backfill_command(batch_size):
+    """Geocode venues that have no location yet."""
+    last_id, located = 0, 0
+    while venues := (
+        Venue.query.filter(Venue.latitude.is_(None), Venue.id > last_id)
+        .order_by(Venue.id)
+        .limit(batch_size)
+        .all()
+    ):
+        connection = db.session.connection()
+        for venue in venues:
+            if point := geocoder(connection, venue.address, venue.city, venue.state):
+                # the before_update hook fills in the geohash
+                venue.latitude, venue.longitude = point
+                located += 1
+        db.session.commit()
+        last_id = venues[-1].id
+    click.echo(f"geocoded {located} venue(s)")
+
+
+def init_app(app):
+    app.cli.add_command(geo_cli)
@@ -0,0 +1,72 @@
+# ----------------------------------------------------------------------------#
+# Gunicorn config, picked up automatically by `gunicorn wsgi:app`.
+# ----------------------------------------------------------------------------#
+# Every setting can be overridden through the environment, see the
+# GUNICORN_* / PORT / WEB_CONCURRENCY lookups below.
+#
+# Graceful reloads:
+#   kill -HUP  <master>   restart workers gracefully (config only, the
+#                         preloaded code is NOT re-imported)
+#   kill -USR2 <master>   start a new master with the new code next to the
+#                         old one, then `kill -WINCH <old>` and
+#                         `kill -QUIT <old>` once it serves (see fabfile.reload)
+import multiprocessing
+import os
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+pidfile = os.environ.get("GUNICORN_PIDFILE", "gunicorn.pid")
+
+# Import the app once in the master; workers fork with it already loaded,
+# which cuts boot time and shares read-only memory between workers.
+preload_app = True
+
+# Requests are mostly waiting on Postgres, so use threaded workers:
+# 2 * cores + 1 processes, a few threads each. Up to CHANGES_MAX_STREAMS of
+# a worker's threads may be taken by /changes event streams.
+worker_class = "gthread"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Recycle workers after a jittered number of requests so slow memory growth
+# cannot accumulate, without all workers restarting at the same moment.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # The preloaded app may have opened pooled connections in the master.
+    # A forked worker must never reuse those sockets: drop the inherited pool
+    # without closing it (the connections still belong to the parent) so the
+    # worker lazily opens its own.
+    from models import db
+    from wsgi import app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    # warm the caches with the persisted hot venues/artists in the background
+    # so the worker starts accepting requests right away
+    import feed
+    import hot
+    import matching
+
+    threading.Thread(target=hot.warm, args=(app,), daemon=True).start()
+    threading.Thread(target=matching.warm, args=(app,), daemon=True).start()
+    threading.Thread(target=feed.warm, args=(app,), daemon=True).start()
+
+
+def worker_exit(server, worker):
+    from wsgi import app
+
+    app.extensions["hot"].persist()
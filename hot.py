@@ -0,0 +1,160 @@
+# ----------------------------------------------------------------------------#
+# Hot entities.
+# ----------------------------------------------------------------------------#
+# Tracks the most viewed venues/artists with a bounded Space-Saving sketch,
+# persists the top-K list periodically and replays it at worker start to
+# warm the caches before traffic arrives.
+import heapq
+import json
+from itertools import count as counter
+import os
+from threading import Lock
+import time
+
+WARMERS = {}
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters sketch (Metwally et al.).
+
+    Keeps at most ``capacity`` counters. An unseen key evicts the smallest
+    counter and inherits its count, so counts are over-estimates by at most
+    the recorded ``error``; any key with true frequency above N / capacity is
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._counts = {}
+        self._errors = {}
+        # min-heap of (count, seq, key); entries whose count is no longer the
+        # key's current one are stale and skipped when looking for a victim
+        self._heap = []
+        self._seq = counter()
+
+    def offer(self, key, count=1):
+        if key in self._counts:
+            self._counts[key] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = count
+            self._errors[key] = 0
+        else:
+            floor = self._evict()
+            self._counts[key] = floor + count
+            self._errors[key] = floor
+        self._push(key)
+
+    def _push(self, key):
+        heapq.heappush(self._heap, (self._counts[key], next(self._seq), key))
+        if len(self._heap) > 4 * self.capacity:
+            # drop the stale entries, amortised over the pushes since the
+            # last compaction
+            self._heap = [
+                (count, next(self._seq), key) for key, count in self._counts.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def _evict(self):
+        """Drop the smallest counter and return its count."""
+        while True:
+            count, _, victim = heapq.heappop(self._heap)
+            if self._counts.get(victim) == count:
+                del self._counts[victim]
+                del self._errors[victim]
+                return count
+
+    def top(self, k=None) -> list:
+        """[(key, count, error)] sorted by descending count."""
+        ranked = sorted(self._counts.items(), key=lambda item: -item[1])
+        return [(key, count, self._errors[key]) for key, count in ranked[:k]]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class HotTracker:
+    """Thread-safe Space-Saving tracker of ``(kind, id)`` page views that
+    writes its top-K list to ``path`` at most every ``interval`` seconds."""
+
+    def __init__(self, path, capacity=256, top_k=50, interval=60):
+        self.path = path
+        self.top_k = top_k
+        self.interval = interval
+        self._sketch = SpaceSaving(capacity)
+        self._lock = Lock()
+        self._persisted = time.monotonic()
+
+    def offer(self, kind, id):
+        with self._lock:
+            self._sketch.offer((kind, id))
+            due = time.monotonic() - self._persisted >= self.interval
+            if due:
+                self._persisted = time.monotonic()
+        if due:
+            self.persist()
+
+    def top(self, k=None) -> list:
+        with self._lock:
+            return self._sketch.top(k or self.top_k)
+
+    def persist(self):
+        entries = [
+            {"kind": kind, "id": id, "count": count}
+            for (kind, id), count, _ in self.top()
+        ]
+        if not self.path or not entries:
+            return
+        # write then rename, workers persisting concurrently never see a
+        # partial file (the last writer wins)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+
+def load(path) -> list:
+    try:
+        with open(path) as f:
+            return [(entry["kind"], entry["id"]) for entry in json.load(f)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def warmer(kind):
+    """Register ``fn(id)`` as the cache warmer for entities of ``kind``."""
+
+    def register(fn):
+        WARMERS[kind] = fn
+        return fn
+
+    return register
+
+
+def track(kind, id):
+    from flask import current_app
+
+    current_app.extensions["hot"].offer(kind, id)
+
+
+def warm(app, limit=None) -> int:
+    """Pre-load the persisted hot entities into this process' caches."""
+    warmed = 0
+    for kind, id in load(app.config["HOT_ENTITIES_PATH"])[:limit]:
+        if kind not in WARMERS:
+            continue
+        with app.test_request_context():
+            try:
+                WARMERS[kind](id)
+                warmed += 1
+            except Exception:
+                app.logger.exception(f"warming {kind} {id} failed")
+    return warmed
+
+
+def init_app(app):
+    app.extensions["hot"] = HotTracker(
+        app.config["HOT_ENTITIES_PATH"],
+        capacity=app.config["HOT_ENTITIES_CAPACITY"],
+        top_k=app.config["HOT_ENTITIES_TOP_K"],
+        interval=app.config["HOT_ENTITIES_PERSIST_INTERVAL"],
+    )
@@ -0,0 +1,196 @@
+# ----------------------------------------------------------------------------#
+# Job queue.
+# ----------------------------------------------------------------------------#
+# Jobs are rows of the ``job`` table. Workers claim them with
+# SELECT ... FOR UPDATE SKIP LOCKED and run the task inside the claiming
+# transaction, so a job's work and its completion commit together and a
+# crashed worker simply releases the row for the next one. A failing task is
+# rolled back to a savepoint and rescheduled while the row is still locked.
+from datetime import datetime, timedelta
+import threading
+import time
+import traceback
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+import metrics
+from models import Job, db
+
+TASKS = {}
+
+
+def task(fn):
+    """Register ``fn`` as a job task under its function name.
+
+    Tasks run inside the worker's transaction and must not commit; they are
+    retried on failure, so they should be idempotent.
+    """
+    TASKS[fn.__name__] = fn
+    return fn
+
+
+def enqueue(name: str, delay: float = 0, max_attempts: int = 3, **payload):
+    """Queue task ``name`` with ``payload`` as keyword arguments.
+
+    The job is added to the current session and becomes visible to workers
+    when the caller commits, together with the rest of its writes. With
+    JOBS_EAGER set the task runs right away instead.
+    """
+    if name not in TASKS:
+        raise KeyError(f"unknown task '{name}'")
+    if current_app.config["JOBS_EAGER"]:
+        TASKS[name](**payload)
+        return None
+
+    job = Job(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=datetime.now() + timedelta(seconds=delay),
+    )
+    db.session.add(job)
+    metrics.incr("jobs.enqueued")
+    return job
+
+
+def claim():
+    return (
+        Job.query.filter(Job.status == "queued", Job.run_at <= datetime.now())
+        .order_by(Job.run_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+
+def run_one() -> bool:
+    """Claim and run a single due job. Returns False when none was due."""
+    job = claim()
+    if job is None:
+        db.session.rollback()
+        return False
+
+    job_id, name = job.id, job.name
+    metrics.observe("jobs.latency", (datetime.now() - job.run_at).total_seconds())
+    start = time.perf_counter()
+    try:
+        try:
+            # in a savepoint: a failing task is undone without releasing the
+            # claim, so no other worker reruns the job before it is rescheduled
+            with db.session.begin_nested():
+                TASKS[name](**job.payload)
+        except Exception:
+            _retry_or_fail(job_id, traceback.format_exc())
+        else:
+            job.status = "done"
+            job.attempts += 1
+            job.finished_at = datetime.now()
+            db.session.commit()
+            metrics.incr("jobs.done")
+    except Exception:
+        # the transaction itself failed (e.g. the connection dropped)
+        error = traceback.format_exc()
+        db.session.rollback()
+        _retry_or_fail(job_id, error)
+    finally:
+        metrics.observe(f"jobs.run.{name}", time.perf_counter() - start)
+    return True
+
+
+def _retry_or_fail(job_id: int, error: str):
+    # still locked by this transaction, or locked again after a rollback
+    job = Job.query.filter_by(id=job_id).with_for_update().one()
+    job.attempts += 1
+    job.last_error = error
+    if job.attempts < job.max_attempts:
+        job.run_at = datetime.now() + timedelta(seconds=2**job.attempts)
+        metrics.incr("jobs.retried")
+    else:
+        job.status = "failed"
+        job.finished_at = datetime.now()
+        metrics.incr("jobs.failed")
+    db.session.commit()
+
+
+def work(app, concurrency: int = 1, poll_interval: float = 1.0, stop=None):
+    """Run ``concurrency`` worker threads until ``stop`` is set."""
+    stop = stop or threading.Event()
+
+    def loop():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    ran = run_one()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("job worker error")
+                    ran = False
+                finally:
+                    db.session.remove()
+                if not ran:
+                    stop.wait(poll_interval)
+
+    threads = [
+        threading.Thread(target=loop, name=f"job-worker-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
+
+
+jobs_cli = AppGroup("jobs", help="Background job queue.")
+
+
+@jobs_cli.command("work")
+@click.option("--concurrency", "-c", default=None, type=int)
+@click.option("--poll-interval", default=1.0, show_default=True)
+def work_command(concurrency, poll_interval):
+    """Run job workers until interrupted."""
+    app = current_app._get_current_object()
+    concurrency = concurrency or app.config["JOBS_CONCURRENCY"]
+    started = time.monotonic()
+    stop, threads = work(app, concurrency, poll_interval)
+    click.echo(f"running {concurrency} job worker(s), Ctrl+C to stop")
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    _echo_metrics(time.monotonic() - started)
+
+
+@jobs_cli.command("stats")
+def stats_command():
+    """Show queue depth per status."""
+    rows = (
+        db.session.query(Job.status, db.func.count(Job.id))
+        .group_by(Job.status)
+        .all()
+    )
+    for status, count in sorted(rows):
+        click.echo(f"{status:<8} {count}")
+
+
+def _echo_metrics(elapsed: float):
+    snapshot = metrics.snapshot()
+    finished = sum(
+        snapshot["counters"].get(name, 0) for name in ("jobs.done", "jobs.failed")
+    )
+    click.echo(f"{'throughput':<28} {finished / elapsed:.2f} jobs/s")
+    for name, value in sorted(snapshot["counters"].items()):
+        click.echo(f"{name:<28} {value}")
+    for name, timing in sorted(snapshot["timings"].items()):
+        click.echo(
+            f"{name:<28} n={timing['count']} avg={timing['avg'] * 1000:.1f}ms "
+            f"max={timing['max'] * 1000:.1f}ms"
+        )
+
+
+def init_app(app):
+    import tasks  # noqa: F401 registers the task functions
+
+    app.cli.add_command(jobs_cli)
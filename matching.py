@@ -0,0 +1,201 @@
+# ----------------------------------------------------------------------------#
+# Venue/artist matching.
+# ----------------------------------------------------------------------------#
+# Recommends artists seeking a venue to venues and venues seeking talent to
+# artists, ranked by genre overlap and same city/state. Suggestions come from
+# a per-process inverted index (genre/area -> ids of seeking entities) that
+# write handlers keep current for their own edits; it is built in the
+# background at worker start (suggestions are empty until then) and rebuilt
+# every MATCH_INDEX_TTL seconds to pick up other workers' edits.
+from collections import Counter, namedtuple
+from threading import Lock, Thread
+import time
+
+from flask import current_app
+
+from models import Artist, Venue, db
+
+OTHER = {"venue": "artist", "artist": "venue"}
+MODELS = {
+    "venue": (Venue, Venue.seeking_talent),
+    "artist": (Artist, Artist.seeking_venue),
+}
+# a shared genre scores 1
+AREA_WEIGHT = 2
+
+Profile = namedtuple("Profile", "id name genres area seeking")
+Match = namedtuple("Match", "id name city state score")
+
+
+def _terms(profile) -> list:
+    return [("area", profile.area)] + [("genre", genre) for genre in profile.genres]
+
+
+def _profile(id, name, genres, city, state, seeking):
+    return Profile(id, name, frozenset(genres or ()), (city, state), bool(seeking))
+
+
+class MatchIndex:
+    """Inverted index of seeking venues and artists.
+
+    ``profiles[kind][id]`` holds every entity (so any detail page can ask for
+    suggestions), ``postings[kind][term]`` only those currently seeking.
+    """
+
+    def __init__(self, budget=0.005, limit=10):
+        self.budget = budget
+        self.limit = limit
+        self.built = None
+        self._lock = Lock()
+        # held while a build runs, so only one runs at a time
+        self.building = Lock()
+        self._profiles = {"venue": {}, "artist": {}}
+        self._postings = {"venue": {}, "artist": {}}
+
+    def build(self):
+        """Load every venue and artist and swap in a fresh index."""
+        profiles = {kind: {} for kind in MODELS}
+        postings = {kind: {} for kind in MODELS}
+        for kind, (model, seeking) in MODELS.items():
+            query = db.session.query(
+                model.id, model.name, model.genres, model.city, model.state, seeking
+            )
+            for row in query:
+                profile = profiles[kind][row.id] = _profile(*row)
+                if profile.seeking:
+                    for term in _terms(profile):
+                        postings[kind].setdefault(term, set()).add(profile.id)
+        with self._lock:
+            self._profiles, self._postings = profiles, postings
+            self.built = time.monotonic()
+
+    def update(self, kind, id, name, genres, city, state, seeking):
+        profile = _profile(id, name, genres, city, state, seeking)
+        with self._lock:
+            self._discard(kind, id)
+            self._profiles[kind][id] = profile
+            if profile.seeking:
+                for term in _terms(profile):
+                    self._postings[kind].setdefault(term, set()).add(id)
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._discard(kind, id)
+
+    def _discard(self, kind, id):
+        profile = self._profiles[kind].pop(id, None)
+        if profile is None or not profile.seeking:
+            return
+        postings = self._postings[kind]
+        for term in _terms(profile):
+            ids = postings.get(term)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del postings[term]
+
+    def suggest(self, kind, id, limit=None) -> list:
+        """Best matches of the other kind for ``(kind, id)``, highest score
+        first. Scoring stops at the latency budget and ranks what it has."""
+        deadline = time.perf_counter() + self.budget
+        other = OTHER[kind]
+        with self._lock:
+            profile = self._profiles[kind].get(id)
+            if profile is None:
+                return []
+            postings = self._postings[other]
+            # area first, then the rarest (most telling) genres
+            genres = sorted(
+                (postings.get(("genre", genre), ()) for genre in profile.genres),
+                key=len,
+            )
+            scores = Counter()
+            for candidate in postings.get(("area", profile.area), ()):
+                scores[candidate] += AREA_WEIGHT
+            for ids in genres:
+                if time.perf_counter() > deadline:
+                    break
+                # Counter.update counts in C, far cheaper than a Python loop
+                scores.update(ids)
+
+            best = scores.most_common(limit or self.limit)
+            profiles = self._profiles[other]
+            return [
+                Match(
+                    candidate,
+                    profiles[candidate].name,
+                    *profiles[candidate].area,
+                    score
+                )
+                for candidate, score in best
+            ]
+
+
+def _index():
+    return current_app.extensions["matches"]
+
+
+def _ensure_built(index, ttl):
+    # Never build in the request: a cold index (before the warm-up at worker
+    # start is done) suggests nothing, and a stale one is served meanwhile
+    if index.built is None or time.monotonic() - index.built > ttl:
+        if index.building.acquire(blocking=False):
+            app = current_app._get_current_object()
+            Thread(target=_rebuild, args=(app, index), daemon=True).start()
+
+
+def _rebuild(app, index):
+    # called holding index.building
+    with app.app_context():
+        try:
+            index.build()
+        except Exception:
+            app.logger.exception("rebuilding the match index failed")
+        finally:
+            db.session.remove()
+            index.building.release()
+
+
+def warm(app):
+    """Build this process' index up front, e.g. at worker start (after any
+    build already running)."""
+    index = app.extensions["matches"]
+    index.building.acquire()
+    _rebuild(app, index)
+
+
+def suggest(kind, id, limit=None) -> list:
+    index = _index()
+    _ensure_built(index, current_app.config["MATCH_INDEX_TTL"])
+    return index.suggest(kind, int(id), limit)
+
+
+def refresh(kind, *ids):
+    """Re-index ``(kind, id)`` for each of ``ids`` from the database after a
+    write, in one query."""
+    index = _index()
+    if index.built is None:
+        return
+    model, seeking = MODELS[kind]
+    ids = {int(id) for id in ids}
+    rows = db.session.query(
+        model.id, model.name, model.genres, model.city, model.state, seeking
+    ).filter(model.id.in_(ids))
+    for row in rows:
+        index.update(kind, *row)
+        ids.discard(row.id)
+    for id in ids:
+        index.remove(kind, id)
+
+
+def remove(kind, id):
+    index = _index()
+    if index.built is not None:
+        index.remove(kind, int(id))
+
+
+def init_app(app):
+    app.extensions["matches"] = MatchIndex(
+        budget=app.config["MATCH_BUDGET_MS"] / 1000,
+        limit=app.config["MATCH_SUGGESTIONS"],
+    )
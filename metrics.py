@@ -0,0 +1,58 @@
+# ----------------------------------------------------------------------------#
+# Metrics.
+# ----------------------------------------------------------------------------#
+# Minimal in-process counters and timing summaries. Each process (web worker,
+# job worker) keeps its own registry.
+from threading import Lock
+import time
+
+_lock = Lock()
+_counters = {}
+_timings = {}
+
+
+def incr(name: str, value: int = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, seconds: float):
+    with _lock:
+        count, total, peak = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + seconds, max(peak, seconds))
+
+
+class timer:
+    """Context manager recording the duration of its block under ``name``."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timings": {
+                name: {
+                    "count": count,
+                    "avg": total / count,
+                    "max": peak,
+                    "total": total,
+                }
+                for name, (count, total, peak) in _timings.items()
+            },
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,31 @@
+"""Add version columns for optimistic concurrency
+
+Revision ID: 3f6d1b8c2e40
+Revises: 7a4c2e9d0b13
+Create Date: 2026-10-19 18:41:27.506113
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3f6d1b8c2e40"
+down_revision = "7a4c2e9d0b13"
+branch_labels = None
+depends_on = None
+
+TABLES = ["venue", "artist", "show"]
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, "version")
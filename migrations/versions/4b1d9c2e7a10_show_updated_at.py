@@ -0,0 +1,31 @@
+"""Add show.updated_at
+
+Revision ID: 4b1d9c2e7a10
+Revises: 737ee39f7589
+Create Date: 2026-10-19 09:12:04.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4b1d9c2e7a10"
+down_revision = "737ee39f7589"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "show",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("show", "updated_at")
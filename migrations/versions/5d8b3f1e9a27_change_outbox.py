@@ -0,0 +1,38 @@
+"""Add change outbox table
+
+Revision ID: 5d8b3f1e9a27
+Revises: c72a5e18b4f9
+Create Date: 2026-10-19 15:02:44.180392
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5d8b3f1e9a27"
+down_revision = "c72a5e18b4f9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change",
+        sa.Column(
+            "id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            nullable=False,
+        ),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(length=10), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_change_created_at", "change", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_change_created_at", table_name="change")
+    op.drop_table("change")
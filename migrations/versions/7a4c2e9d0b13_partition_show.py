@@ -0,0 +1,119 @@
+"""Partition show by month on start_time
+
+Revision ID: 7a4c2e9d0b13
+Revises: 5d8b3f1e9a27
+Create Date: 2026-10-19 16:21:09.640275
+
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7a4c2e9d0b13"
+down_revision = "5d8b3f1e9a27"
+branch_labels = None
+depends_on = None
+
+# months of partitions created ahead of today, `flask partitions maintain`
+# keeps extending them
+AHEAD = 12
+
+INDEXES = [
+    ("ix_show_venue_id_start_time", ["venue_id", "start_time"]),
+    ("ix_show_artist_id_start_time", ["artist_id", "start_time"]),
+    ("ix_show_start_time", ["start_time"]),
+]
+
+
+def add_months(month: date, n: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + n
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        for name, columns in INDEXES:
+            op.create_index(name, "show", columns)
+        return
+
+    op.execute("ALTER TABLE show RENAME TO show_unpartitioned")
+    op.execute(
+        "ALTER TABLE show_unpartitioned "
+        "RENAME CONSTRAINT show_pkey TO show_unpartitioned_pkey"
+    )
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY NONE")
+    # the partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE show (
+            id integer NOT NULL DEFAULT nextval('show_id_seq'),
+            start_time timestamp without time zone NOT NULL,
+            artist_id integer NOT NULL REFERENCES artist (id),
+            venue_id integer NOT NULL REFERENCES venue (id),
+            updated_at timestamp without time zone NOT NULL DEFAULT now(),
+            CONSTRAINT show_pkey PRIMARY KEY (id, start_time)
+        ) PARTITION BY RANGE (start_time)
+        """)
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY show.id")
+    # anything outside the monthly partitions, so inserts never fail
+    op.execute("CREATE TABLE show_default PARTITION OF show DEFAULT")
+
+    first = (
+        op.get_bind()
+        .execute(sa.text("SELECT min(start_time) FROM show_unpartitioned"))
+        .scalar()
+    )
+    today = date.today().replace(day=1)
+    month = (first.date() if first else today).replace(day=1)
+    while month < add_months(today, AHEAD):
+        following = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE show_p{month:%Y_%m} PARTITION OF show "
+            f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        )
+        month = following
+
+    op.execute(
+        "INSERT INTO show (id, start_time, artist_id, venue_id, updated_at) "
+        "SELECT id, start_time, artist_id, venue_id, updated_at "
+        "FROM show_unpartitioned"
+    )
+    op.execute("DROP TABLE show_unpartitioned")
+    # created on the parent, each partition gets its own copy
+    for name, columns in INDEXES:
+        op.create_index(name, "show", columns)
+    op.execute("ANALYZE show")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="show")
+        return
+
+    op.execute("ALTER TABLE show RENAME TO show_partitioned")
+    op.execute(
+        "ALTER TABLE show_partitioned "
+        "RENAME CONSTRAINT show_pkey TO show_partitioned_pkey"
+    )
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE show (
+            id integer NOT NULL DEFAULT nextval('show_id_seq'),
+            start_time timestamp without time zone NOT NULL,
+            artist_id integer NOT NULL REFERENCES artist (id),
+            venue_id integer NOT NULL REFERENCES venue (id),
+            updated_at timestamp without time zone NOT NULL DEFAULT now(),
+            CONSTRAINT show_pkey PRIMARY KEY (id)
+        )
+        """)
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY show.id")
+    op.execute(
+        "INSERT INTO show (id, start_time, artist_id, venue_id, updated_at) "
+        "SELECT id, start_time, artist_id, venue_id, updated_at "
+        "FROM show_partitioned"
+    )
+    # drops every partition with it, archived (detached) ones are untouched
+    op.execute("DROP TABLE show_partitioned")
@@ -0,0 +1,33 @@
+"""Add dedup_key table
+
+Revision ID: b81e4d07c9a5
+Revises: 3f6d1b8c2e40
+Create Date: 2026-10-19 21:07:52.318640
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b81e4d07c9a5"
+down_revision = "3f6d1b8c2e40"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # filled by `flask dedup index`
+    op.create_table(
+        "dedup_key",
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("key", sa.String(length=250), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "key", "entity_id"),
+    )
+    op.create_index("ix_dedup_key_kind_entity_id", "dedup_key", ["kind", "entity_id"])
+
+
+def downgrade():
+    op.drop_index("ix_dedup_key_kind_entity_id", table_name="dedup_key")
+    op.drop_table("dedup_key")
@@ -0,0 +1,56 @@
+"""Add venue location and geo lookup table
+
+Revision ID: c72a5e18b4f9
+Revises: 9e3f0a6c51d2
+Create Date: 2026-10-19 14:05:51.920417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c72a5e18b4f9"
+down_revision = "9e3f0a6c51d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("venue", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("venue", sa.Column("longitude", sa.Float(), nullable=True))
+    op.add_column("venue", sa.Column("geohash", sa.String(length=12), nullable=True))
+    op.create_index("ix_venue_geohash", "venue", ["geohash"])
+    op.create_table(
+        "geo_place",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("city", sa.String(length=120), nullable=False),
+        sa.Column("state", sa.String(length=120), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("city", "state"),
+    )
+    op.create_index(
+        "ix_geo_place_lower_city_state",
+        "geo_place",
+        [sa.text("lower(city)"), "state"],
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        # cube and earthdistance are trusted extensions (PG 13+)
+        op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+        op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+        op.execute(
+            "CREATE INDEX ix_venue_earth ON venue "
+            "USING gist (ll_to_earth(latitude, longitude))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_venue_earth")
+    op.drop_index("ix_geo_place_lower_city_state", table_name="geo_place")
+    op.drop_table("geo_place")
+    op.drop_index("ix_venue_geohash", table_name="venue")
+    op.drop_column("venue", "geohash")
+    op.drop_column("venue", "longitude")
+    op.drop_column("venue", "latitude")
@@ -0,0 +1,37 @@
+"""Add snapshot table
+
+Revision ID: e5a9c3d71f08
+Revises: b81e4d07c9a5
+Create Date: 2026-10-19 23:12:40.517204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "e5a9c3d71f08"
+down_revision = "b81e4d07c9a5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # filled by `flask snapshots build`
+    op.create_table(
+        "snapshot",
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "data",
+            sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            nullable=False,
+        ),
+        sa.Column("built_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "entity_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("snapshot")
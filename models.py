@@ -2,20 +2,58 @@
 # Models.
 # ----------------------------------------------------------------------------#
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import and_, func, or_, select, type_coerce
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from datetime import datetime
 
 
 db = SQLAlchemy()
 
+# a native array on PostgreSQL and a JSON array elsewhere, so the schema can
+# also be built on (in-memory) SQLite for the tests and benchmarks
+StringList = db.JSON().with_variant(ARRAY(db.String), "postgresql")
+Document = db.JSON().with_variant(JSONB, "postgresql")
+
+
+def genres_contain(column, *genres):
+    """SQL for "the ``column`` list holds all of ``genres``"."""
+    if db.engine.dialect.name == "postgresql":
+        return type_coerce(column, ARRAY(db.String)).contains(list(genres))
+    return and_(*(_json_holds(column, genre) for genre in genres))
+
+
+def genres_overlap(column, *genres):
+    """SQL for "the ``column`` list holds any of ``genres``"."""
+    if db.engine.dialect.name == "postgresql":
+        return type_coerce(column, ARRAY(db.String)).overlap(list(genres))
+    return or_(*(_json_holds(column, genre) for genre in genres))
+
+
+def _json_holds(column, value):
+    elements = func.json_each(column).table_valued("value")
+    return select(1).select_from(elements).where(elements.c.value == value).exists()
+
 
 class Show(db.Model):
+    # range partitioned by month on start_time on PostgreSQL, see partitions.py
     __tablename__ = "show"
+    __table_args__ = (
+        db.Index("ix_show_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_show_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_show_start_time", "start_time"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey("artist.id"), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now
+    )
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Venue(db.Model):
@@ -23,7 +61,7 @@ class Venue(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, nullable=False)
     name = db.Column(db.String, nullable=False)
-    genres = db.Column(ARRAY(db.String))
+    genres = db.Column(StringList)
     address = db.Column(db.String(120))
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
@@ -33,37 +71,16 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
     shows = db.relationship("Show", backref="venue", lazy=True)
+    # flushes only update the row if it is still at the version that was
+    # loaded, and raise StaleDataError otherwise
+    __mapper_args__ = {"version_id_col": version}
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
 
-    def get_upcoming_shows(self) -> list:
-        shows = (
-            db.session.query(Artist, Show)
-            .join(Show)
-            .join(Venue)
-            .filter(
-                Show.venue_id == self.id,
-                Show.artist_id == Artist.id,
-                Show.start_time > datetime.now(),
-            )
-            .all()
-        )
-        return formatted_shows(shows)
-
-    def get_past_shows(self) -> list:
-        shows = (
-            db.session.query(Artist, Show)
-            .join(Show)
-            .join(Venue)
-            .filter(
-                Show.venue_id == self.id,
-                Show.artist_id == Artist.id,
-                Show.start_time < datetime.now(),
-            )
-            .all()
-        )
-        return formatted_shows(shows)
-
     def get_shows(self):
         return Show.query.filter_by(venue_id=self.id).all()
 
@@ -73,7 +90,7 @@ class Artist(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, nullable=False)
     name = db.Column(db.String)
-    genres = db.Column(ARRAY(db.String))
+    genres = db.Column(StringList)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -82,57 +99,101 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
+    version = db.Column(db.Integer, nullable=False, default=1)
     shows = db.relationship("Show", backref="artist", lazy=True)
+    __mapper_args__ = {"version_id_col": version}
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
 
-    def get_upcoming_shows(self) -> list:
-        shows = (
-            db.session.query(Artist, Show)
-            .join(Show)
-            .join(Venue)
-            .filter(
-                Show.venue_id == Venue.id,
-                Show.artist_id == self.id,
-                Show.start_time > datetime.now(),
-            )
-            .all()
-        )
-        return formatted_shows(shows, venue_img=True)
-
-    def get_past_shows(self) -> list:
-        shows = (
-            db.session.query(Artist, Show)
-            .join(Show)
-            .join(Venue)
-            .filter(
-                Show.venue_id == Venue.id,
-                Show.artist_id == self.id,
-                Show.start_time < datetime.now(),
-            )
-            .all()
-        )
-        return formatted_shows(shows, venue_img=True)
-
     def get_shows(self):
         return Show.query.filter_by(artist_id=self.id).all()
 
 
-def formatted_shows(shows: list, venue_img=False) -> list:
-    data = []
-    for artist, show in shows:
-        event = {
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "start_time": str(show.start_time),
-        }
-        if venue_img:
-            event["venue_image_link"] = show.venue.image_link
-        else:
-            event["artist_image_link"] = artist.image_link
+def expect_version(instance, version):
+    """Raise StaleDataError unless ``instance`` is still at the ``version``
+    its edit form was rendered with (no check when none was submitted)."""
+    if version not in (None, "") and int(version) != instance.version:
+        raise StaleDataError(
+            f"{instance.__tablename__} {instance.id} is at version "
+            f"{instance.version}, the form was for version {version}"
+        )
+
+
+class GeoPlace(db.Model):
+    __tablename__ = "geo_place"
+    __table_args__ = (db.UniqueConstraint("city", "state"),)
 
-        data.append(event)
+    id = db.Column(db.Integer, primary_key=True, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
 
-    return data
+
+# geocoding matches the city case-insensitively
+db.Index(
+    "ix_geo_place_lower_city_state", func.lower(GeoPlace.city), GeoPlace.state
+)
+
+
+class Job(db.Model):
+    __tablename__ = "job"
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id = db.Column(db.Integer, primary_key=True, nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+
+class Change(db.Model):
+    """Outbox of venue/artist/show writes, committed together with them."""
+
+    __tablename__ = "change"
+
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"),
+        primary_key=True,
+        nullable=False,
+    )
+    kind = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.now, index=True
+    )
+
+
+class DedupKey(db.Model):
+    """Blocking keys of venues and artists for duplicate detection, kept
+    current by dedup.py."""
+
+    __tablename__ = "dedup_key"
+    # the primary key serves lookups by key, the index replacing an entity's
+    __table_args__ = (
+        db.Index("ix_dedup_key_kind_entity_id", "kind", "entity_id"),
+    )
+
+    kind = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(250), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True)
+
+
+class Snapshot(db.Model):
+    """The data a venue or artist detail page renders, shows included, kept
+    current by snapshots.py."""
+
+    __tablename__ = "snapshot"
+
+    kind = db.Column(db.String(20), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(Document, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
 
 
 # DONE Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
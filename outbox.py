@@ -0,0 +1,125 @@
+# ----------------------------------------------------------------------------#
+# Change outbox.
+# ----------------------------------------------------------------------------#
+# Every create/edit/delete of a venue, artist or show adds a row to the
+# ``change`` table in the same transaction as the write itself, so a change
+# becomes visible exactly when the data does. Clients sync incrementally from
+# /changes with a cursor (the last change id they have seen) instead of
+# re-reading the full listings.
+#
+# Ids must become visible in order, or a reader could pass over a lower id
+# whose transaction commits after a higher one. So changes are only queued
+# when recorded and inserted as the transaction's last statement, under an
+# advisory lock held until the commit (PostgreSQL; SQLite serializes writers
+# anyway): transactions recording changes commit them one at a time.
+from datetime import datetime, timedelta
+import json
+from threading import BoundedSemaphore
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, insert, select
+
+from models import Change, db
+
+OPS = ("create", "update", "delete")
+SUBSCRIBERS = []
+# pg_advisory_xact_lock key serializing the commits of changes
+PUBLISH_LOCK = 0x6368616E6765
+
+
+def subscriber(fn):
+    """Call ``fn(op, kind, ids)`` for every recorded change, inside the
+    writing transaction (deleted and updated rows are still unchanged)."""
+    SUBSCRIBERS.append(fn)
+    return fn
+
+
+def record(op: str, kind: str, *ids):
+    """Add a change for each ``(kind, id)`` to the current transaction. The
+    rows are inserted when it commits.
+
+    Subscribers run right away and look at the rows as they are, so call it
+    after creating and before updating or deleting them: that way they see
+    e.g. the venue a show is moved away from.
+    """
+    if op not in OPS:
+        raise ValueError(f"unknown change op '{op}'")
+    now = datetime.now()
+    rows = [
+        {"kind": kind, "entity_id": int(id), "op": op, "created_at": now} for id in ids
+    ]
+    if rows:
+        db.session.info.setdefault("changes", []).extend(rows)
+        for fn in SUBSCRIBERS:
+            fn(op, kind, [row["entity_id"] for row in rows])
+
+
+@event.listens_for(db.session, "before_commit")
+def publish(session):
+    # registered first but meant to run last: other before_commit listeners
+    # writing in the transaction listen with insert=True, so that nothing
+    # waits on row locks while holding the lock
+    if rows := session.info.pop("changes", None):
+        if db.engine.dialect.name == "postgresql":
+            session.execute(select(func.pg_advisory_xact_lock(PUBLISH_LOCK)))
+        session.execute(insert(Change), rows)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def discard_rolled_back(session, previous_transaction):
+    session.info.pop("changes", None)
+
+
+def since(cursor: int, limit: int) -> list:
+    """Committed changes after ``cursor``, oldest first."""
+    return (
+        db.session.query(
+            Change.id, Change.kind, Change.entity_id, Change.op, Change.created_at
+        )
+        .filter(Change.id > cursor)
+        .order_by(Change.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def as_dict(change) -> dict:
+    return {
+        "id": change.id,
+        "kind": change.kind,
+        "entity_id": change.entity_id,
+        "op": change.op,
+        "at": change.created_at.isoformat(),
+    }
+
+
+def as_event(change) -> str:
+    return f"id: {change.id}\nevent: change\ndata: {json.dumps(as_dict(change))}\n\n"
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+changes_cli = AppGroup("changes", help="Change feed outbox.")
+
+
+@changes_cli.command("prune")
+@click.option("--days", type=int, help="Defaults to CHANGES_RETENTION_DAYS.")
+def prune_command(days):
+    """Delete changes older than the retention period. Clients whose cursor
+    falls behind it have to resync in full."""
+    days = days if days is not None else current_app.config["CHANGES_RETENTION_DAYS"]
+    cutoff = datetime.now() - timedelta(days=days)
+    deleted = Change.query.filter(Change.created_at < cutoff).delete()
+    db.session.commit()
+    click.echo(f"pruned {deleted} change(s)")
+
+
+def init_app(app):
+    app.cli.add_command(changes_cli)
+    # SSE streams each hold a worker thread, see views.changes.stream
+    app.extensions["change_streams"] = BoundedSemaphore(
+        app.config["CHANGES_MAX_STREAMS"]
+    )
@@ -0,0 +1,213 @@
+# ----------------------------------------------------------------------------#
+# Show partitions.
+# ----------------------------------------------------------------------------#
+# On PostgreSQL ``show`` is range partitioned by month on start_time
+# (show_pYYYY_MM, plus show_default for anything outside them), so upcoming
+# show queries only visit the current and future partitions. Partitions have
+# to exist before shows are booked into them and old ones can be detached
+# into an archive schema (or dropped) once their shows no longer need to be
+# listed: `flask partitions maintain` does both and should run daily.
+# Archiving rebuilds the detail page snapshots listing the archived shows.
+from datetime import date
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from models import db
+import snapshots
+
+PARTITION = re.compile(r"show_(p(\d{4})_(\d{2})|default)$")
+
+
+def is_partition(table_name: str) -> bool:
+    return PARTITION.match(table_name) is not None
+
+
+def add_months(month: date, n: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + n
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"show_p{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return (
+        db.session.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = 'show'::regclass")
+        ).scalar()
+        == "p"
+    )
+
+
+def monthly_partitions() -> dict:
+    """{first day of month: partition name} currently attached to show."""
+    names = db.session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'show'::regclass"
+        )
+    ).scalars()
+    months = {}
+    for name in names:
+        if (match := PARTITION.match(name)) and match.group(2):
+            months[date(int(match.group(2)), int(match.group(3)), 1)] = name
+    return months
+
+
+def create_partition(month: date) -> str:
+    """Attach the partition for ``month``, moving any of its shows out of
+    the default partition."""
+    name, following = partition_name(month), add_months(month, 1)
+    bounds = {"lower": month, "upper": following}
+    stray = db.session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM show_default "
+            "WHERE start_time >= :lower AND start_time < :upper)"
+        ),
+        bounds,
+    ).scalar()
+    create = (
+        f"CREATE TABLE {name} PARTITION OF show "
+        f"FOR VALUES FROM ('{month}') TO ('{following}')"
+    )
+    if not stray:
+        db.session.execute(text(create))
+        return name
+
+    # the new partition's range must not overlap rows left in the default one
+    db.session.execute(text("ALTER TABLE show DETACH PARTITION show_default"))
+    db.session.execute(text(create))
+    db.session.execute(
+        text(
+            "WITH moved AS ("
+            " DELETE FROM show_default"
+            " WHERE start_time >= :lower AND start_time < :upper RETURNING *"
+            ") INSERT INTO show SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    db.session.execute(text("ALTER TABLE show ATTACH PARTITION show_default DEFAULT"))
+    return name
+
+
+def ensure(ahead: int) -> list:
+    """Create the missing partitions from this month to ``ahead`` months out."""
+    existing = monthly_partitions()
+    month = date.today().replace(day=1)
+    created = []
+    for _ in range(ahead + 1):
+        if month not in existing:
+            created.append(create_partition(month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive(retain: int, schema=None, batch=500) -> list:
+    """Detach partitions that ended more than ``retain`` months ago, moving
+    them into ``schema`` or dropping them when it is None.
+
+    The detail page snapshots of the venues and artists that had shows in
+    them are rebuilt in the same transaction, so the archived shows leave
+    the pages (and `flask snapshots verify` stays clean).
+    """
+    cutoff = add_months(date.today().replace(day=1), -retain)
+    archived = []
+    stale = {"venue": set(), "artist": set()}
+    for month, name in sorted(monthly_partitions().items()):
+        if add_months(month, 1) > cutoff:
+            break
+        owners = db.session.execute(
+            text(f"SELECT DISTINCT venue_id, artist_id FROM {name}")
+        )
+        for venue_id, artist_id in owners:
+            stale["venue"].add(venue_id)
+            stale["artist"].add(artist_id)
+        db.session.execute(text(f"ALTER TABLE show DETACH PARTITION {name}"))
+        if schema:
+            db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            db.session.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+        else:
+            db.session.execute(text(f"DROP TABLE {name}"))
+        archived.append(name)
+
+    for kind, ids in stale.items():
+        ids = sorted(ids)
+        for start in range(0, len(ids), batch):
+            snapshots.refresh({kind: ids[start : start + batch]})
+    return archived
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+partitions_cli = AppGroup("partitions", help="Monthly partitions of the show table.")
+
+
+def _require_partitioned():
+    if not is_partitioned():
+        raise click.ClickException("show is only partitioned on PostgreSQL")
+
+
+@partitions_cli.command("list")
+def list_command():
+    """List the monthly partitions with their estimated row counts."""
+    _require_partitioned()
+    rows = db.session.execute(
+        text(
+            "SELECT c.relname, c.reltuples::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'show'::regclass ORDER BY c.relname"
+        )
+    )
+    for name, estimate in rows:
+        click.echo(f"{name:<16}{max(estimate, 0):>12}")
+
+
+@partitions_cli.command("ensure")
+@click.option("--ahead", type=int, help="Defaults to SHOW_PARTITIONS_AHEAD.")
+def ensure_command(ahead):
+    """Create partitions for the coming months."""
+    _require_partitioned()
+    config = current_app.config
+    created = ensure(ahead if ahead is not None else config["SHOW_PARTITIONS_AHEAD"])
+    db.session.commit()
+    click.echo(f"created {len(created)} partition(s) {' '.join(created)}")
+
+
+@partitions_cli.command("archive")
+@click.option("--retain", type=int, help="Defaults to SHOW_PARTITIONS_RETAIN.")
+@click.option("--drop", is_flag=True, help="Drop the partitions instead.")
+def archive_command(retain, drop):
+    """Detach old partitions into the SHOW_ARCHIVE_SCHEMA schema."""
+    _require_partitioned()
+    config = current_app.config
+    archived = archive(
+        retain if retain is not None else config["SHOW_PARTITIONS_RETAIN"],
+        None if drop else config["SHOW_ARCHIVE_SCHEMA"],
+    )
+    db.session.commit()
+    verb = "dropped" if drop else f"archived to {config['SHOW_ARCHIVE_SCHEMA']}"
+    click.echo(f"{verb} {len(archived)} partition(s) {' '.join(archived)}")
+
+
+@partitions_cli.command("maintain")
+def maintain_command():
+    """Create upcoming partitions and archive expired ones (run daily)."""
+    _require_partitioned()
+    config = current_app.config
+    created = ensure(config["SHOW_PARTITIONS_AHEAD"])
+    archived = archive(config["SHOW_PARTITIONS_RETAIN"], config["SHOW_ARCHIVE_SCHEMA"])
+    db.session.commit()
+    click.echo(f"created {len(created)}, archived {len(archived)} partition(s)")
+
+
+def init_app(app):
+    app.cli.add_command(partitions_cli)
@@ -0,0 +1,419 @@
+# ----------------------------------------------------------------------------#
+# Query plan regression checks.
+# ----------------------------------------------------------------------------#
+# `flask plans seed` fills an empty (disposable) database with generated
+# venues, artists and shows at a given scale. `flask plans record` then
+# requests every read view once, captures the SELECTs each one runs and
+# stores their plans from EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) with a
+# summary (cost, time, buffers, sequentially scanned tables, worst row
+# estimate error) in PLANS_BASELINE. `flask plans check` captures them again
+# and fails on regressions: new sequential scans, row estimates that became
+# more than PLANS_ROW_ERROR times off, cost (or time) increases beyond the
+# thresholds and views running more queries than they used to.
+#
+# Plans are meant to be compared on PostgreSQL. On SQLite, EXPLAIN QUERY
+# PLAN only tells full scans apart, so only those and query counts are
+# checked there.
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, insert, select, text
+
+import dedup
+from enums import Genres
+import geo
+from models import Artist, Change, Show, Venue, db
+import partitions
+import snapshots
+
+WORDS = ["Blue", "Note", "Musical", "Hop", "Park", "Square", "Live", "Velvet"]
+WORDS += ["Dueling", "Pianos", "Red", "Rock", "Garden", "Jazz", "Petals", "Guns"]
+KINDS = ["Bar", "Club", "Hall", "Lounge", "Theatre", "Cafe", "Band", "Trio"]
+BATCH = 5000
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+
+#  Seeding
+#  ----------------------------------------------------------------
+
+
+def _entity(rng, i, area):
+    city, state = area[:2]
+    return {
+        "name": f"{' '.join(rng.sample(WORDS, 2))} {rng.choice(KINDS)} {i}",
+        "genres": rng.sample([g.value for g in Genres], rng.randint(1, 3)),
+        "city": city,
+        "state": state,
+        "phone": f"{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04}",
+        "image_link": f"https://images.example.com/{i}.jpg",
+    }
+
+
+def seed(scale: int, random_seed=42) -> dict:
+    """Insert ``scale`` venues and artists with ten shows per venue spread
+    over a year either side of today, plus their change rows, blocking keys
+    and snapshots. Returns the row counts."""
+    rng = random.Random(random_seed)
+    areas = [
+        (f"City {i}", state, rng.uniform(25, 49), rng.uniform(-124, -67))
+        for i in range(max(scale // 50, 1))
+        for state in ("CA", "NY", "TX")
+    ]
+    for start in range(0, scale, BATCH):
+        venues, artists = [], []
+        for i in range(start, min(start + BATCH, scale)):
+            area = rng.choice(areas)
+            lat = area[2] + rng.uniform(-0.2, 0.2)
+            lon = area[3] + rng.uniform(-0.2, 0.2)
+            venues.append(
+                {
+                    **_entity(rng, i, area),
+                    "address": f"{i} Main Street",
+                    "seeking_talent": rng.random() < 0.3,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "geohash": geo.geohash_encode(lat, lon),
+                }
+            )
+            artists.append(
+                {
+                    **_entity(rng, i, rng.choice(areas)),
+                    "seeking_venue": rng.random() < 0.3,
+                }
+            )
+        db.session.execute(insert(Venue), venues)
+        db.session.execute(insert(Artist), artists)
+
+    venue_ids = db.session.scalars(select(Venue.id)).all()
+    artist_ids = db.session.scalars(select(Artist.id)).all()
+    now = datetime.now()
+    for start in range(0, scale * 10, BATCH):
+        shows = [
+            {
+                "venue_id": rng.choice(venue_ids),
+                "artist_id": rng.choice(artist_ids),
+                "start_time": now + timedelta(minutes=rng.randint(-525600, 525600)),
+                "updated_at": now,
+            }
+            for _ in range(start, min(start + BATCH, scale * 10))
+        ]
+        db.session.execute(insert(Show), shows)
+    db.session.execute(
+        insert(Change),
+        [
+            {"kind": "venue", "entity_id": id, "op": "create", "created_at": now}
+            for id in venue_ids
+        ],
+    )
+
+    for kind, ids in (("venue", venue_ids), ("artist", artist_ids)):
+        dedup.index(kind)
+        for start in range(0, len(ids), BATCH):
+            snapshots.refresh({kind: ids[start : start + BATCH]})
+    db.session.commit()
+    return {"venues": scale, "artists": scale, "shows": scale * 10}
+
+
+#  Capturing
+#  ----------------------------------------------------------------
+
+
+def _get(path):
+    return lambda client, ids: client.get(path.format(**ids))
+
+
+def _post(path, **data):
+    return lambda client, ids: client.post(path.format(**ids), data=data)
+
+
+# name -> fn(test client, sample ids) running one view, or the part of a
+# write that reads
+CASES = {
+    "home": _get("/"),
+    "venues": _get("/venues"),
+    "venue": _get("/venues/{venue}"),
+    "venue_edit": _get("/venues/{venue}/edit"),
+    "venue_search": _post("/venues/search", search_term="hop"),
+    "venues_nearby": _get("/api/venues/nearby?lat=37.78&lon=-122.41&radius=50"),
+    "venue_matches": _get("/api/venues/{venue}/matches"),
+    "artists": _get("/artists"),
+    "artist": _get("/artists/{artist}"),
+    "artist_edit": _get("/artists/{artist}/edit"),
+    "artist_search": _post("/artists/search", search_term="petals"),
+    "shows": _get("/shows"),
+    # the rows are only read as the page is sent
+    "shows_streamed": lambda client, ids: client.get("/shows?stream=1").get_data(),
+    "changes": _get("/changes?after=0"),
+    "dedup_find": lambda client, ids: dedup.find(
+        "venue", "Musical Hop Bar", "City 1", "CA"
+    ),
+    "snapshot_build": lambda client, ids: snapshots.build("venue", [ids["venue"]]),
+}
+
+
+def samples() -> dict:
+    """The venue and artist with the most shows, so detail pages are the
+    heaviest ones."""
+    ids = {}
+    for kind in ("venue", "artist"):
+        column = getattr(Show, f"{kind}_id")
+        ids[kind] = db.session.scalar(
+            select(column).group_by(column).order_by(func.count().desc(), column)
+        )
+    return ids
+
+
+def capture(app, names=None) -> dict:
+    """{case: [(statement, parameters)]} of the SELECTs each case runs."""
+    ids = samples()
+    db.session.close()
+    client = app.test_client()
+    captured = {}
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if statement.split(None, 1)[0].upper() in ("SELECT", "WITH"):
+            current.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", collect)
+    try:
+        for name, fn in CASES.items():
+            if names and name not in names:
+                continue
+            current = captured[name] = []
+            fn(client, ids)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", collect)
+    return captured
+
+
+#  Explaining
+#  ----------------------------------------------------------------
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def summarize(plan) -> dict:
+    """Cost, time, buffers, seq scanned tables and the worst row estimate
+    error (estimated vs. actual, either way) of a PostgreSQL JSON plan."""
+    root = plan["Plan"]
+    nodes = list(_nodes(root))
+    row_error = 1.0
+    for node in nodes:
+        if node.get("Actual Loops"):
+            estimated, actual = node["Plan Rows"], node["Actual Rows"]
+            row_error = max(
+                row_error, max(estimated, actual) / max(min(estimated, actual), 1)
+            )
+    return {
+        "cost": root["Total Cost"],
+        "time_ms": plan.get("Execution Time"),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "seq_scans": sorted(
+            {n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}
+        ),
+        "row_error": round(row_error, 1),
+    }
+
+
+def explain(statement, parameters) -> tuple:
+    """(plan, summary) of one captured statement."""
+    conn = db.session.connection()
+    if db.engine.dialect.name == "postgresql":
+        (plan,) = conn.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+        ).scalar()
+        return plan, summarize(plan)
+
+    plan = [
+        row[-1]
+        for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    ]
+    start = time.perf_counter()
+    conn.exec_driver_sql(statement, parameters).fetchall()
+    elapsed = (time.perf_counter() - start) * 1000
+    scans = {m.group(1) for line in plan if (m := SCAN.match(line.strip()))}
+    summary = {
+        "cost": None,
+        "time_ms": round(elapsed, 3),
+        "buffers": None,
+        "seq_scans": sorted(scans),
+        "row_error": None,
+    }
+    return plan, summary
+
+
+def _key(statement, seen) -> str:
+    digest = hashlib.sha1(statement.encode()).hexdigest()[:12]
+    seen[digest] = seen.get(digest, 0) + 1
+    return digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+
+
+def run(app, names=None) -> dict:
+    """Capture and explain every case, as stored in PLANS_BASELINE."""
+    views = {}
+    for name, statements in capture(app, names).items():
+        seen, queries = {}, []
+        for statement, parameters in statements:
+            plan, summary = explain(statement, parameters)
+            queries.append(
+                {
+                    "key": _key(statement, seen),
+                    "sql": statement,
+                    "summary": summary,
+                    "plan": plan,
+                }
+            )
+        db.session.rollback()
+        views[name] = queries
+    return {
+        "dialect": db.engine.dialect.name,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": {
+            "venues": db.session.scalar(select(func.count(Venue.id))),
+            "shows": db.session.scalar(select(func.count(Show.id))),
+        },
+        "views": views,
+    }
+
+
+#  Comparing
+#  ----------------------------------------------------------------
+
+
+def compare(baseline, current, config) -> list:
+    """Human-readable regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for name, queries in current["views"].items():
+        if name not in baseline["views"]:
+            continue
+        before = {q["key"]: q["summary"] for q in baseline["views"][name]}
+        if len(queries) > len(before):
+            regressions.append(f"{name}: {len(queries)} queries, was {len(before)}")
+        for query in queries:
+            now, was = query["summary"], before.get(query["key"])
+            label = f"{name} [{query['key']}]"
+            if was is None:
+                # a new or changed statement, nothing to compare its numbers to
+                if now["seq_scans"]:
+                    regressions.append(
+                        f"{label}: new query scans {', '.join(now['seq_scans'])}"
+                    )
+                continue
+            if added := sorted(set(now["seq_scans"]) - set(was["seq_scans"])):
+                regressions.append(f"{label}: new seq scan on {', '.join(added)}")
+            limit = config["PLANS_ROW_ERROR"]
+            if now["row_error"] and now["row_error"] > max(limit, was["row_error"]):
+                regressions.append(
+                    f"{label}: row estimates off by {now['row_error']}x, "
+                    f"was {was['row_error']}x"
+                )
+            for field, threshold in (
+                ("cost", config["PLANS_COST_THRESHOLD"]),
+                ("time_ms", config["PLANS_TIME_THRESHOLD"]),
+            ):
+                if threshold is None or not now[field] or not was[field]:
+                    continue
+                if now[field] > was[field] * (1 + threshold) and (
+                    field != "time_ms" or now[field] - was[field] >= 1
+                ):
+                    regressions.append(
+                        f"{label}: {field} {now[field]:.2f}, was {was[field]:.2f}"
+                    )
+    return regressions
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+plans_cli = AppGroup("plans", help="Query plan regression checks.")
+
+
+@plans_cli.command("seed")
+@click.option(
+    "--scale", type=int, help="Venues (and artists); defaults to PLANS_SCALE."
+)
+def seed_command(scale):
+    """Fill an empty, disposable database with generated data."""
+    db.create_all()
+    if db.session.scalar(select(Venue.id).limit(1)) is not None:
+        raise click.ClickException("the database already has venues")
+    if partitions.is_partitioned():
+        partitions.ensure(current_app.config["SHOW_PARTITIONS_AHEAD"])
+    start = time.perf_counter()
+    counts = seed(scale or current_app.config["PLANS_SCALE"])
+    if db.engine.dialect.name == "postgresql":
+        # planner statistics as after autovacuum caught up
+        with db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(text("VACUUM ANALYZE"))
+    click.echo(
+        ", ".join(f"{count} {name}" for name, count in counts.items())
+        + f" in {time.perf_counter() - start:.1f} s"
+    )
+
+
+def _report(result):
+    for name, queries in result["views"].items():
+        times = [q["summary"]["time_ms"] or 0 for q in queries]
+        scans = sorted({t for q in queries for t in q["summary"]["seq_scans"]})
+        click.echo(
+            f"{name:<20}{len(queries):>3} queries {sum(times):>9.2f} ms"
+            + (f"  seq scans: {', '.join(scans)}" if scans else "")
+        )
+
+
+@plans_cli.command("record")
+@click.argument("cases", nargs=-1)
+@click.option("--baseline", type=click.Path(), help="Defaults to PLANS_BASELINE.")
+def record_command(cases, baseline):
+    """Store the current plans as the baseline."""
+    path = baseline or current_app.config["PLANS_BASELINE"]
+    result = run(current_app._get_current_object(), cases)
+    _report(result)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=1, default=str)
+    click.echo(f"baseline written to {path}")
+
+
+@plans_cli.command("check")
+@click.argument("cases", nargs=-1)
+@click.option("--baseline", type=click.Path(), help="Defaults to PLANS_BASELINE.")
+def check_command(cases, baseline):
+    """Compare the current plans with the baseline; exits with 1 on
+    regressions."""
+    path = baseline or current_app.config["PLANS_BASELINE"]
+    if not os.path.exists(path):
+        raise click.ClickException(f"no baseline at {path}, run `flask plans record`")
+    with open(path) as f:
+        stored = json.load(f)
+    if stored["dialect"] != db.engine.dialect.name:
+        raise click.ClickException(
+            f"the baseline was recorded on {stored['dialect']}, "
+            f"not {db.engine.dialect.name}"
+        )
+    result = run(current_app._get_current_object(), cases)
+    _report(result)
+    regressions = compare(stored, result, current_app.config)
+    for regression in regressions:
+        click.echo(f"REGRESSION {regression}")
+    if regressions:
+        raise click.exceptions.Exit(1)
+    click.echo("no plan regressions")
+
+
+def init_app(app):
+    app.cli.add_command(plans_cli)
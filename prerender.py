@@ -0,0 +1,189 @@
+# ----------------------------------------------------------------------------#
+# Static pre-rendering.
+# ----------------------------------------------------------------------------#
+# Renders the public read pages to PRERENDER_DIR as <url path>.html
+# (/venues -> venues.html, /venues/5 -> venues/5.html) so a front-end web
+# server can serve them directly and fall back to Flask for anything else.
+# `flask prerender` renders everything; with PRERENDER_ON_WRITE the pages a
+# committed write affects are re-rendered in the background. Files are
+# written to a temporary name and renamed, so readers never see partial
+# pages.
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import click
+from flask import current_app, render_template, request
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+import matching
+from models import Artist, Show, Venue, db
+import outbox
+import projections
+import snapshots
+
+LISTINGS = ["/venues", "/artists", "/shows"]
+
+# one writer thread per process keeps renders of the same page in order
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prerender")
+
+
+#  Pages
+#  ----------------------------------------------------------------
+
+
+def _venue(venue_id):
+    if data := snapshots.page("venue", venue_id):
+        matches = matching.suggest("venue", venue_id)
+        return render_template("pages/show_venue.html", venue=data, matches=matches)
+    return None
+
+
+def _artist(artist_id):
+    if data := snapshots.page("artist", artist_id):
+        matches = matching.suggest("artist", artist_id)
+        return render_template("pages/show_artist.html", artist=data, matches=matches)
+    return None
+
+
+# endpoint -> fn(**view_args) returning the page's HTML, or None if it is gone
+PAGES = {
+    "venues.venues": lambda: render_template(
+        "pages/venues.html", areas=projections.venue_areas()
+    ),
+    "artists.artists": lambda: render_template(
+        "pages/artists.html", artists=projections.artist_items()
+    ),
+    "shows.shows": lambda: render_template(
+        "pages/shows.html", shows=projections.show_tiles()
+    ),
+    "venues.show_venue": _venue,
+    "artists.show_artist": _artist,
+}
+
+
+def file_for(root, path) -> str:
+    return os.path.join(root, path.strip("/") + ".html")
+
+
+def render(app, path) -> bool:
+    """(Re-)render the page at URL ``path``, removing its file when the page
+    no longer exists. Returns whether a file was written."""
+    with app.test_request_context(path):
+        html = PAGES[request.url_rule.endpoint](**request.view_args)
+
+    target = file_for(app.config["PRERENDER_DIR"], path)
+    if html is None:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp, target)
+    return True
+
+
+def render_all(app) -> int:
+    """Render every listing and detail page and remove files of venues or
+    artists that no longer exist."""
+    root = app.config["PRERENDER_DIR"]
+    paths = list(LISTINGS)
+    for kind, model in (("venues", Venue), ("artists", Artist)):
+        ids = [id for (id,) in db.session.query(model.id).order_by(model.id)]
+        paths += [f"/{kind}/{id}" for id in ids]
+        current = {f"{id}.html" for id in ids}
+        if os.path.isdir(os.path.join(root, kind)):
+            for name in os.listdir(os.path.join(root, kind)):
+                if name.endswith(".html") and name not in current:
+                    os.remove(os.path.join(root, kind, name))
+    return sum(render(app, path) for path in paths)
+
+
+#  Incremental updates
+#  ----------------------------------------------------------------
+
+
+def affected_paths(op, kind, ids) -> set:
+    """Pages showing any of the ``kind`` rows ``ids``: their own pages, the
+    listing, and pages whose show tiles display them."""
+    with db.session.no_autoflush:
+        if kind == "show":
+            paths = {"/shows"}
+            rows = db.session.query(Show.venue_id, Show.artist_id).filter(
+                Show.id.in_(ids)
+            )
+            for venue_id, artist_id in rows:
+                paths |= {f"/venues/{venue_id}", f"/artists/{artist_id}"}
+            return paths
+
+        paths = {f"/{kind}s"} | {f"/{kind}s/{id}" for id in ids}
+        if op != "create":
+            # show tiles carry venue and artist names and images
+            other = "artist" if kind == "venue" else "venue"
+            rows = (
+                db.session.query(getattr(Show, f"{other}_id"))
+                .filter(getattr(Show, f"{kind}_id").in_(ids))
+                .distinct()
+            )
+            paths |= {f"/{other}s/{id}" for (id,) in rows} | {"/shows"}
+    return paths
+
+
+@outbox.subscriber
+def collect(op, kind, ids):
+    if current_app.config["PRERENDER_ON_WRITE"]:
+        paths, shows = db.session.info.setdefault("prerender", (set(), set()))
+        paths |= affected_paths(op, kind, ids)
+        if kind == "show" and op == "update":
+            # the pages of the venue/artist an updated show may have moved to
+            shows.update(ids)
+
+
+@event.listens_for(db.session, "after_commit")
+def render_committed(session):
+    if pending := session.info.pop("prerender", None):
+        app = current_app._get_current_object()
+        _executor.submit(_render_paths, app, *pending)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def discard_rolled_back(session, previous_transaction):
+    session.info.pop("prerender", None)
+
+
+def _render_paths(app, paths, shows=()):
+    with app.app_context():
+        try:
+            if shows:
+                paths = paths | affected_paths("update", "show", shows)
+            for path in sorted(paths):
+                render(app, path)
+        except Exception:
+            app.logger.exception("pre-rendering failed")
+        finally:
+            db.session.remove()
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+
+@click.command("prerender")
+@with_appcontext
+def prerender_command():
+    """Render the public pages to PRERENDER_DIR."""
+    app = current_app._get_current_object()
+    start = time.perf_counter()
+    count = render_all(app)
+    click.echo(
+        f"rendered {count} page(s) to {app.config['PRERENDER_DIR']} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+
+
+def init_app(app):
+    app.cli.add_command(prerender_command)
@@ -0,0 +1,241 @@
+# ----------------------------------------------------------------------------#
+# Request profiling.
+# ----------------------------------------------------------------------------#
+# A request sends `X-Profile: <PROFILE_TOKEN>` (or `?profile=<token>`) to be
+# profiled, and PROFILE_SAMPLE_RATE profiles that fraction of all requests.
+# A profiled request's thread is sampled every PROFILE_INTERVAL seconds by a
+# helper thread; the stacks are saved to PROFILE_DIR as collapsed stacks
+# (for flamegraph.pl / speedscope) and an SVG flamegraph, listed with a
+# SQL / ORM / template breakdown on PROFILE_DIR/index.html. Without a token
+# and with a zero sample rate no hooks are installed at all.
+from collections import Counter
+from datetime import datetime
+import hmac
+import html
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+
+from flask import g, request
+
+# a sample counts towards the innermost frame matching one of these
+CATEGORIES = [
+    ("sql", ("sqlalchemy/engine/", "psycopg2", "sqlite3")),
+    ("orm", ("sqlalchemy/orm/",)),
+    ("templates", ("jinja2/", ".html")),
+]
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    for marker in ("site-packages/", "templates/"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path})"
+
+
+class Sampler:
+    """Samples the stack of one thread from a helper thread."""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def categorize(stacks: Counter) -> dict:
+    """Share of samples per CATEGORIES entry (plus "other")."""
+    totals = Counter()
+    for stack, count in stacks.items():
+        category = "other"
+        for frame in reversed(stack.split(";")):
+            category = next(
+                (
+                    name
+                    for name, markers in CATEGORIES
+                    if any(m in frame for m in markers)
+                ),
+                None,
+            )
+            if category:
+                break
+        totals[category or "other"] += count
+    samples = sum(totals.values()) or 1
+    return {name: totals[name] / samples for name in [*dict(CATEGORIES), "other"]}
+
+
+def flamegraph(stacks: Counter, width=1200, row=16) -> str:
+    """A minimal SVG flamegraph: frame width is proportional to samples."""
+    root = {"children": {}, "count": 0}
+    for stack, count in stacks.items():
+        node = root
+        root["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"children": {}, "count": 0})
+            node["count"] += count
+
+    rects, depth = [], 0
+    todo = [(child, name, 0, 0.0) for name, child in root["children"].items()]
+    while todo:
+        node, name, level, x = todo.pop()
+        w = node["count"] / (root["count"] or 1) * width
+        depth = max(depth, level + 1)
+        rects.append((name, node["count"], level, x, w))
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            todo.append((child, child_name, level + 1, child_x))
+            child_x += child["count"] / root["count"] * width
+
+    height = depth * row
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        'font-family="monospace" font-size="11">'
+    ]
+    for name, count, level, x, w in rects:
+        if w < 0.5:
+            continue
+        y = height - (level + 1) * row
+        hue = 10 + zlib.crc32(name.encode()) % 40
+        label = html.escape(name)
+        text = label[: int(w / 7)] if w > 21 else ""
+        parts.append(
+            f"<g><title>{label} ({count} samples)</title>"
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+            f'fill="hsl({hue},90%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + row - 4}">{text}</text></g>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def save(directory, name, stacks, meta) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{name}.collapsed"), "w") as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in stacks.items())
+    with open(os.path.join(directory, f"{name}.svg"), "w") as f:
+        f.write(flamegraph(stacks))
+    with open(os.path.join(directory, f"{name}.meta"), "w") as f:
+        f.write("\t".join(str(value) for value in meta))
+
+
+def write_index(directory, keep) -> None:
+    """Prune to the ``keep`` newest profiles and rewrite index.html."""
+    names = sorted(
+        (
+            entry[: -len(".meta")]
+            for entry in os.listdir(directory)
+            if entry.endswith(".meta")
+        ),
+        reverse=True,
+    )
+    for name in names[keep:]:
+        for suffix in (".meta", ".collapsed", ".svg"):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+    rows = []
+    for name in names[:keep]:
+        with open(os.path.join(directory, f"{name}.meta")) as f:
+            when, method, path, status, ms, samples, *shares = f.read().split("\t")
+        breakdown = " ".join(
+            f"{category} {float(share):.0%}"
+            for (category, _), share in zip([*CATEGORIES, ("other", ())], shares)
+        )
+        rows.append(
+            f"<tr><td>{when}</td><td>{method} {html.escape(path)}</td><td>{status}</td>"
+            f"<td>{ms} ms</td><td>{samples}</td><td>{breakdown}</td>"
+            f'<td><a href="{name}.svg">flamegraph</a> '
+            f'<a href="{name}.collapsed">collapsed</a></td></tr>'
+        )
+    tmp = os.path.join(directory, f"index.html.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(
+            "<!doctype html><title>Profiles</title><table>"
+            "<tr><th>time</th><th>request</th><th>status</th><th>duration</th>"
+            "<th>samples</th><th>breakdown</th><th></th></tr>"
+            + "\n".join(rows)
+            + "</table>"
+        )
+    os.replace(tmp, os.path.join(directory, "index.html"))
+
+
+def init_app(app):
+    config = app.config
+    token = config["PROFILE_TOKEN"]
+    rate = config["PROFILE_SAMPLE_RATE"]
+    if not token and not rate:
+        return
+    lock = threading.Lock()
+
+    def requested() -> bool:
+        given = request.headers.get("X-Profile") or request.args.get("profile")
+        # bytes: compare_digest rejects str with non-ASCII characters
+        return bool(
+            token and given and hmac.compare_digest(given.encode(), token.encode())
+        )
+
+    @app.before_request
+    def start_profile():
+        if (rate and random.random() < rate) or requested():
+            g.sampler = Sampler(threading.get_ident(), config["PROFILE_INTERVAL"])
+            g.sampler.start()
+
+    @app.after_request
+    def save_profile(response):
+        sampler = g.pop("sampler", None)
+        if sampler is None:
+            return response
+        stacks = sampler.stop()
+        now = datetime.now()
+        name = f"{now:%Y%m%d-%H%M%S-%f}-{request.endpoint or 'none'}"
+        shares = categorize(stacks).values()
+        meta = [
+            f"{now:%Y-%m-%d %H:%M:%S}",
+            request.method,
+            # the query string may carry the profile token
+            request.path,
+            response.status_code,
+            round(sampler.elapsed * 1000, 1),
+            sum(stacks.values()),
+            *shares,
+        ]
+        directory = config["PROFILE_DIR"]
+        try:
+            with lock:
+                save(directory, name, stacks, meta)
+                write_index(directory, config["PROFILE_KEEP"])
+            response.headers["X-Profile-Id"] = name
+        except OSError:
+            app.logger.exception("saving the profile failed")
+        return response
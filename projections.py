@@ -0,0 +1,185 @@
+# ----------------------------------------------------------------------------#
+# Read models.
+# ----------------------------------------------------------------------------#
+# Column-projected queries for the read-only pages. They return plain
+# namedtuples instead of hydrating ORM entities, skipping the identity map and
+# attribute instrumentation entirely.
+from collections import namedtuple
+from datetime import datetime
+
+from models import Artist, Show, Venue, db
+
+
+NamedItem = namedtuple("NamedItem", "id name")
+VenueItem = namedtuple("VenueItem", "id name city state")
+VenueDetail = namedtuple(
+    "VenueDetail",
+    "id name genres address city state phone website facebook_link "
+    "seeking_talent seeking_description image_link version",
+)
+ArtistDetail = namedtuple(
+    "ArtistDetail",
+    "id name genres city state phone website facebook_link "
+    "seeking_venue seeking_description image_link version",
+)
+ShowTile = namedtuple(
+    "ShowTile",
+    "id updated_at start_time venue_id venue_name venue_image_link "
+    "artist_id artist_name artist_image_link",
+)
+
+
+def _columns(model, record):
+    return [getattr(model, field) for field in record._fields]
+
+
+def _project(record, query) -> list:
+    return [record._make(row) for row in query]
+
+
+def _first(record, query):
+    row = query.first()
+    return record._make(row) if row else None
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+
+def venue_areas() -> list:
+    """Venues grouped by (city, state), as consumed by pages/venues.html."""
+    query = db.session.query(*_columns(Venue, VenueItem)).order_by(
+        Venue.city, Venue.state, Venue.id
+    )
+    areas = []
+    for venue in _project(VenueItem, query):
+        if not areas or (areas[-1]["city"], areas[-1]["state"]) != (
+            venue.city,
+            venue.state,
+        ):
+            areas.append({"city": venue.city, "state": venue.state, "venues": []})
+        areas[-1]["venues"].append(venue)
+    return areas
+
+
+def search_venues(term: str) -> list:
+    query = db.session.query(Venue.id, Venue.name).filter(
+        Venue.name.ilike(f"%{term}%")
+    )
+    return _project(NamedItem, query)
+
+
+def venue_detail(venue_id):
+    query = db.session.query(*_columns(Venue, VenueDetail)).filter(
+        Venue.id == venue_id
+    )
+    return _first(VenueDetail, query)
+
+
+def venue_page(venue_id):
+    """Everything pages/show_venue.html renders, or None."""
+    if venue := venue_detail(venue_id):
+        return detail_page(
+            venue, venue_shows(venue_id, True), venue_shows(venue_id, False)
+        )
+    return None
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+
+def artist_items() -> list:
+    return _project(NamedItem, db.session.query(Artist.id, Artist.name))
+
+
+def iter_artist_items(batch: int):
+    """Every artist, fetched ``batch`` rows at a time."""
+    return _stream(NamedItem, db.session.query(Artist.id, Artist.name), batch)
+
+
+def search_artists(term: str) -> list:
+    query = db.session.query(Artist.id, Artist.name).filter(
+        Artist.name.ilike(f"%{term}%")
+    )
+    return _project(NamedItem, query)
+
+
+def artist_detail(artist_id):
+    query = db.session.query(*_columns(Artist, ArtistDetail)).filter(
+        Artist.id == artist_id
+    )
+    return _first(ArtistDetail, query)
+
+
+def artist_page(artist_id):
+    """Everything pages/show_artist.html renders, or None."""
+    if artist := artist_detail(artist_id):
+        return detail_page(
+            artist, artist_shows(artist_id, True), artist_shows(artist_id, False)
+        )
+    return None
+
+
+def detail_page(record, upcoming_shows, past_shows) -> dict:
+    """The dict the venue and artist detail templates render."""
+    return {
+        **record._asdict(),
+        "upcoming_shows": upcoming_shows,
+        "upcoming_shows_count": len(upcoming_shows),
+        "past_shows": past_shows,
+        "past_shows_count": len(past_shows),
+    }
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+
+def _stream(record, query, batch):
+    # rows are fetched ``batch`` at a time (a server-side cursor on
+    # PostgreSQL), so only one batch is ever held in memory
+    for row in query.execution_options(yield_per=batch):
+        yield record._make(row)
+
+
+def _show_tiles_query(*criteria):
+    return (
+        db.session.query(
+            Show.id,
+            Show.updated_at,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name,
+            Venue.image_link,
+            Show.artist_id,
+            Artist.name,
+            Artist.image_link,
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .filter(*criteria)
+    )
+
+
+def show_tiles(*criteria) -> list:
+    """Show tiles joined with their venue and artist in a single query."""
+    return _project(ShowTile, _show_tiles_query(*criteria))
+
+
+def iter_show_tiles(batch: int):
+    """Every show tile, fetched ``batch`` rows at a time."""
+    return _stream(ShowTile, _show_tiles_query(), batch)
+
+
+def venue_shows(venue_id, upcoming: bool) -> list:
+    return show_tiles(Show.venue_id == venue_id, _when(upcoming))
+
+
+def artist_shows(artist_id, upcoming: bool) -> list:
+    return show_tiles(Show.artist_id == artist_id, _when(upcoming))
+
+
+def _when(upcoming: bool):
+    now = datetime.now()
+    return Show.start_time > now if upcoming else Show.start_time < now
@@ -0,0 +1,145 @@
+# ----------------------------------------------------------------------------#
+# Rate limiting and admission control.
+# ----------------------------------------------------------------------------#
+# RATELIMITS gives endpoints a token bucket per client: a key listed in
+# API_KEYS sent as X-API-Key gets its own, everyone else is limited by IP.
+# "30/minute" holds 30 tokens refilled evenly over a minute, each request
+# takes one and an empty bucket answers 429 with Retry-After. Buckets live in
+# this process ("memory://") or in Redis ("redis://...") so that all workers
+# share them. Independently, at most ADMISSION_MAX_CONCURRENT requests per
+# worker run the ADMISSION_ROUTES at once; the rest are shed with 503, which
+# keeps threads free for the cheap pages during a search storm.
+from collections import OrderedDict
+import hashlib
+import math
+from threading import BoundedSemaphore, Lock
+import time
+
+from flask import g, request
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit: str):
+    """Parse "30/minute" into (capacity 30, refill rate in tokens/second)."""
+    count, _, period = limit.partition("/")
+    seconds = PERIODS[period.strip().rstrip("s")]
+    capacity = int(count)
+    return capacity, capacity / seconds
+
+
+class MemoryBackend:
+    """Token buckets in this process. Each worker limits on its own, so the
+    effective limit is multiplied by the number of workers."""
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key, capacity, rate) -> float:
+        """Take a token; returns 0 or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # least recently used buckets were full again long ago anyway
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBackend:
+    """Token buckets shared by every worker, updated atomically by a script
+    running on the Redis clock."""
+
+    SCRIPT = """
+    local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url):
+        import redis  # optional, only needed for shared buckets
+
+        self._take = redis.Redis.from_url(url).register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate) -> float:
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[capacity, rate]))
+
+
+def backend_for(url: str):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"unsupported RATELIMIT_STORAGE '{url}'")
+
+
+def _digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def client_key(api_keys=frozenset()) -> str:
+    """The bucket owner: a registered API key (``api_keys`` holds their
+    digests), else the client IP. Unknown keys are ignored, as a fresh one per
+    request would otherwise get a full bucket every time."""
+    if api_key := request.headers.get("X-API-Key"):
+        if (digest := _digest(api_key)) in api_keys:
+            return f"key:{digest}"
+    return f"ip:{request.remote_addr}"
+
+
+def init_app(app):
+    config = app.config
+    limits = {
+        endpoint: parse_limit(limit) for endpoint, limit in config["RATELIMITS"].items()
+    }
+    backend = backend_for(config["RATELIMIT_STORAGE"])
+    api_keys = frozenset(_digest(key) for key in config["API_KEYS"])
+    admission = BoundedSemaphore(config["ADMISSION_MAX_CONCURRENT"])
+    expensive = set(config["ADMISSION_ROUTES"])
+    app.extensions["ratelimit"] = backend
+
+    @app.before_request
+    def limit_request():
+        if request.endpoint in limits:
+            capacity, rate = limits[request.endpoint]
+            try:
+                wait = backend.take(
+                    f"{request.endpoint}:{client_key(api_keys)}", capacity, rate
+                )
+            except Exception:
+                # an unreachable bucket store must not take the site down
+                app.logger.exception("rate limit backend failed")
+                wait = 0
+            if wait:
+                raise TooManyRequests(retry_after=math.ceil(wait))
+
+        if request.endpoint in expensive:
+            if not admission.acquire(timeout=config["ADMISSION_QUEUE_TIMEOUT"]):
+                raise ServiceUnavailable(retry_after=config["ADMISSION_RETRY_AFTER"])
+            g.admitted = True
+
+    @app.teardown_request
+    def release_admission(exc):
+        if g.pop("admitted", False):
+            admission.release()
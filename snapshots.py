@@ -0,0 +1,328 @@
+# ----------------------------------------------------------------------------#
+# Detail page snapshots.
+# ----------------------------------------------------------------------------#
+# Every venue and artist has a row in the snapshot table holding the data
+# its detail page renders: the record itself and all of its shows as tiles
+# (JSONB on PostgreSQL). A detail page is then one primary key read; the
+# split into upcoming and past shows happens when the snapshot is read.
+#
+# Snapshots are rebuilt in the writing transaction, right before it commits,
+# for every venue and artist a recorded change touches: a show's venue and
+# artist (the previous and the new ones of a moved show), and for an edited
+# venue (artist) also the artists (venues) whose show tiles carry its name
+# and image. `flask snapshots verify` compares the
+# stored snapshots with the tables to detect drift, e.g. from writes made
+# outside the outbox, and `--fix` rewrites the ones that differ.
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, event, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Artist, Show, Snapshot, Venue, db
+import outbox
+from projections import ArtistDetail, ShowTile, VenueDetail, detail_page
+
+MODELS = {"venue": (Venue, VenueDetail), "artist": (Artist, ArtistDetail)}
+OTHER = {"venue": "artist", "artist": "venue"}
+UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+#  Building
+#  ----------------------------------------------------------------
+
+
+def _encode_tile(tile) -> dict:
+    return {
+        **tile._asdict(),
+        "updated_at": tile.updated_at.isoformat(),
+        "start_time": tile.start_time.isoformat(),
+    }
+
+
+def _decode_tile(data) -> ShowTile:
+    return ShowTile(
+        **{
+            **data,
+            "updated_at": datetime.fromisoformat(data["updated_at"]),
+            "start_time": datetime.fromisoformat(data["start_time"]),
+        }
+    )
+
+
+def build(kind, ids) -> dict:
+    """{id: snapshot data} of the ``kind`` rows ``ids`` that exist, read
+    with one query joining each record to its shows."""
+    model, detail = MODELS[kind]
+    other = MODELS[OTHER[kind]][0]
+    query = (
+        select(
+            *[getattr(model, field) for field in detail._fields],
+            Show.id,
+            Show.updated_at,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name,
+            Venue.image_link,
+            Show.artist_id,
+            Artist.name,
+            Artist.image_link,
+        )
+        .select_from(model)
+        .outerjoin(Show, getattr(Show, f"{kind}_id") == model.id)
+        .outerjoin(other, getattr(Show, f"{OTHER[kind]}_id") == other.id)
+        .where(model.id.in_(ids))
+        .order_by(model.id, Show.start_time, Show.id)
+    )
+    split = len(detail._fields)
+    snapshots = {}
+    for row in db.session.execute(query):
+        id = row[0]
+        if id not in snapshots:
+            snapshots[id] = {**detail._make(row[:split])._asdict(), "shows": []}
+        if row[split] is not None:
+            snapshots[id]["shows"].append(_encode_tile(ShowTile._make(row[split:])))
+    return snapshots
+
+
+def _upsert(rows):
+    dialect = db.engine.dialect.name
+    if dialect not in UPSERT:
+        keys = {(row["kind"], row["entity_id"]) for row in rows}
+        _delete(keys)
+        db.session.execute(insert(Snapshot), rows)
+        return
+    statement = UPSERT[dialect](Snapshot)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Snapshot.kind, Snapshot.entity_id],
+            set_={
+                "data": statement.excluded.data,
+                "built_at": statement.excluded.built_at,
+            },
+        ),
+        rows,
+    )
+
+
+def _delete(keys):
+    kinds = {}
+    for kind, id in keys:
+        kinds.setdefault(kind, set()).add(id)
+    db.session.execute(
+        delete(Snapshot).where(
+            or_(
+                *(
+                    and_(Snapshot.kind == kind, Snapshot.entity_id.in_(ids))
+                    for kind, ids in kinds.items()
+                )
+            )
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def _lock(stale: dict):
+    # Concurrent writers each build from their own view of the shows, so
+    # whichever commits last would overwrite the other's show. Serialize on
+    # the venue/artist rows (in one order, against deadlocks) and build once
+    # the others committed; NO KEY UPDATE leaves show inserts unblocked
+    for kind in sorted(stale):
+        if ids := sorted(stale[kind]):
+            model = MODELS[kind][0]
+            db.session.execute(
+                select(model.id)
+                .where(model.id.in_(ids))
+                .order_by(model.id)
+                .with_for_update(key_share=True)
+            )
+
+
+def refresh(stale: dict):
+    """Rewrite the snapshots of ``stale`` ({kind: ids}) in the current
+    transaction, dropping those of rows that no longer exist. On PostgreSQL
+    the rows are locked until the commit first."""
+    if db.engine.dialect.name == "postgresql":
+        _lock(stale)
+    now = datetime.now()
+    rows, gone = [], set()
+    for kind, ids in stale.items():
+        if not ids:
+            continue
+        built = build(kind, ids)
+        rows += [
+            {"kind": kind, "entity_id": id, "data": data, "built_at": now}
+            for id, data in built.items()
+        ]
+        gone |= {(kind, id) for id in ids if id not in built}
+    if rows:
+        _upsert(rows)
+    if gone:
+        _delete(gone)
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+
+def page(kind, id):
+    """Everything the ``kind`` detail page renders, or None. Rows without a
+    snapshot yet (before `flask snapshots build`) are built on the fly."""
+    data = db.session.scalar(
+        select(Snapshot.data).where(Snapshot.kind == kind, Snapshot.entity_id == id)
+    )
+    if data is None and (data := build(kind, [id]).get(id)) is None:
+        return None
+    now = datetime.now()
+    shows = [_decode_tile(show) for show in data["shows"]]
+    fields = {key: value for key, value in data.items() if key != "shows"}
+    return detail_page(
+        MODELS[kind][1](**fields),
+        [show for show in shows if show.start_time > now],
+        [show for show in shows if show.start_time < now],
+    )
+
+
+#  Following writes
+#  ----------------------------------------------------------------
+
+
+def _owners(stale, show_ids):
+    rows = db.session.execute(
+        select(Show.venue_id, Show.artist_id).where(Show.id.in_(show_ids))
+    )
+    for venue_id, artist_id in rows:
+        stale["venue"].add(venue_id)
+        stale["artist"].add(artist_id)
+
+
+@outbox.subscriber
+def collect(op, kind, ids):
+    stale = db.session.info.setdefault(
+        "snapshots", {"venue": set(), "artist": set(), "show": set()}
+    )
+    with db.session.no_autoflush:
+        if kind == "show":
+            # the owners before the write, and for updates (which may move
+            # the shows elsewhere) once more at the commit
+            _owners(stale, ids)
+            if op == "update":
+                stale["show"].update(ids)
+            return
+
+        stale[kind].update(ids)
+        if op == "update":
+            # the other kind's show tiles carry this one's name and image
+            other = OTHER[kind]
+            rows = db.session.scalars(
+                select(getattr(Show, f"{other}_id"))
+                .where(getattr(Show, f"{kind}_id").in_(ids))
+                .distinct()
+            )
+            stale[other].update(rows)
+
+
+# ahead of outbox.publish, see there
+@event.listens_for(db.session, "before_commit", insert=True)
+def refresh_collected(session):
+    if stale := session.info.pop("snapshots", None):
+        # deletes still pending in the session must not end up in snapshots
+        session.flush()
+        if shows := stale.pop("show"):
+            _owners(stale, shows)
+        refresh(stale)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def discard_rolled_back(session, previous_transaction):
+    session.info.pop("snapshots", None)
+
+
+#  Verification
+#  ----------------------------------------------------------------
+
+
+def verify(kind, fix=False, batch=500) -> dict:
+    """Compare every stored ``kind`` snapshot with the tables. Counts the
+    rows whose snapshot is missing or differs and the snapshots of rows that
+    no longer exist; with ``fix`` those are rewritten or deleted."""
+    model = MODELS[kind][0]
+    counts = {"checked": 0, "missing": 0, "differing": 0, "orphaned": 0}
+    ids = db.session.scalars(select(model.id).order_by(model.id)).all()
+    for start in range(0, len(ids), batch):
+        chunk = ids[start : start + batch]
+        stored = dict(
+            db.session.execute(
+                select(Snapshot.entity_id, Snapshot.data).where(
+                    Snapshot.kind == kind, Snapshot.entity_id.in_(chunk)
+                )
+            ).all()
+        )
+        drifted = []
+        for id, data in build(kind, chunk).items():
+            counts["checked"] += 1
+            if id not in stored:
+                counts["missing"] += 1
+                drifted.append(id)
+            elif stored[id] != data:
+                counts["differing"] += 1
+                drifted.append(id)
+        if fix and drifted:
+            refresh({kind: drifted})
+            db.session.commit()
+
+    orphans = select(Snapshot.entity_id).where(
+        Snapshot.kind == kind,
+        ~select(model.id).where(model.id == Snapshot.entity_id).exists(),
+    )
+    orphaned = db.session.scalars(orphans).all()
+    counts["orphaned"] = len(orphaned)
+    if fix and orphaned:
+        refresh({kind: orphaned})
+        db.session.commit()
+    return counts
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+snapshots_cli = AppGroup("snapshots", help="Detail page snapshots.")
+KIND = click.Choice(sorted(MODELS))
+
+
+@snapshots_cli.command("build")
+@click.argument("kind", type=KIND, required=False)
+@click.option("--batch", type=int, default=500, show_default=True)
+def build_command(kind, batch):
+    """Rebuild every snapshot (needed once after upgrading)."""
+    for kind in [kind] if kind else sorted(MODELS):
+        model = MODELS[kind][0]
+        ids = db.session.scalars(select(model.id).order_by(model.id)).all()
+        for start in range(0, len(ids), batch):
+            refresh({kind: ids[start : start + batch]})
+            db.session.commit()
+        click.echo(f"{kind}: {len(ids)} snapshot(s)")
+
+
+@snapshots_cli.command("verify")
+@click.argument("kind", type=KIND, required=False)
+@click.option("--fix", is_flag=True, help="Rewrite the snapshots that drifted.")
+@click.option("--batch", type=int, default=500, show_default=True)
+def verify_command(kind, fix, batch):
+    """Detect snapshots that no longer match the tables; exits with 1 when
+    any is found (and not fixed)."""
+    drifted = 0
+    for kind in [kind] if kind else sorted(MODELS):
+        counts = verify(kind, fix=fix, batch=batch)
+        click.echo(
+            f"{kind}: {counts['checked']} checked, {counts['missing']} missing, "
+            f"{counts['differing']} differing, {counts['orphaned']} orphaned"
+        )
+        drifted += counts["missing"] + counts["differing"] + counts["orphaned"]
+    if drifted and not fix:
+        raise click.exceptions.Exit(1)
+
+
+def init_app(app):
+    app.cli.add_command(snapshots_cli)
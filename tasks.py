@@ -0,0 +1,44 @@
+# ----------------------------------------------------------------------------#
+# Job tasks.
+# ----------------------------------------------------------------------------#
+from fragments import invalidate_page
+import geo
+from jobs import task
+import matching
+from models import Artist, Show, Venue, db
+import outbox
+
+
+@task
+def delete_venue(venue_id):
+    shows = [id for (id,) in db.session.query(Show.id).filter_by(venue_id=venue_id)]
+    if Venue.query.filter_by(id=venue_id).count():
+        outbox.record("delete", "show", *shows)
+        outbox.record("delete", "venue", venue_id)
+    Show.query.filter_by(venue_id=venue_id).delete()
+    Venue.query.filter_by(id=venue_id).delete()
+    # only now that the row is gone, so neither refills from it (this
+    # process; the web workers' caches expire on their own)
+    invalidate_page("venue", venue_id)
+    matching.remove("venue", venue_id)
+
+
+@task
+def delete_artist(artist_id):
+    shows = [id for (id,) in db.session.query(Show.id).filter_by(artist_id=artist_id)]
+    if Artist.query.filter_by(id=artist_id).count():
+        outbox.record("delete", "show", *shows)
+        outbox.record("delete", "artist", artist_id)
+    Show.query.filter_by(artist_id=artist_id).delete()
+    Artist.query.filter_by(id=artist_id).delete()
+    invalidate_page("artist", artist_id)
+    matching.remove("artist", artist_id)
+
+
+@task
+def geocode_venues(venue_ids):
+    connection = db.session.connection()
+    for venue in Venue.query.filter(Venue.id.in_(venue_ids)):
+        if point := geo.geocoder(connection, venue.address, venue.city, venue.state):
+            # the before_update hook fills in the geohash
+            venue.latitude, venue.longitude = point
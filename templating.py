@@ -0,0 +1,52 @@
+# ----------------------------------------------------------------------------#
+# Filters.
+# ----------------------------------------------------------------------------#
+from datetime import datetime
+
+from flask import current_app
+from markupsafe import Markup
+
+from fragments import FragmentCache
+
+
+def format_datetime(value, format="medium"):
+    # babel and dateutil are only needed once a page renders a date
+    import babel.dates
+    import dateutil.parser
+
+    date = value if isinstance(value, datetime) else dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(
+        date, format, locale=current_app.config["LOCALE"]
+    )
+
+
+# ----------------------------------------------------------------------------#
+# Fragments.
+# ----------------------------------------------------------------------------#
+
+
+def show_tile(show, variant="listing"):
+    # a tile only depends on its show row and the locale used by the datetime
+    # filter, editing a show (or its venue/artist) bumps show.updated_at
+    key = (variant, show.id, show.updated_at, current_app.config["LOCALE"])
+    return current_app.extensions["show_tiles"].get_or_render(
+        key,
+        lambda: Markup(
+            current_app.jinja_env.get_template("partials/show_tile.html").render(
+                show=show, variant=variant
+            )
+        ),
+    )
+
+
+def init_app(app):
+    app.extensions["show_tiles"] = FragmentCache(app.config["SHOW_TILE_CACHE_SIZE"])
+    app.extensions["detail_cache"] = FragmentCache(
+        app.config["DETAIL_CACHE_SIZE"], ttl=app.config["DETAIL_CACHE_TTL"]
+    )
+    app.jinja_env.filters["datetime"] = format_datetime
+    app.jinja_env.globals["show_tile"] = show_tile
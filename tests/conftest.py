@@ -0,0 +1,138 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+import matching
+from models import Artist, GeoPlace, Show, Venue, db
+
+# PostgreSQL runs too when TEST_DATABASE_URL points at a scratch database
+# (its tables are dropped after every test)
+BACKENDS = {
+    "sqlite": "sqlite://",
+    "postgresql": os.environ.get("TEST_DATABASE_URL"),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def app(request, tmp_path):
+    url = BACKENDS[request.param]
+    if not url:
+        pytest.skip("set TEST_DATABASE_URL to run against PostgreSQL")
+    app = create_app(
+        TESTING=True,
+        DEBUG=False,
+        JOBS_EAGER=False,
+        SQLALCHEMY_DATABASE_URI=url,
+        WTF_CSRF_ENABLED=False,
+        RATELIMITS={},
+        ADMISSION_ROUTES=[],
+        PRERENDER_ON_WRITE=False,
+        PROFILE_TOKEN=None,
+        PROFILE_SAMPLE_RATE=0.0,
+        GEO_BACKEND="geohash",
+        HOT_ENTITIES_PATH=str(tmp_path / "hot_entities.json"),
+        ERROR_LOG=None,
+    )
+    with app.app_context():
+        db.create_all()
+        # built empty up front, as at worker start; tests needing the
+        # fixtures indexed call matching.warm(app) again
+        matching.warm(app)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def queries(app):
+    """``with queries() as executed:`` collects the SQL statements run in
+    the block, for asserting on the number of round trips."""
+
+    @contextmanager
+    def capture():
+        executed = []
+
+        def collect(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", collect)
+        try:
+            yield executed
+        finally:
+            event.remove(db.engine, "before_cursor_execute", collect)
+
+    return capture
+
+
+@pytest.fixture
+def venue(app):
+    # geocoded to the city centroid on insert
+    db.session.add(
+        GeoPlace(
+            city="San Francisco", state="CA", latitude=37.7749, longitude=-122.4194
+        )
+    )
+    venue = Venue(
+        name="The Musical Hop",
+        genres=["Jazz", "Reggae"],
+        address="1015 Folsom Street",
+        city="San Francisco",
+        state="CA",
+        phone="123-123-1234",
+        website="https://www.themusicalhop.com",
+        facebook_link="https://www.facebook.com/TheMusicalHop",
+        seeking_talent=True,
+        seeking_description="We are on the lookout for a local artist.",
+        image_link="https://images.example.com/hop.jpg",
+    )
+    db.session.add(venue)
+    db.session.commit()
+    return venue.id
+
+
+@pytest.fixture
+def artist(app):
+    artist = Artist(
+        name="Guns N Petals",
+        genres=["Rock n Roll"],
+        city="San Francisco",
+        state="CA",
+        phone="326-123-5000",
+        website="https://www.gunsnpetalsband.com",
+        facebook_link="https://www.facebook.com/GunsNPetals",
+        seeking_venue=True,
+        seeking_description="Looking for shows to perform at.",
+        image_link="https://images.example.com/petals.jpg",
+    )
+    db.session.add(artist)
+    db.session.commit()
+    return artist.id
+
+
+def add_shows(venue_id, artist_id, days):
+    """Shows ``days`` (offsets from now) apart, returning their ids."""
+    shows = [
+        Show(
+            venue_id=venue_id,
+            artist_id=artist_id,
+            start_time=datetime.now() + timedelta(days=offset),
+        )
+        for offset in days
+    ]
+    db.session.add_all(shows)
+    db.session.commit()
+    return [show.id for show in shows]
+
+
+@pytest.fixture
+def shows(venue, artist):
+    return add_shows(venue, artist, [-3, 5])
@@ -0,0 +1,77 @@
+import matching
+from models import Artist, Change, Venue, db
+
+
+def test_venue_matches(app, client, venue, artist):
+    matching.warm(app)
+    response = client.get(f"/api/venues/{venue}/matches")
+    assert response.status_code == 200
+    # both in San Francisco, the venue seeking talent
+    assert [match["id"] for match in response.json["data"]] == [artist]
+
+    assert client.get(f"/api/venues/{venue}/matches?limit=x").status_code == 400
+
+
+def test_artist_matches(app, client, venue, artist, queries):
+    matching.warm(app)
+    with queries() as executed:
+        response = client.get(f"/api/artists/{artist}/matches")
+    assert [match["id"] for match in response.json["data"]] == [venue]
+    # served from the in-memory index
+    assert executed == []
+
+
+def test_venues_nearby(client, venue, queries):
+    with queries() as executed:
+        response = client.get("/api/venues/nearby?lat=37.78&lon=-122.41&radius=5")
+    assert response.status_code == 200
+    assert [v["id"] for v in response.json["data"]] == [venue]
+    assert len(executed) == 1
+
+    assert client.get("/api/venues/nearby?lat=37.78").status_code == 400
+    assert client.get("/api/venues/nearby?lat=91&lon=0").status_code == 400
+
+
+def test_bulk_update(client, venue, queries):
+    body = {"ids": [venue, 404], "changes": {"seeking_talent": False}}
+    response = client.patch("/api/venues", json={**body, "dry_run": True})
+    assert response.json["matched"] == 1
+    assert response.json["missing"] == [404]
+    assert db.session.get(Venue, venue).seeking_talent is True
+
+    with queries() as executed:
+        response = client.patch("/api/venues", json=body)
+    assert response.status_code == 200
+    assert response.json["updated"] == 1
+    db.session.expire_all()
+    updated = db.session.get(Venue, venue)
+    assert updated.seeking_talent is False
+    assert updated.version == 2
+    assert db.session.scalars(db.select(Change.op)).all() == ["update"]
+    # one statement per step, whatever the number of ids, plus re-indexing
+    # the venues for match suggestions
+    assert len(executed) <= 11
+
+
+def test_bulk_update_validates(client, artist):
+    response = client.patch(
+        "/api/artists", json={"ids": [artist], "changes": {"genres": ["Polka"]}}
+    )
+    assert response.status_code == 400
+    assert "genres" in response.json["errors"]
+    assert db.session.get(Artist, artist).genres == ["Rock n Roll"]
+
+    response = client.patch("/api/artists", json={"ids": [artist]})
+    assert response.status_code == 400
+    assert client.patch("/api/artists", data="[]").status_code == 400
+
+
+def test_matches_cold_index(app, client, venue, artist, monkeypatch):
+    builds = []
+    monkeypatch.setattr(matching, "_rebuild", lambda app, index: builds.append(1))
+    app.extensions["matches"].built = None
+    # nothing is built in the request, one build starts in the background
+    for _ in range(3):
+        response = client.get(f"/api/venues/{venue}/matches")
+        assert response.json["data"] == []
+    assert builds == [1]
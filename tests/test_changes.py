@@ -0,0 +1,75 @@
+from threading import BoundedSemaphore, Thread
+
+import jobs
+from models import db
+import outbox
+
+
+def test_changes_page(client, venue, shows, queries):
+    client.delete(f"/shows/{shows[0]}")
+    client.delete(f"/venues/{venue}")
+    jobs.run_one()
+
+    with queries() as executed:
+        response = client.get("/changes")
+    assert response.status_code == 200
+    assert [(c["op"], c["kind"], c["entity_id"]) for c in response.json["changes"]] == [
+        ("delete", "show", shows[0]),
+        ("delete", "show", shows[1]),
+        ("delete", "venue", venue),
+    ]
+    assert len(executed) == 1
+
+
+def test_changes_cursor(client, shows):
+    client.delete(f"/shows/{shows[0]}")
+    client.delete(f"/shows/{shows[1]}")
+
+    first = client.get("/changes?limit=1").json
+    assert [c["entity_id"] for c in first["changes"]] == [shows[0]]
+    assert first["more"] is True
+
+    rest = client.get(f"/changes?after={first['cursor']}").json
+    assert [c["entity_id"] for c in rest["changes"]] == [shows[1]]
+    assert rest["more"] is False
+
+    assert client.get("/changes?after=x").status_code == 400
+
+
+def test_changes_stream(app, client, shows):
+    app.config.update(CHANGES_STREAM_TIMEOUT=0.05, CHANGES_POLL_INTERVAL=0.01)
+    client.delete(f"/shows/{shows[0]}")
+
+    response = client.get("/changes", headers={"Accept": "text/event-stream"})
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: 10\n\n")
+    assert body.count("event: change\n") == 1
+    assert '"op": "delete"' in body
+
+
+def test_changes_stream_busy(app, client):
+    app.extensions["change_streams"] = BoundedSemaphore(0)
+    response = client.get("/changes", headers={"Accept": "text/event-stream"})
+    assert response.get_data(as_text=True) == "retry: 30000\n\n"
+
+
+def test_changes_in_commit_order(app, venue, artist):
+    # ids follow the commits, not the order the changes were recorded in
+    outbox.record("update", "venue", venue)
+
+    def concurrent():
+        with app.app_context():
+            outbox.record("update", "artist", artist)
+            db.session.commit()
+
+    thread = Thread(target=concurrent)
+    thread.start()
+    thread.join()
+    db.session.commit()
+
+    rows = outbox.since(0, 10)
+    assert [(c.kind, c.entity_id) for c in rows] == [
+        ("artist", artist),
+        ("venue", venue),
+    ]
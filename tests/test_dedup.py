@@ -0,0 +1,140 @@
+import pytest
+
+import dedup
+import jobs
+from models import Change, DedupKey, Show, Venue, db
+
+from conftest import add_shows
+from test_venues import venue_form
+
+
+def add_venue(name, city="San Francisco", state="CA", **fields):
+    venue = Venue(name=name, city=city, state=state, **fields)
+    db.session.add(venue)
+    db.session.flush()
+    dedup.index("venue", [venue.id])
+    db.session.commit()
+    return venue.id
+
+
+@pytest.fixture
+def indexed(venue):
+    # fixtures insert directly, without recording changes
+    dedup.index("venue")
+    db.session.commit()
+    return venue
+
+
+def test_normalize():
+    assert dedup.normalize("The Musical Hop!") == "musical hop"
+    assert dedup.normalize("Café & Bar") == "cafe bar"
+
+
+def test_similarity():
+    hop = dedup.record(1, "The Musical Hop", "San Francisco", "CA")
+    assert dedup.similarity(hop, dedup.record(2, "Musical Hop", "", "")) == 1.0
+    assert dedup.similarity(hop, dedup.record(2, "The Musicall Hop", "", "")) > 0.75
+    assert dedup.similarity(hop, dedup.record(2, "Dueling Pianos", "", "")) == 0.0
+
+    # a shared phone number makes up for a differently worded name
+    hop = dedup.record(1, "The Musical Hop", "", "", phone="123-123-1234")
+    other = dedup.record(2, "Hop Bar", "", "", phone="(123) 123 1234")
+    assert dedup.similarity(hop, other) == pytest.approx(
+        dedup.similarity(hop._replace(contact=frozenset()), other) + 0.25
+    )
+
+
+def test_find(indexed, queries):
+    venue = indexed
+    add_venue("The Dueling Pianos Bar")
+    with queries() as executed:
+        found = dedup.find("venue", "Musical Hop", "san francisco", "CA")
+    assert [d.id for d in found] == [venue]
+    assert found[0].score == 1.0
+    # the keys shared with the submission, then the best candidates' rows
+    assert len(executed) == 2
+
+    # other cities are other blocks
+    assert dedup.find("venue", "The Musical Hop", "Oakland", "CA") == []
+    assert dedup.find("venue", "The Musical Hop", "", "", exclude=venue) == []
+
+
+def test_keys_follow_changes(client, indexed):
+    venue = indexed
+    assert dedup.find("venue", "Musical Hop", "San Francisco", "CA")
+
+    client.post(
+        f"/venues/{venue}/edit", data=venue_form(name="Dueling Pianos", version="1")
+    )
+    assert dedup.find("venue", "Musical Hop", "San Francisco", "CA") == []
+    assert dedup.find("venue", "Dueling Pianos", "San Francisco", "CA")
+
+    client.delete(f"/venues/{venue}")
+    jobs.run_one()
+    assert db.session.scalars(db.select(DedupKey)).all() == []
+
+
+def test_create_asks_before_listing_a_duplicate(client, indexed):
+    venue = indexed
+    response = client.post("/venues/create", data=venue_form(name="Musical Hop"))
+    assert b"already listed" in response.data
+    assert f'href="/venues/{venue}"'.encode() in response.data
+    assert db.session.scalar(db.select(db.func.count(Venue.id))) == 1
+
+    response = client.post(
+        "/venues/create", data=venue_form(name="Musical Hop", not_duplicate="y")
+    )
+    assert b"was successfully listed" in response.data
+    assert db.session.scalar(db.select(db.func.count(Venue.id))) == 2
+
+
+def test_scan(venue):
+    twin = add_venue("Musical Hop")
+    add_venue("The Musicall Hop", city="Oakland")
+    add_venue("Dueling Pianos Bar")
+    triplet = add_venue("The Musical Hop SF")
+
+    clusters, skipped = dedup.scan("venue", 0.75, 200)
+    assert [[d.id for d in cluster] for cluster in clusters] == [[venue, twin, triplet]]
+    assert skipped == 0
+
+    # with tiny blocks nothing is compared at all
+    clusters, skipped = dedup.scan("venue", 0.75, 1)
+    assert clusters == []
+    assert skipped > 0
+
+
+def test_merge(app, venue, artist):
+    twin = add_venue("Musical Hop")
+    add_shows(venue, artist, [1])
+    (moved,) = add_shows(twin, artist, [2])
+    db.session.execute(db.delete(Change))
+
+    result = dedup.merge("venue", venue, [twin])
+    assert result == {"kind": "venue", "kept": venue, "merged": [twin], "shows": 1}
+    db.session.expire_all()
+    assert db.session.get(Venue, twin) is None
+    assert set(db.session.scalars(db.select(Show.venue_id))) == {venue}
+    assert db.session.get(Show, moved).version == 2
+    changes = db.session.execute(db.select(Change.op, Change.kind)).all()
+    assert sorted(set(changes)) == [
+        ("delete", "venue"),
+        ("update", "show"),
+        ("update", "venue"),
+    ]
+
+    with pytest.raises(LookupError):
+        dedup.merge("venue", venue, [twin])
+
+
+def test_commands(app, venue):
+    add_venue("Musical Hop")
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["dedup", "index"])
+    assert "venue:" in result.output
+    result = runner.invoke(args=["dedup", "scan", "venue"])
+    assert "1 cluster(s)" in result.output
+    result = runner.invoke(args=["dedup", "merge", "venue", str(venue), "2"])
+    assert "merged venue(s) 2" in result.output
+    result = runner.invoke(args=["dedup", "merge", "venue", str(venue), "2"])
+    assert result.exit_code == 1
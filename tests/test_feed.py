@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+import feed
+from models import Venue, db
+import outbox
+from projections import ShowTile
+
+from conftest import add_shows
+from test_venues import venue_form
+
+
+def tile(id, days):
+    start = datetime.now() + timedelta(days=days)
+    return ShowTile(id, start, start, 1, "Venue", None, 1, "Artist", None)
+
+
+def test_home(client, venue, artist, shows, queries):
+    with queries() as executed:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert b"Upcoming shows" in response.data
+    assert b"The Musical Hop" in response.data
+    assert b"Guns N Petals" in response.data
+    # venues, artists and upcoming shows in one round trip
+    assert len(executed) == 1
+
+    with queries() as executed:
+        client.get("/")
+    assert executed == []
+
+
+def test_follows_writes(client, app, venue, artist, shows, queries):
+    upcoming = shows[1]
+    client.get("/")
+    client.post(
+        "/venues/create", data=venue_form(name="Dueling Pianos", not_duplicate="y")
+    )
+    client.delete(f"/shows/{upcoming}")
+
+    with queries() as executed:
+        home = feed.home()
+    assert executed == []
+    assert [item.name for item in home["venues"]] == [
+        "Dueling Pianos",
+        "The Musical Hop",
+    ]
+    assert home["shows"] == []
+
+    (later,) = add_shows(venue, artist, [2])
+    db.session.get(Venue, venue).name = "The Musical Hop SF"
+    outbox.record("update", "venue", venue)
+    db.session.commit()
+    # a renamed venue on a buffered show tile makes the next request reseed
+    with queries() as executed:
+        home = feed.home()
+    assert len(executed) == 1
+    assert [show.venue_name for show in home["shows"]] == ["The Musical Hop SF"]
+    assert home["shows"][0].id == later
+
+
+def test_show_window():
+    home = feed.HomeFeed(size=2, show_buffer=3)
+    home.load([], home.generation)
+    for id, days in [(1, 3), (2, 1), (3, 2), (4, 4), (5, -1)]:
+        home.add("show", tile(id, days))
+    # the latest show fell out of the window, the past one never entered it
+    assert [show.id for show in home._shows] == [2, 3, 1]
+    assert [show.id for show in home.snapshot()["shows"]] == [2, 3]
+
+    # past the window an unseen show could come first, so it is left out
+    home.add("show", tile(6, 5))
+    assert [show.id for show in home._shows] == [2, 3, 1]
+    home.remove("show", 2)
+    home.remove("show", 3)
+    assert not home.stale
+    home.snapshot()
+    assert home.stale
+
+
+def test_recent_ring_buffer():
+    home = feed.HomeFeed(size=2)
+    for id in (1, 2, 3):
+        home.add("venue", feed.FeedItem(id, f"Venue {id}", "", "", None))
+    assert [item.id for item in home.snapshot()["venues"]] == [3, 2]
+    home.remove("venue", 1)
+    assert not home.stale
+    home.remove("venue", 3)
+    assert home.stale
+
+
+def test_home_without_database(client, monkeypatch):
+    def fail(feed):
+        raise OperationalError("SELECT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(feed, "seed", fail)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert b"Fyyur" in response.data
+    assert b"Upcoming shows" not in response.data
@@ -0,0 +1,29 @@
+from collections import Counter
+import random
+
+from hot import SpaceSaving
+
+
+def test_space_saving_tracks_heavy_hitters():
+    rng = random.Random(7)
+    stream = [rng.randrange(10) for _ in range(5000)]
+    stream += [rng.randrange(10_000) for _ in range(5000)]
+    rng.shuffle(stream)
+    sketch = SpaceSaving(capacity=64)
+    for key in stream:
+        sketch.offer(key)
+
+    assert len(sketch) == 64
+    exact = Counter(stream)
+    for key, count, error in sketch.top():
+        assert count - error <= exact[key] <= count
+    assert {key for key, _, _ in sketch.top(10)} == set(range(10))
+
+
+def test_space_saving_evicts_smallest():
+    sketch = SpaceSaving(capacity=2)
+    sketch.offer("a", 5)
+    sketch.offer("b", 2)
+    sketch.offer("b", 1)
+    sketch.offer("c")
+    assert sketch.top() == [("a", 5, 0), ("c", 4, 3)]
@@ -0,0 +1,78 @@
+from datetime import datetime
+from threading import Thread
+
+import pytest
+
+import jobs
+from models import Change, Job, Venue, db
+import outbox
+
+
+@jobs.task
+def failing_task(venue_name):
+    # writes that must be undone with the failed attempt
+    venue = Venue(name=venue_name, city="San Francisco", state="CA")
+    db.session.add(venue)
+    db.session.flush()
+    outbox.record("create", "venue", venue.id)
+    raise RuntimeError("task failed")
+
+
+def enqueue_failing(max_attempts):
+    jobs.enqueue("failing_task", max_attempts=max_attempts, venue_name="Half Written")
+    db.session.commit()
+    return db.session.scalar(db.select(Job.id))
+
+
+def test_retry(app):
+    job_id = enqueue_failing(max_attempts=3)
+    assert jobs.run_one()
+
+    db.session.expire_all()
+    job = db.session.get(Job, job_id)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert "task failed" in job.last_error
+    # rescheduled with backoff, so it is not due again right away
+    assert job.run_at > datetime.now()
+    assert jobs.run_one() is False
+    assert db.session.scalars(db.select(Venue)).all() == []
+    assert db.session.scalars(db.select(Change)).all() == []
+
+
+def test_fail(app):
+    job_id = enqueue_failing(max_attempts=1)
+    assert jobs.run_one()
+
+    db.session.expire_all()
+    job = db.session.get(Job, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 1
+    assert job.finished_at is not None
+    assert jobs.run_one() is False
+    assert db.session.scalars(db.select(Venue)).all() == []
+
+
+def test_claim_held_while_rescheduling(app, monkeypatch):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("SKIP LOCKED needs PostgreSQL")
+    enqueue_failing(max_attempts=3)
+    claimed = []
+
+    def claim_elsewhere():
+        with app.app_context():
+            claimed.append(jobs.claim())
+            db.session.rollback()
+
+    record = jobs._retry_or_fail
+
+    def retry_or_fail(job_id, error):
+        # another worker polling between the failure and the reschedule
+        thread = Thread(target=claim_elsewhere)
+        thread.start()
+        thread.join()
+        record(job_id, error)
+
+    monkeypatch.setattr(jobs, "_retry_or_fail", retry_or_fail)
+    assert jobs.run_one()
+    assert claimed == [None]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+
+def test_index(client, queries):
+    with queries() as executed:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert b"Fyyur" in response.data
+    # seeding the home feed
+    assert len(executed) == 1
+
+
+def test_not_found(client):
+    response = client.get("/no/such/page")
+    assert response.status_code == 404
+
+
+def test_static(client):
+    response = client.get("/static/js/script.js")
+    assert response.status_code == 200
+    response.close()
+
+
+def test_optional_features_not_imported():
+    # a fresh interpreter, as a gunicorn worker building the default app
+    script = (
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app(SQLALCHEMY_DATABASE_URI='sqlite://', ERROR_LOG=None)\n"
+        "print(' '.join(sorted(\n"
+        "    name for name in ('partitions', 'plans', 'prerender', 'profiling')\n"
+        "    if name in sys.modules\n"
+        ")))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
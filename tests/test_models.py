@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import (
+    Artist,
+    Venue,
+    db,
+    expect_version,
+    genres_contain,
+    genres_overlap,
+)
+
+
+@pytest.fixture
+def venues(app):
+    rows = {
+        "jazz and swing": ["Jazz", "Swing"],
+        "jazz": ["Jazz"],
+        "folk": ["Folk"],
+        "none": [],
+    }
+    db.session.add_all(Venue(name=name, genres=genres) for name, genres in rows.items())
+    db.session.commit()
+
+
+def names(*criteria):
+    return sorted(db.session.scalars(db.select(Venue.name).where(*criteria)))
+
+
+def test_genres_round_trip(venue):
+    db.session.expire_all()
+    assert db.session.get(Venue, venue).genres == ["Jazz", "Reggae"]
+
+
+def test_genres_contain(venues):
+    assert names(genres_contain(Venue.genres, "Jazz")) == ["jazz", "jazz and swing"]
+    assert names(genres_contain(Venue.genres, "Jazz", "Swing")) == ["jazz and swing"]
+    assert names(genres_contain(Venue.genres, "Blues")) == []
+
+
+def test_genres_overlap(venues):
+    assert names(genres_overlap(Venue.genres, "Swing", "Folk")) == [
+        "folk",
+        "jazz and swing",
+    ]
+    assert names(genres_overlap(Venue.genres, "Blues")) == []
+
+
+def test_version_increments_on_update(artist):
+    row = db.session.get(Artist, artist)
+    assert row.version == 1
+    row.city = "Oakland"
+    db.session.commit()
+    assert row.version == 2
+
+
+def test_stale_flush_raises(artist):
+    row = db.session.get(Artist, artist)
+    # as if another worker had committed an edit in the meantime
+    db.session.execute(
+        db.update(Artist).where(Artist.id == artist).values(version=Artist.version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    row.city = "Oakland"
+    with pytest.raises(StaleDataError):
+        db.session.commit()
+
+
+def test_expect_version(artist):
+    row = db.session.get(Artist, artist)
+    expect_version(row, "1")
+    expect_version(row, None)
+    with pytest.raises(StaleDataError):
+        expect_version(row, "2")
@@ -0,0 +1,98 @@
+import json
+
+import plans
+from models import Show, Venue, db
+
+
+def test_seed(app):
+    assert plans.seed(20) == {"venues": 20, "artists": 20, "shows": 200}
+    assert db.session.scalar(db.select(db.func.count(Show.id))) == 200
+    ids = plans.samples()
+    assert db.session.get(Venue, ids["venue"]) is not None
+
+
+def test_summarize():
+    plan = {
+        "Plan": {
+            "Node Type": "Nested Loop",
+            "Total Cost": 12.5,
+            "Plan Rows": 10,
+            "Actual Rows": 10,
+            "Actual Loops": 1,
+            "Shared Hit Blocks": 3,
+            "Plans": [
+                {
+                    "Node Type": "Seq Scan",
+                    "Relation Name": "venue",
+                    "Plan Rows": 2,
+                    "Actual Rows": 500,
+                    "Actual Loops": 1,
+                },
+                {
+                    "Node Type": "Index Scan",
+                    "Relation Name": "show",
+                    "Plan Rows": 5,
+                    "Actual Rows": 0,
+                    "Actual Loops": 0,
+                },
+            ],
+        },
+        "Execution Time": 0.8,
+    }
+    assert plans.summarize(plan) == {
+        "cost": 12.5,
+        "time_ms": 0.8,
+        "buffers": 3,
+        "seq_scans": ["venue"],
+        "row_error": 250.0,
+    }
+
+
+def test_compare(app):
+    def result(**summary):
+        base = {"cost": 10.0, "time_ms": 1.0, "seq_scans": [], "row_error": 1.0}
+        query = {"key": "a", "summary": {**base, **summary}}
+        return {"views": {"home": [query]}}
+
+    config = app.config
+    assert plans.compare(result(), result(cost=12.0), config) == []
+    assert plans.compare(result(), result(cost=20.0), config) == [
+        "home [a]: cost 20.00, was 10.00"
+    ]
+    assert plans.compare(result(), result(seq_scans=["show"]), config) == [
+        "home [a]: new seq scan on show"
+    ]
+    assert plans.compare(result(), result(row_error=50.0), config) == [
+        "home [a]: row estimates off by 50.0x, was 1.0x"
+    ]
+    more = result()
+    more["views"]["home"].append(
+        {"key": "b", "summary": result()["views"]["home"][0]["summary"]}
+    )
+    assert plans.compare(result(), more, config) == ["home: 2 queries, was 1"]
+
+
+def test_record_and_check(app, tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["plans", "seed", "--scale", "30"])
+    assert "30 venues, 30 artists, 300 shows" in result.output
+    result = runner.invoke(args=["plans", "seed", "--scale", "30"])
+    assert result.exit_code == 1
+
+    result = runner.invoke(args=["plans", "record", "--baseline", baseline])
+    assert result.exit_code == 0, result.output
+    assert "home" in result.output
+    result = runner.invoke(args=["plans", "check", "--baseline", baseline])
+    assert "no plan regressions" in result.output
+
+    # a baseline from before the listings needed a full scan
+    with open(baseline) as f:
+        stored = json.load(f)
+    (query,) = stored["views"]["venues"]
+    query["summary"]["seq_scans"] = []
+    with open(baseline, "w") as f:
+        json.dump(stored, f)
+    result = runner.invoke(args=["plans", "check", "venues", "--baseline", baseline])
+    assert result.exit_code == 1, result.output
+    assert "new seq scan on venue" in result.output
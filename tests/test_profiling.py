@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    app = create_app(
+        TESTING=True,
+        DEBUG=False,
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        RATELIMITS={},
+        ADMISSION_ROUTES=[],
+        PRERENDER_ON_WRITE=False,
+        PROFILE_TOKEN="sesame",
+        PROFILE_SAMPLE_RATE=0.0,
+        PROFILE_DIR=str(tmp_path / "profiles"),
+        HOT_ENTITIES_PATH=str(tmp_path / "hot_entities.json"),
+        ERROR_LOG=None,
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def test_profile_requested(profiled):
+    client = profiled.test_client()
+    response = client.get("/", headers={"X-Profile": "sesame"})
+    assert response.status_code == 200
+    name = response.headers["X-Profile-Id"]
+    directory = profiled.config["PROFILE_DIR"]
+    assert any(entry.startswith(name) for entry in os.listdir(directory))
+    assert os.path.isfile(os.path.join(directory, "index.html"))
+
+
+def test_wrong_token(profiled):
+    client = profiled.test_client()
+    # non-ASCII tokens must not fail the request
+    for token in ("open", "%C3%A9", "%E2%9C%93sesame"):
+        response = client.get(f"/?profile={token}")
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
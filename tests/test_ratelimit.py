@@ -0,0 +1,106 @@
+from threading import Event, Thread
+
+import pytest
+
+from app import create_app
+from models import db
+from ratelimit import MemoryBackend, parse_limit
+
+
+@pytest.fixture
+def limited(tmp_path):
+    """An app limiting the ``probe`` endpoint to 2 requests a minute and 1 at
+    a time. ``probe`` blocks until ``app.release`` is set."""
+    app = create_app(
+        TESTING=True,
+        DEBUG=False,
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        RATELIMITS={"probe": "2/minute"},
+        ADMISSION_ROUTES=["probe"],
+        ADMISSION_MAX_CONCURRENT=1,
+        ADMISSION_QUEUE_TIMEOUT=0.05,
+        API_KEYS=["registered"],
+        PROXY_FIX_X_FOR=1,
+        PRERENDER_ON_WRITE=False,
+        PROFILE_TOKEN=None,
+        PROFILE_SAMPLE_RATE=0.0,
+        HOT_ENTITIES_PATH=str(tmp_path / "hot_entities.json"),
+        ERROR_LOG=None,
+    )
+    app.release = Event()
+    app.entered = Event()
+
+    def probe():
+        app.entered.set()
+        app.release.wait(5)
+        return "ok"
+
+    app.add_url_rule("/probe", "probe", probe)
+    app.release.set()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def test_parse_limit():
+    assert parse_limit("30/minute") == (30, 0.5)
+    assert parse_limit("2/seconds") == (2, 2.0)
+
+
+def test_memory_backend():
+    backend = MemoryBackend()
+    assert backend.take("a", 2, 1.0) == 0
+    assert backend.take("a", 2, 1.0) == 0
+    assert 0 < backend.take("a", 2, 1.0) <= 1
+    # buckets are per key
+    assert backend.take("b", 2, 1.0) == 0
+
+
+def test_limit_per_ip(limited):
+    client = limited.test_client()
+    first = {"X-Forwarded-For": "203.0.113.1"}
+    assert client.get("/probe", headers=first).status_code == 200
+    assert client.get("/probe", headers=first).status_code == 200
+    response = client.get("/probe", headers=first)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # behind the proxy, other clients have buckets of their own
+    other = {"X-Forwarded-For": "203.0.113.2"}
+    assert client.get("/probe", headers=other).status_code == 200
+
+
+def test_limit_unknown_api_keys_by_ip(limited):
+    client = limited.test_client()
+    for attempt in range(2):
+        headers = {"X-API-Key": f"made-up-{attempt}"}
+        assert client.get("/probe", headers=headers).status_code == 200
+    assert client.get("/probe", headers={"X-API-Key": "another"}).status_code == 429
+
+    # a registered key is limited on its own
+    registered = {"X-API-Key": "registered"}
+    assert client.get("/probe", headers=registered).status_code == 200
+
+
+def test_admission(limited):
+    limited.release.clear()
+    client = limited.test_client()
+    slow = Thread(target=client.get, args=("/probe",))
+    slow.start()
+    try:
+        assert limited.entered.wait(5)
+        response = limited.test_client().get(
+            "/probe", headers={"X-Forwarded-For": "203.0.113.9"}
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    finally:
+        limited.release.set()
+        slow.join()
+
+    # the slot is released once the request is done
+    response = limited.test_client().get(
+        "/probe", headers={"X-Forwarded-For": "203.0.113.9"}
+    )
+    assert response.status_code == 200
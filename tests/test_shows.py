@@ -0,0 +1,65 @@
+from models import Change, Show, db
+
+from conftest import add_shows
+
+
+def test_shows(client, shows, queries):
+    with queries() as executed:
+        response = client.get("/shows")
+    assert response.status_code == 200
+    assert response.data.count(b"Guns N Petals") == 2
+    assert len(executed) == 1
+
+
+def test_shows_queries_do_not_grow_with_shows(client, venue, artist, queries):
+    add_shows(venue, artist, range(-10, 10))
+    with queries() as executed:
+        response = client.get("/shows")
+    assert response.data.count(b"The Musical Hop") == 20
+    assert len(executed) == 1
+
+
+def test_shows_streamed(app, client, venue, artist, queries):
+    add_shows(venue, artist, range(-10, 10))
+    app.config.update(STREAM_YIELD_PER=3, STREAM_BUFFER_SIZE=1024)
+    with queries() as executed:
+        response = client.get("/shows?stream=1", buffered=False)
+        chunks = list(response.response)
+    # sent in STREAM_BUFFER_SIZE chunks while the shows are read
+    assert len(chunks) > 2
+    assert b"".join(chunks) == client.get("/shows").data
+    assert len(executed) == 1
+
+
+def test_shows_streamed_empty(client):
+    response = client.get("/shows?stream=1")
+    assert b"no Shows on the road" in response.data
+
+
+def test_create_show(client, venue, artist, queries):
+    assert client.get("/shows/create").status_code == 200
+
+    with queries() as executed:
+        response = client.post(
+            "/shows/create",
+            data={
+                "venue_id": venue,
+                "artist_id": artist,
+                "start_time": "2035-05-21 21:30:00",
+            },
+        )
+    assert b"Show was successfully listed" in response.data
+    show = db.session.scalars(db.select(Show)).one()
+    assert (show.venue_id, show.artist_id) == (venue, artist)
+    assert show.start_time.year == 2035
+    assert db.session.scalars(db.select(Change.op)).all() == ["create"]
+    # plus the venue and artist snapshots and the home feed of the page it
+    # answers with
+    assert len(executed) <= 7
+
+
+def test_delete_show(client, shows):
+    response = client.delete(f"/shows/{shows[0]}", follow_redirects=True)
+    assert b"Show was successfully canceled" in response.data
+    assert db.session.scalars(db.select(Show.id)).all() == shows[1:]
+    assert db.session.scalars(db.select(Change.op)).all() == ["delete"]
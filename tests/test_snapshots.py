@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+from threading import Event, Thread
+import time
+
+import pytest
+from sqlalchemy import event, update
+
+import jobs
+import outbox
+import snapshots
+from models import Artist, Show, Snapshot, Venue, db
+
+from test_venues import venue_form
+
+
+def stored(kind, id):
+    return db.session.scalar(
+        db.select(Snapshot.data).where(Snapshot.kind == kind, Snapshot.entity_id == id)
+    )
+
+
+def create_show(client, venue, artist, days):
+    start = datetime.now() + timedelta(days=days)
+    client.post(
+        "/shows/create",
+        data={
+            "venue_id": venue,
+            "artist_id": artist,
+            "start_time": start.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    return db.session.scalars(db.select(Show.id).order_by(Show.id.desc())).first()
+
+
+def test_follows_writes(app, client, venue, artist):
+    snapshots.refresh({"venue": [venue], "artist": [artist]})
+    db.session.commit()
+    past = create_show(client, venue, artist, -3)
+    upcoming = create_show(client, venue, artist, 5)
+    assert [show["id"] for show in stored("venue", venue)["shows"]] == [
+        past,
+        upcoming,
+    ]
+    assert len(stored("artist", artist)["shows"]) == 2
+
+    # the artist's show tiles carry the venue's name
+    client.post(
+        f"/venues/{venue}/edit", data=venue_form(name="The Musical Hop SF", version="1")
+    )
+    assert stored("venue", venue)["name"] == "The Musical Hop SF"
+    assert {show["venue_name"] for show in stored("artist", artist)["shows"]} == {
+        "The Musical Hop SF"
+    }
+
+    client.delete(f"/shows/{past}")
+    assert [show["id"] for show in stored("venue", venue)["shows"]] == [upcoming]
+    for kind in ("venue", "artist"):
+        counts = snapshots.verify(kind)
+        assert counts["missing"] + counts["differing"] + counts["orphaned"] == 0
+
+    client.delete(f"/venues/{venue}")
+    jobs.run_one()
+    assert stored("venue", venue) is None
+    assert stored("artist", artist)["shows"] == []
+
+
+def test_page_is_one_read(client, venue, artist, shows, queries):
+    snapshots.refresh({"venue": [venue], "artist": [artist]})
+    db.session.commit()
+    with queries() as executed:
+        page = snapshots.page("artist", artist)
+    assert len(executed) == 1
+    assert page["name"] == "Guns N Petals"
+    assert [s.venue_name for s in page["upcoming_shows"]] == ["The Musical Hop"]
+    assert page["past_shows_count"] == 1
+    assert page["upcoming_shows"][0].start_time > datetime.now()
+
+    db.session.expire_all()
+    with queries() as executed:
+        response = client.get(f"/artists/{artist}")
+    assert b"The Musical Hop" in response.data
+    assert executed[0].startswith("SELECT snapshot.data")
+
+    assert snapshots.page("artist", 404) is None
+
+
+def test_verify(app, venue, artist, shows):
+    counts = snapshots.verify("venue")
+    assert counts == {"checked": 1, "missing": 1, "differing": 0, "orphaned": 0}
+    snapshots.verify("venue", fix=True)
+    assert snapshots.verify("venue")["missing"] == 0
+
+    # a write that bypasses the outbox
+    db.session.execute(
+        update(Venue).where(Venue.id == venue).values(city="Oakland"),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.add(
+        Snapshot(kind="venue", entity_id=404, data={}, built_at=datetime.now())
+    )
+    db.session.commit()
+    assert snapshots.verify("venue") == {
+        "checked": 1,
+        "missing": 0,
+        "differing": 1,
+        "orphaned": 1,
+    }
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["snapshots", "verify", "venue"])
+    assert "1 differing, 1 orphaned" in result.output
+    assert result.exit_code == 1
+    result = runner.invoke(args=["snapshots", "verify", "--fix"])
+    assert result.exit_code == 0
+    assert runner.invoke(args=["snapshots", "verify"]).exit_code == 0
+    assert stored("venue", venue)["city"] == "Oakland"
+    assert db.session.get(Artist, artist) is not None
+
+
+def test_build_command(app, venue, artist, shows):
+    result = app.test_cli_runner().invoke(args=["snapshots", "build"])
+    assert "artist: 1 snapshot(s)" in result.output
+    assert "venue: 1 snapshot(s)" in result.output
+    assert len(stored("venue", venue)["shows"]) == 2
+
+
+def test_concurrent_writers(app, venue, artist):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("row locks need PostgreSQL")
+    snapshots.refresh({"venue": [venue], "artist": [artist]})
+    db.session.commit()
+    built, resume = Event(), Event()
+
+    def pause(session):
+        # runs once the first writer rebuilt the snapshots, before it commits
+        if session.info.pop("pause", False):
+            built.set()
+            resume.wait(5)
+
+    def book(days, pausing):
+        with app.app_context():
+            show = Show(
+                venue_id=venue,
+                artist_id=artist,
+                start_time=datetime.now() + timedelta(days=days),
+            )
+            db.session.add(show)
+            db.session.flush()
+            outbox.record("create", "show", show.id)
+            db.session.info["pause"] = pausing
+            db.session.commit()
+
+    event.listen(db.session, "before_commit", pause)
+    try:
+        first = Thread(target=book, args=(5, True))
+        first.start()
+        assert built.wait(5)
+        second = Thread(target=book, args=(6, False))
+        second.start()
+        # the second writer is now waiting for the venue and artist rows
+        time.sleep(0.2)
+        resume.set()
+        first.join()
+        second.join()
+    finally:
+        resume.set()
+        event.remove(db.session, "before_commit", pause)
+
+    assert len(stored("venue", venue)["shows"]) == 2
+    assert len(stored("artist", artist)["shows"]) == 2
+
+
+def test_moved_show(client, venue, artist, shows):
+    other = Venue(name="Park Square Live", city="San Francisco", state="CA")
+    db.session.add(other)
+    db.session.commit()
+    other = other.id
+    snapshots.refresh({"venue": [venue, other], "artist": [artist]})
+    db.session.commit()
+
+    response = client.patch(
+        "/api/shows", json={"ids": [shows[0]], "changes": {"venue_id": other}}
+    )
+    assert response.status_code == 200
+    assert [show["id"] for show in stored("venue", venue)["shows"]] == [shows[1]]
+    assert [show["id"] for show in stored("venue", other)["shows"]] == [shows[0]]
+    assert {show["venue_id"] for show in stored("artist", artist)["shows"]} == {
+        venue,
+        other,
+    }
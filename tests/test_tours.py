@@ -0,0 +1,93 @@
+from models import Change, Show, db
+import tours
+
+
+def slots(venue, *days):
+    return [
+        {"venue_id": venue, "start_time": f"2035-06-{day:02} 20:00"} for day in days
+    ]
+
+
+def test_schedule(client, venue, artist, queries):
+    with queries() as executed:
+        response = client.post(
+            "/api/tours", json={"artist_id": artist, "slots": slots(venue, 1, 2, 3)}
+        )
+    assert response.status_code == 201
+    assert len(response.json["ids"]) == 3
+    rows = db.session.execute(db.select(Show.venue_id, Show.artist_id)).all()
+    assert rows == [(venue, artist)] * 3
+    assert db.session.scalars(db.select(Change.op)).all() == ["create"] * 3
+    inserts = [sql for sql in executed if sql.startswith("INSERT INTO show ")]
+    # one statement for all slots
+    assert len(inserts) == 1
+
+    more = slots(venue, *range(1, 29)) + slots(venue, *range(1, 29))
+    for day, slot in enumerate(more):
+        slot["start_time"] = f"2036-01-01 {day % 24:02}:{day // 24:02}"
+    with queries() as larger:
+        client.post("/api/tours", json={"artist_id": artist, "slots": more})
+    # the same statements, whatever the number of slots
+    assert len(larger) == len(executed)
+
+
+def test_errors_per_slot(client, venue, artist):
+    body = {
+        "artist_id": artist,
+        "slots": slots(venue, 1, 1)
+        + [
+            {"venue_id": 404, "start_time": "2035-06-05 20:00"},
+            {"venue_id": "x", "start_time": "someday"},
+            {"venue_id": venue, "artist_id": 404, "start_time": "2035-06-07"},
+        ],
+    }
+    response = client.post("/api/tours", json=body)
+    assert response.status_code == 400
+    assert response.json["errors"] == {
+        "1": {"start_time": ["The artist plays another slot then."]},
+        "2": {"venue_id": ["No venue with this id."]},
+        "3": {
+            "venue_id": ["Not a valid id."],
+            "start_time": ["Not a valid datetime value."],
+        },
+        "4": {"artist_id": ["No artist with this id."]},
+    }
+    # all or nothing
+    assert db.session.scalars(db.select(Show)).all() == []
+
+    response = client.post("/api/tours", json={"artist_id": artist, "slots": []})
+    assert response.json["errors"] == {"slots": ["No slots given."]}
+    app_limit = client.application.config["TOUR_MAX_SLOTS"]
+    too_many = slots(venue, 1) * (app_limit + 1)
+    response = client.post("/api/tours", json={"artist_id": artist, "slots": too_many})
+    assert response.status_code == 400
+
+
+def test_dry_run(client, venue, artist):
+    response = client.post(
+        "/api/tours?dry_run=1", json={"artist_id": artist, "slots": slots(venue, 1)}
+    )
+    assert response.status_code == 200
+    assert response.json == {"slots": 1, "dry_run": True}
+    assert db.session.scalars(db.select(Show)).all() == []
+
+
+def test_form(client, venue, artist):
+    assert client.get("/shows/tour").status_code == 200
+
+    lines = f"{venue}, 2035-06-01 20:00\n\n{venue}, 2035-06-02 20:00\n"
+    response = client.post("/shows/tour", data={"artist_id": artist, "slots": lines})
+    assert b"Tour of 2 shows was successfully listed" in response.data
+    assert len(db.session.scalars(db.select(Show)).all()) == 2
+
+    lines = f"{venue}, 2035-07-01 20:00\n404, 2035-07-02 20:00"
+    response = client.post("/shows/tour", data={"artist_id": artist, "slots": lines})
+    assert b"Show 2, venue id: No venue with this id." in response.data
+    assert len(db.session.scalars(db.select(Show)).all()) == 2
+
+
+def test_parse_lines():
+    assert tours.parse_lines("1, 2035-06-01 20:00\n  \n2,tomorrow") == [
+        {"venue_id": "1", "start_time": " 2035-06-01 20:00"},
+        {"venue_id": "2", "start_time": "tomorrow"},
+    ]
@@ -0,0 +1,148 @@
+import jobs
+import matching
+from models import Change, Show, Venue, db
+
+from conftest import add_shows
+
+
+def venue_form(**changes):
+    form = {
+        "name": "The Musical Hop",
+        "city": "San Francisco",
+        "state": "CA",
+        "address": "1015 Folsom Street",
+        "phone": "123-123-1234",
+        "genres": ["Jazz", "Swing"],
+        "facebook_link": "https://www.facebook.com/TheMusicalHop",
+        "image_link": "https://images.example.com/hop.jpg",
+        "website_link": "https://www.themusicalhop.com",
+        "seeking_talent": "y",
+        "seeking_description": "We are on the lookout for a local artist.",
+    }
+    form.update(changes)
+    return form
+
+
+def test_venues(client, venue, queries):
+    with queries() as executed:
+        response = client.get("/venues")
+    assert response.status_code == 200
+    assert b"The Musical Hop" in response.data
+    assert b"San Francisco" in response.data
+    assert len(executed) == 1
+
+
+def test_show_venue(client, venue, shows, queries):
+    with queries() as executed:
+        response = client.get(f"/venues/{venue}")
+    assert response.status_code == 200
+    assert b"The Musical Hop" in response.data
+    assert b"Guns N Petals" in response.data
+    # the snapshot, built from the tables as the fixtures bypass the outbox
+    assert len(executed) <= 3
+
+    # cached for DETAIL_CACHE_TTL
+    with queries() as executed:
+        assert client.get(f"/venues/{venue}").status_code == 200
+    assert executed == []
+
+
+def test_show_venue_queries_do_not_grow_with_shows(
+    app, client, venue, artist, queries
+):
+    busy = Venue(name="Busy Hall", city="San Francisco", state="CA", genres=[])
+    db.session.add(busy)
+    db.session.commit()
+    busy_id = busy.id
+    add_shows(busy_id, artist, range(-10, 10))
+    matching.warm(app)
+
+    with queries() as quiet_page:
+        client.get(f"/venues/{venue}")
+    with queries() as busy_page:
+        response = client.get(f"/venues/{busy_id}")
+    assert response.data.count(b"Guns N Petals") >= 20
+    assert len(busy_page) == len(quiet_page)
+
+
+def test_show_missing_venue(client):
+    response = client.get("/venues/404", follow_redirects=True)
+    assert response.status_code == 200
+    assert b"could not be listed" in response.data
+
+
+def test_search_venues(client, venue, queries):
+    with queries() as executed:
+        response = client.post("/venues/search", data={"search_term": "hop"})
+    assert b"The Musical Hop" in response.data
+    assert len(executed) == 1
+
+
+def test_create_venue(client, queries):
+    assert client.get("/venues/create").status_code == 200
+
+    with queries() as executed:
+        response = client.post("/venues/create", data=venue_form())
+    assert b"was successfully listed" in response.data
+    venue = db.session.scalars(db.select(Venue)).one()
+    assert venue.genres == ["Jazz", "Swing"]
+    assert venue.seeking_talent is True
+    assert db.session.scalars(db.select(Change.op)).all() == ["create"]
+    # duplicate check, insert, change, blocking keys, match index, snapshot,
+    # home feed
+    assert len(executed) <= 11
+
+
+def test_edit_venue(client, venue):
+    response = client.get(f"/venues/{venue}/edit")
+    assert response.status_code == 200
+    assert b'name="version" type="hidden" value="1"' in response.data
+
+    response = client.post(
+        f"/venues/{venue}/edit",
+        data=venue_form(name="The Musical Hip", version="1"),
+        follow_redirects=True,
+    )
+    assert b"was successfully updated" in response.data
+    assert b"The Musical Hip" in response.data
+    db.session.expire_all()
+    assert db.session.get(Venue, venue).version == 2
+
+
+def test_edit_venue_conflict(client, venue):
+    client.post(f"/venues/{venue}/edit", data=venue_form(name="First", version="1"))
+
+    response = client.post(
+        f"/venues/{venue}/edit", data=venue_form(name="Second", version="1")
+    )
+    assert response.status_code == 409
+    assert b"changed by someone else" in response.data
+    # the form is re-rendered from the current row
+    assert b'value="First"' in response.data
+    assert b'name="version" type="hidden" value="2"' in response.data
+    db.session.expire_all()
+    assert db.session.get(Venue, venue).name == "First"
+
+
+def test_delete_venue(client, venue, shows):
+    client.get(f"/venues/{venue}")
+    response = client.delete(f"/venues/{venue}")
+    assert response.status_code == 302
+    assert b"scheduled for removal" in client.get("/").data
+
+    # shows and the venue are removed by a background job
+    assert jobs.run_one()
+    db.session.expire_all()
+    assert db.session.get(Venue, venue) is None
+    assert db.session.scalars(db.select(Show)).all() == []
+    # no longer served from the detail cache
+    assert b"could not be listed" in client.get(f"/venues/{venue}").data
+
+
+def test_nearby_venues(client, venue):
+    response = client.get("/venues/nearby?lat=37.78&lon=-122.41&radius=5")
+    assert response.status_code == 200
+    assert b"The Musical Hop" in response.data
+
+    response = client.get("/venues/nearby?lat=40.71&lon=-74.0&radius=5")
+    assert b"The Musical Hop" not in response.data
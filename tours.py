@@ -0,0 +1,160 @@
+# ----------------------------------------------------------------------------#
+# Tour scheduling.
+# ----------------------------------------------------------------------------#
+# Books many show slots (venue, start time, and optionally an artist other
+# than the tour's) at once. Every slot is validated in one pass, with one
+# query checking all referenced venue and artist ids together, and the shows
+# are inserted with a single multi-row INSERT in one transaction: either the
+# whole tour is booked or nothing is, with the errors reported per slot.
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, literal, select, union_all
+
+from fragments import invalidate_page
+import outbox
+from models import Artist, Show, Venue, db
+
+MODELS = {"venue": Venue, "artist": Artist}
+
+
+class TourError(ValueError):
+    """Invalid tour; ``errors`` maps a field ("slots") or a slot's index to
+    messages (per field, for slots)."""
+
+    def __init__(self, errors: dict):
+        super().__init__("invalid tour")
+        self.errors = errors
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    # like the date filter, only import dateutil once a date is parsed
+    import dateutil.parser
+
+    try:
+        return dateutil.parser.parse(str(value))
+    except (ValueError, OverflowError):
+        return None
+
+
+def existing(venue_ids, artist_ids) -> dict:
+    """{"venue": ids, "artist": ids} of the given ids that exist, in one
+    query."""
+    parts = [
+        select(literal(kind).label("kind"), MODELS[kind].id).where(
+            MODELS[kind].id.in_(ids)
+        )
+        for kind, ids in (("venue", venue_ids), ("artist", artist_ids))
+        if ids
+    ]
+    found = {"venue": set(), "artist": set()}
+    if parts:
+        for kind, id in db.session.execute(union_all(*parts)):
+            found[kind].add(id)
+    return found
+
+
+def validate(artist_id, slots) -> list:
+    """Column values for each of ``slots`` (dicts with venue_id, start_time
+    and optionally artist_id, defaulting to ``artist_id``), or TourError with
+    every slot's problems."""
+    limit = current_app.config["TOUR_MAX_SLOTS"]
+    if not isinstance(slots, list) or not slots:
+        raise TourError({"slots": ["No slots given."]})
+    if len(slots) > limit:
+        raise TourError({"slots": [f"At most {limit} slots per tour."]})
+
+    rows, errors = [], {}
+    for index, slot in enumerate(slots):
+        if not isinstance(slot, dict):
+            errors[index] = {"slot": ["Expected an object."]}
+            rows.append(None)
+            continue
+        row = {
+            "venue_id": _parse_id(slot.get("venue_id")),
+            "artist_id": _parse_id(slot.get("artist_id", artist_id)),
+            "start_time": _parse_time(slot.get("start_time")),
+        }
+        problems = {}
+        for field in ("venue_id", "artist_id"):
+            if row[field] is None:
+                problems[field] = ["Not a valid id."]
+        if row["start_time"] is None:
+            problems["start_time"] = ["Not a valid datetime value."]
+        if problems:
+            errors[index] = problems
+        rows.append(row)
+
+    found = existing(
+        {row["venue_id"] for row in rows if row and row["venue_id"] is not None},
+        {row["artist_id"] for row in rows if row and row["artist_id"] is not None},
+    )
+    booked = set()
+    for index, row in enumerate(rows):
+        if row is None:
+            continue
+        problems = errors.setdefault(index, {})
+        for kind in ("venue", "artist"):
+            id = row[f"{kind}_id"]
+            if id is not None and id not in found[kind]:
+                problems[f"{kind}_id"] = [f"No {kind} with this id."]
+        if row["artist_id"] is not None and row["start_time"] is not None:
+            # an artist cannot play two shows at once
+            key = (row["artist_id"], row["start_time"])
+            if key in booked:
+                problems["start_time"] = ["The artist plays another slot then."]
+            booked.add(key)
+        if not problems:
+            del errors[index]
+
+    if errors:
+        raise TourError(errors)
+    return rows
+
+
+def book(rows) -> list:
+    """Insert a show per row with one INSERT and record the changes, in the
+    current transaction. Returns the new show ids."""
+    now = datetime.now()
+    values = [{**row, "updated_at": now, "version": 1} for row in rows]
+    ids = sorted(
+        db.session.scalars(insert(Show).values(values).returning(Show.id)).all()
+    )
+    outbox.record("create", "show", *ids)
+    return ids
+
+
+def schedule(artist_id, slots, dry_run=False) -> dict:
+    """Validate and book a tour, committing on success."""
+    rows = validate(artist_id, slots)
+    result = {"slots": len(rows), "dry_run": dry_run}
+    if dry_run:
+        db.session.rollback()
+        return result
+
+    result["ids"] = book(rows)
+    db.session.commit()
+    for kind in ("venue", "artist"):
+        for id in {row[f"{kind}_id"] for row in rows}:
+            invalidate_page(kind, id)
+    return result
+
+
+def parse_lines(text: str) -> list:
+    """Slots from "venue_id, start time" lines, as entered in the tour form;
+    blank lines are skipped."""
+    slots = []
+    for line in text.splitlines():
+        if line.strip():
+            venue_id, _, start_time = line.partition(",")
+            slots.append({"venue_id": venue_id.strip(), "start_time": start_time})
+    return slots
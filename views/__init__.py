@@ -0,0 +1,56 @@
+from contextlib import closing
+
+from flask import Response, current_app, render_template, request, stream_template
+
+from models import db
+
+
+def register_blueprints(app):
+    from views import api, artists, changes, main, shows, venues
+
+    for module in (main, venues, artists, shows, api, changes):
+        app.register_blueprint(module.bp)
+
+
+def wants_stream() -> bool:
+    """Whether the listing was requested streamed (``?stream=1``)."""
+    return request.args.get("stream") == "1"
+
+
+def _buffered(chunks, size):
+    # the template yields a chunk per tag/expression; send fewer, larger ones
+    with closing(chunks):
+        buffer, length = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield "".join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+
+def stream_listing(template, name, rows, **context):
+    """Render ``template`` with ``rows`` (an iterator, e.g. of a yield_per
+    query) as ``name`` while the response is sent, so neither all the rows
+    nor the whole page are ever in memory. The first row is fetched here, so
+    query errors still reach the view; the session is closed once the rows
+    are consumed or the client goes away."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        # an iterator is always truthy: render the page's empty state
+        db.session.close()
+        return render_template(template, **{name: []}, **context)
+
+    def consume():
+        try:
+            yield first
+            yield from rows
+        finally:
+            db.session.close()
+
+    chunks = stream_template(template, **{name: consume()}, **context)
+    size = current_app.config["STREAM_BUFFER_SIZE"]
+    return Response(_buffered(chunks, size), mimetype="text/html")
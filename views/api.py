@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------#
+# API.
+# ----------------------------------------------------------------------------#
+import sys
+
+from flask import Blueprint, current_app, jsonify, request
+
+from models import db
+import bulk
+import geo
+import matching
+import tours
+
+bp = Blueprint("api", __name__, url_prefix="/api")
+
+
+def api_error(message, status=400):
+    return jsonify({"error": message}), status
+
+
+@bp.route("/venues/nearby")
+def venues_nearby():
+    try:
+        args = geo.nearby_args(request.args)
+    except KeyError as e:
+        return api_error(f"missing argument {e.args[0]}")
+    except ValueError as e:
+        return api_error(str(e))
+
+    try:
+        venues = geo.venues_near(
+            args["latitude"], args["longitude"], args["radius_km"], args["limit"]
+        )
+    finally:
+        db.session.close()
+
+    return jsonify(
+        {
+            "unit": args["unit"],
+            "count": len(venues),
+            "data": [
+                {**v._asdict(), "distance": round(v.distance / args["per_unit"], 3)}
+                for v in venues
+            ],
+        }
+    )
+
+
+@bp.route("/venues/<int:venue_id>/matches")
+def venue_matches(venue_id):
+    return matches("venue", venue_id)
+
+
+@bp.route("/artists/<int:artist_id>/matches")
+def artist_matches(artist_id):
+    return matches("artist", artist_id)
+
+
+def matches(kind, id):
+    most = current_app.config["MATCH_SUGGESTIONS"]
+    try:
+        limit = max(min(int(request.args.get("limit", most)), most), 1)
+    except ValueError:
+        return api_error("limit must be an integer")
+    try:
+        suggestions = matching.suggest(kind, id, limit)
+    finally:
+        db.session.close()
+    return jsonify(
+        {
+            "count": len(suggestions),
+            "data": [suggestion._asdict() for suggestion in suggestions],
+        }
+    )
+
+
+@bp.route("/<any(venues, artists, shows):kinds>", methods=["PATCH"])
+def bulk_update(kinds):
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return api_error("expected a JSON object")
+    ids, changes = body.get("ids", []), body.get("changes", {})
+    if not isinstance(ids, list) or not isinstance(changes, dict):
+        return api_error("ids must be a list and changes an object")
+    dry_run = body.get("dry_run") is True or request.args.get("dry_run") == "1"
+
+    try:
+        result = bulk.update_many(kinds[:-1], ids, changes, dry_run=dry_run)
+    except bulk.BulkError as e:
+        db.session.rollback()
+        return jsonify({"errors": e.errors}), 400
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        return api_error("An error occurred. Nothing was updated.", 500)
+    finally:
+        db.session.close()
+    return jsonify(result)
+
+
+@bp.route("/tours", methods=["POST"])
+def schedule_tour():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return api_error("expected a JSON object")
+    dry_run = body.get("dry_run") is True or request.args.get("dry_run") == "1"
+
+    try:
+        result = tours.schedule(body.get("artist_id"), body.get("slots"), dry_run)
+    except tours.TourError as e:
+        db.session.rollback()
+        return jsonify({"errors": e.errors}), 400
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+        return api_error("An error occurred. No show was booked.", 500)
+    finally:
+        db.session.close()
+    return jsonify(result), 200 if dry_run else 201
@@ -0,0 +1,328 @@
+# ----------------------------------------------------------------------------#
+# Artists.
+# ----------------------------------------------------------------------------#
+import sys
+from datetime import datetime
+
+from flask import (
+    Blueprint,
+    current_app,
+    render_template,
+    request,
+    flash,
+    make_response,
+    redirect,
+    url_for,
+)
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import Artist, Show, db, expect_version
+import dedup
+import hot
+import projections
+import snapshots
+import jobs
+import matching
+import outbox
+from fragments import invalidate_page
+from views import stream_listing, wants_stream
+
+bp = Blueprint("artists", __name__)
+
+
+@bp.route("/artists")
+def artists():
+    # DONE: replace with real data returned from querying the database
+    if wants_stream():
+        try:
+            return stream_listing(
+                "pages/artists.html",
+                "artists",
+                projections.iter_artist_items(current_app.config["STREAM_YIELD_PER"]),
+            )
+        except:
+            db.session.rollback()
+            print(sys.exc_info())
+            db.session.close()
+            return render_template("pages/artists.html", artists=[])
+
+    data = []
+    try:
+        data = projections.artist_items()
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    return render_template("pages/artists.html", artists=data)
+
+
+@bp.route("/artists/search", methods=["POST"])
+def search_artists():
+    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    search = request.form.get("search_term", "")
+    response = {}
+    try:
+        if artists := projections.search_artists(search):
+            response["count"] = len(artists)
+            response["data"] = artists
+        else:
+            response["count"] = 0
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    return render_template(
+        "pages/search_artists.html",
+        results=response,
+        search_term=search,
+    )
+
+
+def artist_page(artist_id):
+    # one read of the page's snapshot; concurrent requests for one page share
+    # a single load, which is then cached for DETAIL_CACHE_TTL seconds
+    return current_app.extensions["detail_cache"].get_or_render(
+        ("artist", artist_id), lambda: snapshots.page("artist", artist_id)
+    )
+
+
+@hot.warmer("artist")
+def warm_artist(artist_id):
+    if data := artist_page(artist_id):
+        render_template("pages/show_artist.html", artist=data)
+
+
+def suggestions(artist_id):
+    try:
+        return matching.suggest("artist", artist_id)
+    except:
+        print(sys.exc_info())
+        return []
+
+
+@bp.route("/artists/<int:artist_id>")
+def show_artist(artist_id):
+    # shows the venue page with the given venue_id
+    # DONE: replace with real venue data from the venues table, using venue_id
+    data = {}
+    matches = []
+    error = False
+    try:
+        data = artist_page(artist_id)
+        hot.track("artist", artist_id)
+        matches = suggestions(artist_id)
+    except:
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error or not data:
+        flash(f"An error occurred. Artist could not be listed.")
+        return render_template("pages/home.html")
+
+    return render_template("pages/show_artist.html", artist=data, matches=matches)
+
+
+@bp.route("/artists/create", methods=["GET"])
+def create_artist_form():
+    from forms import ArtistForm
+
+    form = ArtistForm()
+    return render_template("forms/new_artist.html", form=form)
+
+
+def possible_duplicates(data):
+    try:
+        return dedup.find(
+            "artist",
+            data["name"],
+            data["city"],
+            data["state"],
+            phone=data.get("phone"),
+            website=data.get("website_link"),
+        )
+    except:
+        print(sys.exc_info())
+        return []
+
+
+@bp.route("/artists/create", methods=["POST"])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # DONE: insert form data as a new Artist record in the db, instead
+    # DONE: modify data to be the data object returned from db insertion
+    error = False
+    data = request.form.to_dict()
+    genres = request.form.to_dict(flat=False)["genres"]
+    seeking = True if data.get("seeking_venue") else False
+    if not data.get("not_duplicate") and (duplicates := possible_duplicates(data)):
+        # ask before listing what looks like an existing artist again
+        from forms import ArtistForm
+
+        return render_template(
+            "forms/new_artist.html", form=ArtistForm(), duplicates=duplicates
+        )
+    try:
+        artist = Artist(
+            name=data["name"],
+            genres=genres,
+            city=data["city"],
+            state=data["state"],
+            phone=data["phone"],
+            website=data["website_link"],
+            facebook_link=data["facebook_link"],
+            image_link=data["image_link"],
+            seeking_venue=seeking,
+            seeking_description=data["seeking_description"],
+        )
+        db.session.add(artist)
+        db.session.flush()
+        outbox.record("create", "artist", artist.id)
+        db.session.commit()
+        matching.refresh("artist", artist.id)
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error:
+        flash(f"An error occurred. Artist '{data['name']}' could not be listed.")
+    else:
+        flash(f"Artist '{data['name']}' was successfully listed!")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template("pages/home.html")
+
+
+@bp.route("/artists/<int:artist_id>/edit", methods=["GET"])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+
+    form = None
+    data = None
+    try:
+        if artist := projections.artist_detail(artist_id):
+            # current values, also when re-rendered for a conflicting POST
+            form = ArtistForm(formdata=None, obj=artist)
+            data = artist._asdict()
+    except:
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # DONE: populate form with fields from artist with ID <artist_id>
+    if data:
+        return render_template("forms/edit_artist.html", form=form, artist=data)
+    else:
+        return redirect(url_for("main.index"))
+
+
+@bp.route("/artists/<int:artist_id>/edit", methods=["POST"])
+def edit_artist_submission(artist_id):
+    # DONE: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+    error = False
+    conflict = False
+    data = request.form.to_dict()
+    data["genres"] = request.form.to_dict(flat=False)["genres"]
+    seeking = True if data.get("seeking_venue") else False
+    try:
+        if artist := Artist.query.get(artist_id):
+            expect_version(artist, data.get("version"))
+            artist.name = data["name"]
+            artist.genres = data["genres"]
+            artist.city = data["city"]
+            artist.state = data["state"]
+            artist.phone = data["phone"]
+            artist.website = data["website_link"]
+            artist.facebook_link = data["facebook_link"]
+            artist.image_link = data["image_link"]
+            artist.seeking_venue = seeking
+            artist.seeking_description = data["seeking_description"]
+            Show.query.filter_by(artist_id=artist_id).update(
+                {"updated_at": datetime.now()}
+            )
+            outbox.record("update", "artist", artist_id)
+            db.session.commit()
+            invalidate_page("artist", artist_id)
+            matching.refresh("artist", artist_id)
+    except StaleDataError:
+        # edited by someone else since the form was loaded (or while saving)
+        db.session.rollback()
+        conflict = True
+        print(sys.exc_info())
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    if conflict:
+        flash(
+            f"Artist '{data['name']}' was changed by someone else while you were "
+            "editing it, so your changes were not saved. The form now shows the "
+            "current details; please apply your changes again."
+        )
+        response = make_response(edit_artist(artist_id))
+        if response.status_code == 200:
+            response.status_code = 409
+        return response
+
+    # on successful db update, flash success
+    if error:
+        flash(f"An error occurred. Artist '{data['name']}' could not be updated.")
+    else:
+        flash(f"Artist '{data['name']}' was successfully updated!")
+
+    return redirect(url_for("artists.show_artist", artist_id=artist_id))
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+
+
+@bp.route("/artists/<artist_id>", methods=["DELETE"])
+def delete_artist(artist_id):
+    # DONE: Complete this endpoint for taking a artist_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # DONE: BONUS CHALLENGE: Implement a button to delete a Artist on an Artist Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    error = False
+    artist_name = ""
+    try:
+        artist_name = db.session.query(Artist.name).filter_by(id=artist_id).scalar()
+        if artist_name is None:
+            raise LookupError(f"artist {artist_id} not found")
+        # shows are removed together with the artist by a background job
+        jobs.enqueue("delete_artist", artist_id=int(artist_id))
+        db.session.commit()
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error:
+        flash(f"An error occurred. Artist could not be listed.")
+    else:
+        flash(f"Artist '{artist_name}' was scheduled for removal.")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return redirect(url_for("main.index"))
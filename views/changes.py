@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------------#
+# Change feed.
+# ----------------------------------------------------------------------------#
+import time
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
+
+from models import db
+import outbox
+
+bp = Blueprint("changes", __name__)
+
+
+def cursor_arg():
+    # EventSource resends the last event id when it reconnects
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("after", 0)
+    return max(int(cursor), 0)
+
+
+def wants_stream() -> bool:
+    best = request.accept_mimetypes.best_match(
+        ["application/json", "text/event-stream"]
+    )
+    return best == "text/event-stream" or request.args.get("stream") == "1"
+
+
+@bp.route("/changes")
+def changes():
+    """Changes after the ``after`` cursor, as a JSON page or, when asked for
+    ``text/event-stream``, as a Server-Sent Events stream."""
+    config = current_app.config
+    try:
+        cursor = cursor_arg()
+        limit = int(request.args.get("limit", config["CHANGES_PAGE_SIZE"]))
+        limit = max(min(limit, config["CHANGES_PAGE_SIZE"]), 1)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+
+    if wants_stream():
+        return Response(
+            stream_with_context(stream(cursor, limit)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    try:
+        rows = outbox.since(cursor, limit)
+    finally:
+        db.session.close()
+    return jsonify(
+        {
+            "changes": [outbox.as_dict(row) for row in rows],
+            "cursor": rows[-1].id if rows else cursor,
+            "more": len(rows) == limit,
+        }
+    )
+
+
+def stream(cursor, limit):
+    streams = current_app.extensions["change_streams"]
+    if not streams.acquire(blocking=False):
+        # every stream slot is taken: have the client come back later
+        # (EventSource gives up on error responses, but reconnects after this)
+        yield f"retry: {int(current_app.config['CHANGES_BUSY_RETRY'] * 1000)}\n\n"
+        return
+    try:
+        yield from _events(cursor, limit)
+    finally:
+        streams.release()
+
+
+def _events(cursor, limit):
+    config = current_app.config
+    poll = config["CHANGES_POLL_INTERVAL"]
+    heartbeat = config["CHANGES_HEARTBEAT"]
+    # streams end after a while so worker threads are recycled; the client
+    # reconnects on its own and resumes from Last-Event-ID
+    deadline = time.monotonic() + config["CHANGES_STREAM_TIMEOUT"]
+    yield f"retry: {int(poll * 1000)}\n\n"
+
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        try:
+            rows = outbox.since(cursor, limit)
+        finally:
+            # never hold a pooled connection while idle
+            db.session.close()
+        for row in rows:
+            yield outbox.as_event(row)
+            cursor = row.id
+        if rows:
+            quiet_since = time.monotonic()
+            if len(rows) == limit:
+                continue
+        elif time.monotonic() - quiet_since >= heartbeat:
+            yield ": keep-alive\n\n"
+            quiet_since = time.monotonic()
+        time.sleep(poll)
@@ -0,0 +1,31 @@
+# ----------------------------------------------------------------------------#
+# Main.
+# ----------------------------------------------------------------------------#
+from flask import Blueprint, jsonify, render_template, request
+
+bp = Blueprint("main", __name__)
+
+
+@bp.route("/")
+def index():
+    return render_template("pages/home.html")
+
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template("errors/404.html"), 404
+
+
+@bp.app_errorhandler(429)
+@bp.app_errorhandler(503)
+def overloaded_error(error):
+    # raised by the rate limiter and admission control with a Retry-After
+    headers = [header for header in error.get_headers() if header[0] == "Retry-After"]
+    if request.blueprint in ("api", "changes"):
+        return jsonify({"error": error.description}), error.code, headers
+    return render_template("errors/busy.html"), error.code, headers
+
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template("errors/500.html"), 500
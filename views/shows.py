@@ -0,0 +1,178 @@
+# ----------------------------------------------------------------------------#
+# Shows.
+# ----------------------------------------------------------------------------#
+import sys
+
+from flask import (
+    Blueprint,
+    current_app,
+    render_template,
+    request,
+    flash,
+    redirect,
+    url_for,
+)
+
+from models import Show, db
+import outbox
+import projections
+import tours
+from fragments import invalidate_page
+from views import stream_listing, wants_stream
+
+bp = Blueprint("shows", __name__)
+
+
+@bp.route("/shows")
+def shows():
+    # displays list of shows at /shows
+    # DONE: replace with real venues data.
+    #       num_shows should be aggregated based on number of upcoming shows per venue.
+    if wants_stream():
+        try:
+            return stream_listing(
+                "pages/shows.html",
+                "shows",
+                projections.iter_show_tiles(current_app.config["STREAM_YIELD_PER"]),
+            )
+        except:
+            db.session.rollback()
+            print(sys.exc_info())
+            db.session.close()
+            return render_template("pages/shows.html", shows=[])
+
+    data = []
+    try:
+        data = projections.show_tiles()
+    except:
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    return render_template("pages/shows.html", shows=data)
+
+
+@bp.route("/shows/create")
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+
+    form = ShowForm()
+    return render_template("forms/new_show.html", form=form)
+
+
+@bp.route("/shows/create", methods=["POST"])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # DONE: insert form data as a new Show record in the db, instead
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    error = False
+    data = request.form.to_dict()
+    try:
+        import dateutil.parser
+
+        show = Show(
+            # parsed here, not by the database, so that SQLite accepts it too
+            start_time=dateutil.parser.parse(data["start_time"]),
+            artist_id=data["artist_id"],
+            venue_id=data["venue_id"],
+        )
+        db.session.add(show)
+        db.session.flush()
+        outbox.record("create", "show", show.id)
+        db.session.commit()
+        invalidate_page("venue", data["venue_id"])
+        invalidate_page("artist", data["artist_id"])
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    if error:
+        flash(f"An error occurred. Show could not be listed.")
+    else:
+        # on successful db insert, flash success
+        flash(f"Show was successfully listed!")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template("pages/home.html")
+
+
+@bp.route("/shows/tour")
+def create_tour():
+    from forms import TourForm
+
+    return render_template("forms/new_tour.html", form=TourForm())
+
+
+@bp.route("/shows/tour", methods=["POST"])
+def create_tour_submission():
+    # books every slot of a tour in one transaction, or none of them
+    from forms import TourForm
+
+    error = False
+    errors = {}
+    data = request.form.to_dict()
+    try:
+        result = tours.schedule(
+            data.get("artist_id"), tours.parse_lines(data.get("slots", ""))
+        )
+    except tours.TourError as e:
+        db.session.rollback()
+        errors = e.errors
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    if errors:
+        return render_template(
+            "forms/new_tour.html", form=TourForm(), slot_errors=errors
+        )
+    if error:
+        flash(f"An error occurred. The tour could not be listed.")
+    else:
+        flash(f"Tour of {len(result['ids'])} shows was successfully listed!")
+    return render_template("pages/home.html")
+
+
+@bp.route("/shows/<show_id>", methods=["DELETE"])
+def delete_show(show_id):
+    # DONE: Complete this endpoint for taking a show_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # DONE: BONUS CHALLENGE: Implement a button to delete a Show on a Show Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+
+    error = False
+    try:
+        show = Show.query.get(show_id)
+        if show:
+            outbox.record("delete", "show", show.id)
+            db.session.delete(show)
+            db.session.commit()
+            invalidate_page("venue", show.venue_id)
+            invalidate_page("artist", show.artist_id)
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error:
+        flash(f"An error occurred. Show could not be canceled.")
+    else:
+        flash(f"Show was successfully canceled!")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return redirect(url_for("main.index"))
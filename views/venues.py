@@ -0,0 +1,341 @@
+# ----------------------------------------------------------------------------#
+# Venues.
+# ----------------------------------------------------------------------------#
+import sys
+from datetime import datetime
+
+from flask import (
+    Blueprint,
+    current_app,
+    render_template,
+    request,
+    flash,
+    make_response,
+    redirect,
+    url_for,
+)
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import Show, Venue, db, expect_version
+import dedup
+import geo
+import hot
+import projections
+import snapshots
+import jobs
+import matching
+import outbox
+from fragments import invalidate_page
+
+bp = Blueprint("venues", __name__)
+
+
+@bp.route("/venues")
+def venues():
+    # DONE: replace with real venues data.
+    #       num_shows should be aggregated based on number of upcoming shows per venue.
+    data = []
+    try:
+        data = projections.venue_areas()
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+    return render_template("pages/venues.html", areas=data)
+
+
+@bp.route("/venues/nearby")
+def nearby_venues():
+    venues = []
+    args = None
+    error = None
+    if "lat" in request.args:
+        try:
+            args = geo.nearby_args(request.args)
+            venues = geo.venues_near(
+                args["latitude"], args["longitude"], args["radius_km"], args["limit"]
+            )
+        except (KeyError, ValueError):
+            error = "Please provide a valid location and radius."
+        except:
+            error = "An error occurred. Nearby venues could not be listed."
+            print(sys.exc_info())
+        finally:
+            db.session.close()
+
+    return render_template(
+        "pages/venues_nearby.html",
+        venues=venues,
+        args=args,
+        error=error,
+        request_args=request.args,
+    )
+
+
+@bp.route("/venues/search", methods=["POST"])
+def search_venues():
+    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    search = request.form.get("search_term", "")
+    response = {}
+    try:
+        if venues := projections.search_venues(search):
+            response["count"] = len(venues)
+            response["data"] = venues
+        else:
+            response["count"] = 0
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    return render_template(
+        "pages/search_venues.html",
+        results=response,
+        search_term=search,
+    )
+
+
+def venue_page(venue_id):
+    # one read of the page's snapshot; concurrent requests for one page share
+    # a single load, which is then cached for DETAIL_CACHE_TTL seconds
+    return current_app.extensions["detail_cache"].get_or_render(
+        ("venue", venue_id), lambda: snapshots.page("venue", venue_id)
+    )
+
+
+@hot.warmer("venue")
+def warm_venue(venue_id):
+    if data := venue_page(venue_id):
+        render_template("pages/show_venue.html", venue=data)
+
+
+def suggestions(venue_id):
+    try:
+        return matching.suggest("venue", venue_id)
+    except:
+        print(sys.exc_info())
+        return []
+
+
+@bp.route("/venues/<int:venue_id>")
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    # DONE: replace with real venue data from the venues table, using venue_id
+    data = {}
+    matches = []
+    error = False
+    try:
+        data = venue_page(venue_id)
+        hot.track("venue", venue_id)
+        matches = suggestions(venue_id)
+    except:
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error or not data:
+        flash(f"An error occurred. Venue could not be listed.")
+        return render_template("pages/home.html")
+
+    return render_template("pages/show_venue.html", venue=data, matches=matches)
+
+
+@bp.route("/venues/create", methods=["GET"])
+def create_venue_form():
+    from forms import VenueForm
+
+    form = VenueForm()
+    return render_template("forms/new_venue.html", form=form)
+
+
+def possible_duplicates(data):
+    try:
+        return dedup.find(
+            "venue",
+            data["name"],
+            data["city"],
+            data["state"],
+            phone=data.get("phone"),
+            website=data.get("website_link"),
+        )
+    except:
+        print(sys.exc_info())
+        return []
+
+
+@bp.route("/venues/create", methods=["POST"])
+def create_venue_submission():
+    # DONE: insert form data as a new Venue record in the db, instead
+    # DONE: modify data to be the data object returned from db insertion
+    error = False
+    data = request.form.to_dict()
+    genres = request.form.to_dict(flat=False)["genres"]
+    seeking = True if data.get("seeking_talent") else False
+    if not data.get("not_duplicate") and (duplicates := possible_duplicates(data)):
+        # ask before listing what looks like an existing venue again
+        from forms import VenueForm
+
+        return render_template(
+            "forms/new_venue.html", form=VenueForm(), duplicates=duplicates
+        )
+    try:
+        venue = Venue(
+            name=data["name"],
+            address=data["address"],
+            city=data["city"],
+            state=data["state"],
+            phone=data["phone"],
+            website=data["website_link"],
+            facebook_link=data["facebook_link"],
+            image_link=data["image_link"],
+            genres=genres,
+            seeking_talent=seeking,
+            seeking_description=data["seeking_description"],
+        )
+        db.session.add(venue)
+        db.session.flush()
+        outbox.record("create", "venue", venue.id)
+        db.session.commit()
+        matching.refresh("venue", venue.id)
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error:
+        flash(f"An error occurred. Venue '{data['name']}' could not be listed.")
+    else:
+        flash(f"Venue '{data['name']}' was successfully listed!")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template("pages/home.html")
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["GET"])
+def edit_venue(venue_id):
+    from forms import VenueForm
+
+    form = None
+    data = None
+    try:
+        if venue := projections.venue_detail(venue_id):
+            # current values, also when re-rendered for a conflicting POST
+            form = VenueForm(formdata=None, obj=venue)
+            data = venue._asdict()
+    except:
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # DONE: populate form with values from venue with ID <venue_id>
+    if data:
+        return render_template("forms/edit_venue.html", form=form, venue=data)
+    else:
+        return redirect(url_for("main.index"))
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["POST"])
+def edit_venue_submission(venue_id):
+    # DONE: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+    error = False
+    conflict = False
+    data = request.form.to_dict()
+    data["genres"] = request.form.to_dict(flat=False)["genres"]
+    seeking = True if data.get("seeking_talent") else False
+    try:
+        if venue := Venue.query.get(venue_id):
+            expect_version(venue, data.get("version"))
+            venue.name = data["name"]
+            venue.genres = data["genres"]
+            venue.address = data["address"]
+            venue.city = data["city"]
+            venue.state = data["state"]
+            venue.phone = data["phone"]
+            venue.website = data["website_link"]
+            venue.facebook_link = data["facebook_link"]
+            venue.image_link = data["image_link"]
+            venue.seeking_talent = seeking
+            venue.seeking_description = data["seeking_description"]
+            Show.query.filter_by(venue_id=venue_id).update(
+                {"updated_at": datetime.now()}
+            )
+            outbox.record("update", "venue", venue_id)
+            db.session.commit()
+            invalidate_page("venue", venue_id)
+            matching.refresh("venue", venue_id)
+    except StaleDataError:
+        # edited by someone else since the form was loaded (or while saving)
+        db.session.rollback()
+        conflict = True
+        print(sys.exc_info())
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    if conflict:
+        flash(
+            f"Venue '{data['name']}' was changed by someone else while you were "
+            "editing it, so your changes were not saved. The form now shows the "
+            "current details; please apply your changes again."
+        )
+        response = make_response(edit_venue(venue_id))
+        if response.status_code == 200:
+            response.status_code = 409
+        return response
+
+    # on successful db update, flash success
+    if error:
+        flash(f"An error occurred. Venue '{data['name']}' could not be updated.")
+    else:
+        flash(f"Venue '{data['name']}' was successfully updated!")
+
+    return redirect(url_for("venues.show_venue", venue_id=venue_id))
+
+
+@bp.route("/venues/<venue_id>", methods=["DELETE"])
+def delete_venue(venue_id):
+    # DONE: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # DONE: BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    error = False
+    venue_name = ""
+    try:
+        venue_name = db.session.query(Venue.name).filter_by(id=venue_id).scalar()
+        if venue_name is None:
+            raise LookupError(f"venue {venue_id} not found")
+        # shows are removed together with the venue by a background job
+        jobs.enqueue("delete_venue", venue_id=int(venue_id))
+        db.session.commit()
+    except:
+        db.session.rollback()
+        error = True
+        print(sys.exc_info())
+    finally:
+        db.session.close()
+
+    # on successful db insert, flash success
+    if error:
+        flash(f"An error occurred. Venue could not be listed.")
+    else:
+        flash(f"Venue '{venue_name}' was scheduled for removal.")
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g.,
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return redirect(url_for("main.index"))